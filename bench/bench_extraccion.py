@@ -0,0 +1,261 @@
+"""
+WMS DCIC - Benchmark de la extracción
+=====================================
+Mide detect_canal_from_pdf, extract_references_parallel y extract_with_ocr
+sobre el corpus sintético de corpus.py y compara con su verdad:
+- páginas por segundo (PDF de texto) y segundos de OCR por página (PDF imagen)
+- RSS máximo del proceso y sus trabajadores
+- detección de canal acertada y precisión / exhaustividad de las referencias
+
+La caché de extracción se desactiva para medir el trabajo real.
+
+Uso:
+    python bench/bench_extraccion.py                        # corpus temporal, todos los canales
+    python bench/bench_extraccion.py --paginas 1 20 100 --densidad 40 --json
+    python bench/bench_extraccion.py --corpus corpus/ --trabajadores 4
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import threading
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from corpus import generate_corpus, load_corpus
+import wms_extraccion
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class PeakRSS:
+    """RSS máximo (MB) durante el bloque, sumando los procesos hijos (pool de extracción).
+
+    Con psutil se muestrea cada `interval` segundos. Sin psutil se usa
+    resource.getrusage, que solo da el máximo desde el inicio del proceso (el
+    mayor hijo, no la suma); en Windows sin psutil queda en None.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        proceso = psutil.Process()
+        pico = 0
+        while True:
+            try:
+                rss = proceso.memory_info().rss
+                for hijo in proceso.children(recursive=True):
+                    try:
+                        rss += hijo.memory_info().rss
+                    except psutil.Error:
+                        pass
+                pico = max(pico, rss)
+            except psutil.Error:
+                pass
+            self.mb = round(pico / 2 ** 20, 1)
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        if psutil:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        elif resource:
+            # ru_maxrss: KB en Linux, bytes en macOS
+            unidad = 1 if sys.platform == "darwin" else 1024
+            pico = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                       resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+            self.mb = round(pico * unidad / 2 ** 20, 1)
+        return False
+
+
+def accuracy(encontradas, esperadas):
+    """Precisión y exhaustividad de las referencias encontradas contra la verdad."""
+    encontradas, esperadas = set(encontradas), set(esperadas)
+    aciertos = len(encontradas & esperadas)
+    return {
+        "precision": round(aciertos / len(encontradas), 4) if encontradas else (1.0 if not esperadas else 0.0),
+        "exhaustividad": round(aciertos / len(esperadas), 4) if esperadas else 1.0,
+        "faltantes": len(esperadas - encontradas),
+        "sobrantes": len(encontradas - esperadas),
+    }
+
+
+def ocr_missing():
+    """Motivo por el que no se puede medir el OCR, o None si Tesseract responde."""
+    if not wms_extraccion.OCR_AVAILABLE:
+        return "OCR no disponible (pytesseract/pdf2image)"
+    try:
+        wms_extraccion.pytesseract.get_tesseract_version()
+    except Exception as e:
+        return f"Tesseract no encontrado ({type(e).__name__})"
+    return None
+
+
+def _pct(valor):
+    return "-" if valor is None else f"{valor:.2%}"
+
+
+def bench_file(archivo, workers=None, sin_ocr=None):
+    """Detección y extracción de un manifiesto del corpus; devuelve sus métricas."""
+    canal = archivo["canal"]
+    resultado = {"archivo": archivo["archivo"], "canal": canal, "tipo": archivo["tipo"],
+                 "paginas": archivo["paginas"], "esperadas": len(archivo["referencias"])}
+
+    if archivo["tipo"] == "texto":
+        t0 = time.perf_counter()
+        detectado = wms_extraccion.detect_canal_from_pdf(archivo["ruta"])
+        resultado["deteccion_s"] = round(time.perf_counter() - t0, 4)
+        resultado["detectado"] = detectado
+        resultado["deteccion_ok"] = detectado == canal
+
+        with PeakRSS() as rss:
+            t0 = time.perf_counter()
+            extraccion = wms_extraccion.extract_references_parallel(
+                [archivo["ruta"]], canal, workers=workers, cache_path=None)
+            segundos = time.perf_counter() - t0
+        referencias = extraccion["referencias"]
+        resultado["tablas"] = extraccion["tablas"]
+        resultado["trabajadores"] = extraccion["trabajadores"]
+        resultado["paginas_s"] = round(archivo["paginas"] / segundos, 2) if segundos else None
+    else:
+        if sin_ocr:
+            resultado["omitido"] = sin_ocr
+            return resultado
+        with PeakRSS() as rss:
+            t0 = time.perf_counter()
+            referencias = wms_extraccion.extract_with_ocr(
+                archivo["ruta"], wms_extraccion.CANALES[canal]["patron_busqueda"])
+            segundos = time.perf_counter() - t0
+        resultado["ocr_s_pagina"] = round(segundos / archivo["paginas"], 3)
+
+    resultado["segundos"] = round(segundos, 3)
+    resultado["rss_mb"] = rss.mb
+    resultado["encontradas"] = len(referencias)
+    resultado.update(accuracy(referencias, archivo["referencias"]))
+    return resultado
+
+
+def totals(resultados):
+    """Totales por tipo de manifiesto."""
+    resumen = {}
+    for tipo in ("texto", "imagen"):
+        grupo = [r for r in resultados if r["tipo"] == tipo and "omitido" not in r]
+        if not grupo:
+            continue
+        paginas = sum(r["paginas"] for r in grupo)
+        segundos = sum(r["segundos"] for r in grupo)
+        esperadas = sum(r["esperadas"] for r in grupo)
+        encontradas = sum(r["encontradas"] for r in grupo)
+        faltantes = sum(r["faltantes"] for r in grupo)
+        sobrantes = sum(r["sobrantes"] for r in grupo)
+        fila = {
+            "archivos": len(grupo),
+            "paginas": paginas,
+            "segundos": round(segundos, 2),
+            "rss_mb": max((r["rss_mb"] for r in grupo if r["rss_mb"] is not None), default=None),
+            "precision": round((encontradas - sobrantes) / encontradas, 4) if encontradas else None,
+            "exhaustividad": round((esperadas - faltantes) / esperadas, 4) if esperadas else None,
+        }
+        if tipo == "texto":
+            fila["paginas_s"] = round(paginas / segundos, 2) if segundos else None
+            fila["deteccion_ok"] = sum(1 for r in grupo if r["deteccion_ok"])
+        else:
+            fila["ocr_s_pagina"] = round(segundos / paginas, 3) if paginas else None
+        resumen[tipo] = fila
+    return resumen
+
+
+def print_report(resultados, resumen):
+    print(f"{'Archivo':<30}{'págs':>6}{'s':>8}{'págs/s':>9}{'OCR s/pág':>11}{'RSS MB':>8}"
+          f"{'precisión':>11}{'exhaust.':>10}  detección")
+    for r in resultados:
+        if "omitido" in r:
+            print(f"{r['archivo']:<30}{r['paginas']:>6}  omitido: {r['omitido']}")
+            continue
+        deteccion = ""
+        if r["tipo"] == "texto":
+            deteccion = "ok" if r["deteccion_ok"] else f"ERROR ({r['detectado']})"
+        print(f"{r['archivo']:<30}{r['paginas']:>6}{r['segundos']:>8.2f}"
+              f"{r.get('paginas_s') or '-':>9}{r.get('ocr_s_pagina') or '-':>11}{r['rss_mb'] or '-':>8}"
+              f"{_pct(r['precision']):>11}{_pct(r['exhaustividad']):>10}  {deteccion}")
+
+    for tipo, fila in resumen.items():
+        if tipo == "texto":
+            print(f"\nTEXTO: {fila['paginas']} págs en {fila['segundos']} s = {fila['paginas_s']} págs/s, "
+                  f"RSS máx {fila['rss_mb']} MB, detección {fila['deteccion_ok']}/{fila['archivos']}, "
+                  f"precisión {_pct(fila['precision'])}, exhaustividad {_pct(fila['exhaustividad'])}")
+        else:
+            print(f"IMAGEN: {fila['paginas']} págs en {fila['segundos']} s = {fila['ocr_s_pagina']} s/pág de OCR, "
+                  f"RSS máx {fila['rss_mb']} MB, precisión {_pct(fila['precision'])}, "
+                  f"exhaustividad {_pct(fila['exhaustividad'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de detección y extracción sobre manifiestos sintéticos")
+    parser.add_argument("--corpus", help="carpeta con verdad.json (por defecto se genera uno temporal)")
+    parser.add_argument("--canales", nargs="+", choices=sorted(wms_extraccion.CANALES), help="por defecto, todos")
+    parser.add_argument("--paginas", type=int, nargs="+", default=[1, 20], help="páginas de cada PDF de texto")
+    parser.add_argument("--densidad", type=int, default=30, help="referencias por página")
+    parser.add_argument("--paginas-ocr", type=int, default=2, help="páginas del PDF solo imagen (0 = sin OCR)")
+    parser.add_argument("--trabajadores", type=int, help="procesos de extracción (por defecto EXTRACTION_WORKERS)")
+    parser.add_argument("--conservar", action="store_true", help="no borrar el corpus temporal")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args(argv)
+
+    temporal = None
+    if args.corpus:
+        verdad = load_corpus(args.corpus)
+        if args.canales:
+            verdad["archivos"] = [a for a in verdad["archivos"] if a["canal"] in args.canales]
+    else:
+        temporal = tempfile.mkdtemp(prefix="corpus_dcic_")
+        generate_corpus(temporal, args.canales, args.paginas, args.densidad, args.paginas_ocr)
+        verdad = load_corpus(temporal)
+
+    if args.trabajadores:
+        wms_extraccion.EXTRACTION_WORKERS = args.trabajadores  # Tamaño del pool compartido (ver process_pool)
+    try:
+        sin_ocr = ocr_missing()
+        resultados = [bench_file(archivo, args.trabajadores, sin_ocr) for archivo in verdad["archivos"]]
+    finally:
+        if temporal and not args.conservar:
+            shutil.rmtree(temporal, ignore_errors=True)
+    resumen = totals(resultados)
+
+    if args.json:
+        print(json.dumps({"corpus": args.corpus or temporal, "rss": "psutil" if psutil else "resource",
+                          "resumen": resumen, "archivos": resultados}, ensure_ascii=False, indent=2))
+    else:
+        print_report(resultados, resumen)
+        if temporal and args.conservar:
+            print(f"\nCorpus: {temporal}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
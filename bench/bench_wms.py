@@ -0,0 +1,124 @@
+"""
+WMS DCIC - Benchmark de la automatización
+=========================================
+Ejecuta WMSAutomation.run completo (navegador, login, selección, asistente,
+creación y captura de OT) contra el WMS de prueba (mock_wms.py) en Chrome
+headless, y reporta órdenes por minuto para cada tamaño de lote.
+
+Uso:
+    python bench/bench_wms.py                          # 10, 100 y 1000 referencias
+    python bench/bench_wms.py --tamanos 10 100 --latencia 0.5 --json
+    python bench/bench_wms.py --sesion                 # un solo Chrome para todas las corridas
+    python bench/bench_wms.py --perfil rendimiento     # perfil liviano del navegador
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from mock_wms import MockWMS
+import wms_dcic_gui
+
+
+def run_once(url, canal, references, headless=True, verbose=False, session=None,
+             perfil=wms_dcic_gui.PERFIL_NAVEGADOR):
+    """Una corrida completa de WMSAutomation; devuelve las métricas."""
+    logs = []
+    automation = wms_dcic_gui.WMSAutomation(
+        canal, log_callback=print if verbose else logs.append, base_url=url, headless=headless,
+        session=session, perfil=perfil)
+
+    t0 = time.perf_counter()
+    automation.run(list(references))
+    segundos = time.perf_counter() - t0
+
+    return {
+        "referencias": len(references),
+        "segundos": round(segundos, 2),
+        "ordenes_min": round(len(references) / segundos * 60, 1) if segundos else None,
+        "seleccionadas": len(automation.orders_selected),
+        "no_encontradas": len(automation.orders_not_found),
+        "sin_stock": len(automation.skus_sin_stock),
+        "ot": automation.ot_generada,
+        "reutilizado": automation.reused,
+        "perfil": perfil,
+        "carga_s": round(sum(c["segundos"] for c in automation.page_loads), 2),
+        "arranque_s": round(sum(s["segundos"] for s in automation.tracer.spans
+                                if s["paso"] in ("navegador", "login", "monitor")), 2),
+        "traza": automation.tracer.path,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de WMSAutomation contra el WMS de prueba")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10, 100, 1000], help="referencias por corrida")
+    parser.add_argument("--canal", default="Falabella", choices=sorted(wms_dcic_gui.CANALES))
+    parser.add_argument("--latencia", type=float, default=0.2, help="latencia del WMS de prueba (s)")
+    parser.add_argument("--faltantes", type=float, default=0.02, help="fracción de referencias que no existen")
+    parser.add_argument("--sin-api", action="store_true", help="tabla sin jQuery.fn.dataTable")
+    parser.add_argument("--visible", action="store_true", help="Chrome con ventana en vez de headless")
+    parser.add_argument("--perfil", default=wms_dcic_gui.PERFIL_NAVEGADOR, choices=sorted(wms_dcic_gui.BROWSER_PROFILES),
+                        help="perfil del navegador (ver BROWSER_PROFILES)")
+    parser.add_argument("--sesion", action="store_true",
+                        help="un WMS y un Chrome (BrowserSession) para todas las corridas")
+    parser.add_argument("--verbose", action="store_true", help="mostrar el log de la automatización")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args(argv)
+
+    # El historial y la bitácora son de las corridas reales: sin historial, las
+    # referencias fijas de MockWMS se omitirían por estar ya en una OT reciente
+    wms_dcic_gui.HISTORIAL_DB = None
+    bitacora = tempfile.TemporaryDirectory()
+    wms_dcic_gui.BITACORA_DIR = bitacora.name
+
+    resultados = []
+    session = wms_dcic_gui.BrowserSession() if args.sesion else None
+    compartido = None
+    if args.sesion:
+        compartido = MockWMS(ordenes=max(max(args.tamanos) * 2, 200), latencia=args.latencia,
+                             api=not args.sin_api, canal=args.canal)
+        compartido.start()
+    try:
+        for tamano in args.tamanos:
+            faltantes = int(tamano * args.faltantes)
+            mock = compartido or MockWMS(ordenes=max(tamano * 2, 200), latencia=args.latencia,
+                                         api=not args.sin_api, canal=args.canal)
+            url = mock.url if compartido else mock.start()
+            try:
+                refs = mock.references(tamano - faltantes, missing=faltantes)
+                resultado = run_once(url, args.canal, refs, headless=not args.visible, verbose=args.verbose,
+                                     session=session, perfil=args.perfil)
+                resultado["ots_creadas"] = len(mock.ots)
+                resultado["ot_correcta"] = bool(mock.ots) and resultado["ot"] == mock.ots[0]["Codigo"]
+            finally:
+                if not compartido:
+                    mock.stop()
+            resultados.append(resultado)
+            if not args.json:
+                print(f"{tamano:>6} refs: {resultado['segundos']:>8.1f} s  {resultado['ordenes_min']:>8.1f} órdenes/min  "
+                      f"arranque {resultado['arranque_s']:.1f} s{' (reutilizado)' if resultado['reutilizado'] else ''}  "
+                      f"carga de páginas {resultado['carga_s']:.1f} s  "
+                      f"seleccionadas {resultado['seleccionadas']}  no encontradas {resultado['no_encontradas']}  "
+                      f"OT {resultado['ot']} ({'ok' if resultado['ot_correcta'] else 'NO COINCIDE'})")
+    finally:
+        if session:
+            session.close()
+        if compartido:
+            compartido.stop()
+        bitacora.cleanup()
+
+    if args.json:
+        print(json.dumps({"canal": args.canal, "latencia": args.latencia, "resultados": resultados},
+                         ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+WMS DCIC - Corpus sintético de manifiestos
+==========================================
+Genera manifiestos de prueba para cada canal de CANALES, con su verdad
+(referencias esperadas) en verdad.json:
+- PDF con capa de texto: encabezado del canal y tabla con grilla (N°,
+  Referencia, Cliente, Comuna, Bultos), como los que se leen con pdfplumber
+- PDF solo imagen: la misma página rasterizada, para el camino de OCR
+
+El PDF de texto se escribe a mano (Helvetica, sin dependencias); el de imagen
+usa Pillow, que ya es dependencia de la aplicación.
+
+Uso:
+    python bench/corpus.py corpus/                               # todos los canales
+    python bench/corpus.py corpus/ --paginas 1 20 100 --densidad 40 --paginas-ocr 3
+    python bench/corpus.py corpus/ --canales Falabella Ripley --sin-ocr
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from datos import GENERADORES, make_references
+
+
+# Encabezado de cada canal: las palabras que la detección busca en la primera página
+ENCABEZADOS = {
+    "Falabella": ("Falabella Retail S.A.", "Manifiesto de entrega Falabella.com"),
+    "Mercadolibre": ("MercadoLibre Chile Ltda.", "Manifiesto Flex - Envíos del día"),
+    "Walmart": ("Walmart Chile S.A.", "Manifiesto de despacho Lider.cl"),
+    "Paris": ("Cencosud Retail S.A. - Paris", "Manifiesto Marketcenter"),
+    "Ripley": ("Comercial Ripley S.A.", "Manifiesto de despacho a domicilio"),
+    "Paginas": ("Starken - Páginas", "Manifiesto de retiro Homeclaf / Vincenzi / Glowup"),
+}
+
+NOMBRES = ["Camila Rojas", "Matías González", "Valentina Muñoz", "Benjamín Díaz", "Francisca Soto",
+           "Vicente Contreras", "Josefa Silva", "Martín Morales", "Antonia Araya", "Tomás Fuentes"]
+COMUNAS = ["Santiago", "Las Condes", "Ñuñoa", "Providencia", "Maipú", "La Florida",
+           "Puente Alto", "Recoleta", "Quilicura", "San Miguel"]
+COLUMNAS = [("N°", 0.07), ("Referencia", 0.31), ("Cliente", 0.27), ("Comuna", 0.23), ("Bultos", 0.12)]
+
+ANCHO, ALTO = 595, 842      # A4 en puntos
+MARGEN = 40
+ALTO_ENCABEZADO = 110
+DPI_IMAGEN = 150
+
+
+def manifest_pages(canal, paginas, densidad, seed=1, repetidas=0.02):
+    """Filas de cada página y referencias esperadas (orden de primera aparición).
+
+    Una fracción `repetidas` de las filas repite una referencia anterior, como un
+    pedido con varios bultos; la verdad no la cuenta dos veces.
+    """
+    rnd = random.Random(f"{canal}:{seed}:filas")
+    nuevas = iter(make_references(canal, paginas * densidad, seed=seed))
+    vistas = []
+    filas_por_pagina = []
+    numero = 1
+    for _ in range(paginas):
+        filas = []
+        for _ in range(densidad):
+            if vistas and rnd.random() < repetidas:
+                ref = rnd.choice(vistas)
+            else:
+                ref = next(nuevas)
+                vistas.append(ref)
+            filas.append([str(numero), ref, rnd.choice(NOMBRES), rnd.choice(COMUNAS), str(rnd.randint(1, 3))])
+            numero += 1
+        filas_por_pagina.append(filas)
+    return filas_por_pagina, vistas
+
+
+def _header_lines(canal, numero, total, fecha):
+    empresa, titulo = ENCABEZADOS[canal]
+    return [
+        (14, empresa),
+        (11, titulo),
+        (9, f"Fecha: {fecha.isoformat()}    Bodega: DCIC Santiago    Página {numero} de {total}"),
+    ]
+
+
+def _layout(densidad):
+    """Posiciones de la tabla: x de las columnas, alto de fila y tamaño de letra."""
+    xs = [MARGEN]
+    for _, fraccion in COLUMNAS:
+        xs.append(xs[-1] + fraccion * (ANCHO - 2 * MARGEN))
+    alto_fila = min(18.0, (ALTO - ALTO_ENCABEZADO - 2 * MARGEN) / (densidad + 1))
+    letra = max(4.0, min(9.0, alto_fila * 0.6))
+    return xs, alto_fila, letra
+
+
+# ---------- PDF con capa de texto ----------
+
+def _pdf_text(text):
+    text = text.encode("cp1252", "replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _page_stream(canal, filas, numero, total, densidad, fecha):
+    ops = []
+    y = ALTO - MARGEN
+    for size, linea in _header_lines(canal, numero, total, fecha):
+        y -= size + 6
+        ops.append(f"BT /F1 {size} Tf {MARGEN} {y:.2f} Td {_pdf_text(linea)} Tj ET")
+
+    xs, alto_fila, letra = _layout(densidad)
+    top = ALTO - MARGEN - ALTO_ENCABEZADO
+    filas = [[nombre for nombre, _ in COLUMNAS]] + filas
+    bottom = top - alto_fila * len(filas)
+
+    # Grilla: pdfplumber reconoce la tabla por sus líneas
+    ops.append("0.5 w")
+    for i in range(len(filas) + 1):
+        yl = top - i * alto_fila
+        ops.append(f"{xs[0]:.2f} {yl:.2f} m {xs[-1]:.2f} {yl:.2f} l S")
+    for x in xs:
+        ops.append(f"{x:.2f} {top:.2f} m {x:.2f} {bottom:.2f} l S")
+
+    for i, fila in enumerate(filas):
+        yt = top - (i + 1) * alto_fila + (alto_fila - letra) / 2 + letra * 0.2
+        for x, celda in zip(xs, fila):
+            ops.append(f"BT /F1 {letra:.2f} Tf {x + 3:.2f} {yt:.2f} Td {_pdf_text(celda)} Tj ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_text_pdf(path, canal, paginas, densidad, fecha):
+    """PDF de una fuente estándar (Helvetica, WinAnsi) con una tabla por página."""
+    total = len(paginas)
+    objetos = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for numero, filas in enumerate(paginas, 1):
+        stream = _page_stream(canal, filas, numero, total, densidad, fecha)
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        contenido = len(objetos)
+        objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> >> >>" % (ANCHO, ALTO, contenido))
+        kids.append(len(objetos))
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, objeto in enumerate(objetos, 1):
+        offsets.append(len(salida))
+        salida += b"%d 0 obj\n" % i + objeto + b"\nendobj\n"
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for offset in offsets:
+        salida += b"%010d 00000 n \n" % offset
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(salida)
+
+
+# ---------- PDF solo imagen (OCR) ----------
+
+def _font(size):
+    from PIL import ImageFont
+    for nombre in ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(nombre, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def write_image_pdf(path, canal, paginas, densidad, fecha, dpi=DPI_IMAGEN):
+    """La misma página que write_text_pdf, rasterizada: sin capa de texto."""
+    from PIL import Image, ImageDraw
+    escala = dpi / 72
+    xs, alto_fila, letra = _layout(densidad)
+    fuentes = {}
+
+    def font(size):
+        px = max(8, round(size * escala))
+        if px not in fuentes:
+            fuentes[px] = _font(px)
+        return fuentes[px]
+
+    imagenes = []
+    total = len(paginas)
+    for numero, filas in enumerate(paginas, 1):
+        img = Image.new("L", (round(ANCHO * escala), round(ALTO * escala)), 255)
+        draw = ImageDraw.Draw(img)
+        y = MARGEN
+        for size, linea in _header_lines(canal, numero, total, fecha):
+            draw.text((MARGEN * escala, y * escala), linea, fill=0, font=font(size))
+            y += size + 6
+
+        top = MARGEN + ALTO_ENCABEZADO
+        filas = [[nombre for nombre, _ in COLUMNAS]] + filas
+        bottom = top + alto_fila * len(filas)
+        for i in range(len(filas) + 1):
+            yl = (top + i * alto_fila) * escala
+            draw.line([(xs[0] * escala, yl), (xs[-1] * escala, yl)], fill=0, width=1)
+        for x in xs:
+            draw.line([(x * escala, top * escala), (x * escala, bottom * escala)], fill=0, width=1)
+        for i, fila in enumerate(filas):
+            yt = (top + i * alto_fila + (alto_fila - letra) / 2) * escala
+            for x, celda in zip(xs, fila):
+                draw.text(((x + 3) * escala, yt), celda, fill=0, font=font(letra))
+        imagenes.append(img)
+
+    imagenes[0].save(path, "PDF", save_all=True, append_images=imagenes[1:], resolution=dpi)
+
+
+def generate_corpus(directory, canales=None, paginas=(1, 20), densidad=30, paginas_ocr=2,
+                    repetidas=0.02, seed=1):
+    """Escribe los manifiestos y verdad.json en `directory`; devuelve la verdad.
+
+    Por canal: un PDF de texto por cada valor de `paginas` y, si `paginas_ocr`,
+    un PDF solo imagen con esa cantidad de páginas.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fecha = date(2026, 1, 5) + timedelta(days=seed % 300)
+    archivos = []
+    for canal in canales or list(GENERADORES):
+        variantes = [("texto", n) for n in paginas]
+        if paginas_ocr:
+            variantes.append(("imagen", paginas_ocr))
+        for i, (tipo, n) in enumerate(variantes):
+            filas, referencias = manifest_pages(canal, n, densidad, seed=f"{seed}:{i}", repetidas=repetidas)
+            nombre = f"{canal.lower()}_{tipo}_{n}p.pdf"
+            ruta = os.path.join(directory, nombre)
+            if tipo == "texto":
+                write_text_pdf(ruta, canal, filas, densidad, fecha)
+            else:
+                write_image_pdf(ruta, canal, filas, densidad, fecha)
+            archivos.append({"archivo": nombre, "canal": canal, "tipo": tipo, "paginas": n,
+                             "densidad": densidad, "referencias": referencias})
+
+    verdad = {"seed": seed, "archivos": archivos}
+    with open(os.path.join(directory, "verdad.json"), "w", encoding="utf-8") as f:
+        json.dump(verdad, f, ensure_ascii=False, indent=1)
+    return verdad
+
+
+def load_corpus(directory):
+    """Lee verdad.json y agrega la ruta completa de cada manifiesto."""
+    with open(os.path.join(directory, "verdad.json"), encoding="utf-8") as f:
+        verdad = json.load(f)
+    for archivo in verdad["archivos"]:
+        archivo["ruta"] = os.path.join(directory, archivo["archivo"])
+    return verdad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera manifiestos sintéticos con su verdad (verdad.json)")
+    parser.add_argument("directorio", help="carpeta de salida")
+    parser.add_argument("--canales", nargs="+", choices=sorted(GENERADORES), help="por defecto, todos")
+    parser.add_argument("--paginas", type=int, nargs="+", default=[1, 20], help="páginas de cada PDF de texto")
+    parser.add_argument("--densidad", type=int, default=30, help="referencias (filas) por página")
+    parser.add_argument("--paginas-ocr", type=int, default=2, help="páginas del PDF solo imagen (0 = ninguno)")
+    parser.add_argument("--sin-ocr", action="store_true", help="no generar PDFs solo imagen")
+    parser.add_argument("--repetidas", type=float, default=0.02, help="fracción de filas que repiten una referencia")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    verdad = generate_corpus(args.directorio, args.canales, args.paginas, args.densidad,
+                             0 if args.sin_ocr else args.paginas_ocr, args.repetidas, args.seed)
+    for archivo in verdad["archivos"]:
+        print(f"{archivo['archivo']:<32}{archivo['paginas']:>5} págs{len(archivo['referencias']):>7} refs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""
+Datos sintéticos compartidos por los benchmarks: referencias con el formato
+de cada canal de CANALES (ver wms_extraccion.py).
+"""
+
+import random
+
+
+TIENDAS_PAGINAS = ["Homeclaf", "Vincenzi", "Glowup", "Miglu", "Acqui"]
+
+GENERADORES = {
+    "Falabella": lambda r: f"32{r.randrange(10 ** 8):08d}",
+    "Mercadolibre": lambda r: f"2000{r.randrange(10 ** 12):012d}",
+    "Walmart": lambda r: str(r.randrange(10 ** 12, 10 ** 13)),
+    "Paris": lambda r: f"{r.choice(['307', '308'])}{r.randrange(10 ** 7):07d}",
+    "Ripley": lambda r: f"243{r.randrange(10 ** 8):08d}-A",
+    "Paginas": lambda r: f"{r.choice(TIENDAS_PAGINAS)}.cl-{r.randrange(1000, 100000)}",
+}
+
+
+def make_references(canal, n, seed=1):
+    """`n` referencias distintas con el formato del canal, reproducibles por `seed`."""
+    rnd = random.Random(f"{canal}:{seed}")
+    generar = GENERADORES[canal]
+    referencias = []
+    vistas = set()
+    while len(referencias) < n:
+        ref = generar(rnd)
+        if ref not in vistas:
+            vistas.add(ref)
+            referencias.append(ref)
+    return referencias
@@ -0,0 +1,619 @@
+"""
+WMS DCIC - Servidor WMS de prueba
+=================================
+Imitación local del WMS para medir WMSAutomation sin crear OTs reales. Solo
+usa la biblioteca estándar. Cubre:
+- Login ("Ingresar")
+- /DocumentoDespacho/monitorsalida: tabla de órdenes estilo DataTables y el
+  asistente de 5 pasos (ubicación con radios, stock con filas rojas, operario,
+  "Crear OT" con modal de confirmación)
+- /OrdenTrabajo/index: listado de OTs creadas
+- Sesión: el login entrega una cookie con vencimiento (`sesion` segundos); sin
+  ella las páginas redirigen al login
+
+La tabla imita lo que usa la automatización de DataTables: cuadro de búsqueda,
+selector de largo de página, indicador de procesamiento, texto de info y, si
+`api=True`, un jQuery mínimo con jQuery.fn.dataTable (settings, tables(),
+ajax.reload(), eventos draw.dt/processing.dt).
+
+Uso:
+    python bench/mock_wms.py --ordenes 1000 --latencia 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from http.cookies import SimpleCookie
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from datos import make_references
+
+
+COOKIE_SESION = ".AspNetCore.Cookies"
+
+UBICACIONES_CANALES = [
+    "ZDESP-FALA-01", "ZDESP-FLEXMELI-01", "ZDESP-BULKYMELI-01", "ZDESP-WALMAT-01",
+    "ZDESP-PARIS-01", "ZDESP-RIPLEY-01", "ZDESP-01-01",
+]
+
+
+MINITABLA_JS = r"""
+(function () {
+    var CONFIG = window.MOCK;
+    var handlers = {};
+    var settingsList = [];
+
+    function disparar(evento) {
+        (handlers[evento] || []).forEach(function (fn) { fn({type: evento}); });
+    }
+    function visible(el) {
+        return !!el.getClientRects().length;
+    }
+
+    function Api(lista) {
+        var api = this;
+        this.lista = lista;
+        this.length = lista.length;
+        this.ajax = {
+            url: function () { return lista.length ? lista[0].url : undefined; },
+            reload: function () {
+                lista.forEach(function (t) { if (t.url) t.cargar(t.url, t.cuerpo); });
+                return api;
+            }
+        };
+        this.page = {
+            len: function (n) {
+                lista.forEach(function (t) { t.largo = n; t.pagina = 0; });
+                return api;
+            },
+            info: function () {
+                var t = lista[0];
+                return {recordsDisplay: t.filtrados.length, recordsTotal: t.datos.length, length: t.largo};
+            }
+        };
+    }
+    Api.prototype.search = function (valor) {
+        if (valor === undefined) return this.lista.length ? this.lista[0].busqueda : '';
+        this.lista.forEach(function (t) { t.buscar(valor, false); });
+        return this;
+    };
+    Api.prototype.draw = function () {
+        this.lista.forEach(function (t) { t.dibujar(); });
+        return this;
+    };
+
+    if (CONFIG.api) {
+        var jq = function () {
+            return {
+                on: function (eventos, fn) {
+                    eventos.split(/\s+/).forEach(function (e) { (handlers[e] = handlers[e] || []).push(fn); });
+                    return this;
+                }
+            };
+        };
+        jq.fn = {dataTable: {
+            settings: settingsList,
+            tables: function () {
+                return new Api(settingsList.filter(function (s) { return visible(s.nTable); })
+                                           .map(function (s) { return s.oInstance; }));
+            }
+        }};
+        window.jQuery = window.$ = jq;
+    }
+
+    function MiniTabla(raiz, columnas, renderFila, largo) {
+        var t = this;
+        this.columnas = columnas;
+        this.renderFila = renderFila;
+        this.datos = [];
+        this.filtrados = [];
+        this.busqueda = '';
+        this.largo = largo || 10;
+        this.pagina = 0;
+        this.pendientes = 0;
+
+        raiz.innerHTML =
+            '<div class="dataTables_wrapper">' +
+            '<div class="dataTables_length"><label>Mostrar <select>' +
+            '<option value="10">10</option><option value="25">25</option><option value="50">50</option>' +
+            '<option value="100">100</option><option value="-1">Todos</option></select> registros</label></div>' +
+            '<div class="dataTables_filter"><label>Buscar: <input type="search"></label></div>' +
+            '<div class="dataTables_processing" style="display:none">Procesando...</div>' +
+            '<table class="table"><thead><tr>' +
+            columnas.map(function (c) { return '<th>' + c + '</th>'; }).join('') +
+            '</tr></thead><tbody><tr><td colspan="' + columnas.length + '">Cargando...</td></tr></tbody></table>' +
+            '<div class="dataTables_info">Mostrando 0 a 0 de 0 registros</div>' +
+            '<div class="dataTables_paginate">' +
+            '<button class="paginate_button previous">Anterior</button>' +
+            '<button class="paginate_button next">Siguiente</button></div></div>';
+
+        this.select = raiz.querySelector('.dataTables_length select');
+        this.input = raiz.querySelector('input[type=search]');
+        this.proc = raiz.querySelector('.dataTables_processing');
+        this.table = raiz.querySelector('table');
+        this.tbody = raiz.querySelector('tbody');
+        this.info = raiz.querySelector('.dataTables_info');
+        this.select.value = String(this.largo);
+        this.settings = {nTable: this.table, iDraw: 0, oPreviousSearch: {sSearch: ''}, oInstance: this};
+        settingsList.push(this.settings);
+
+        this.select.addEventListener('change', function () {
+            t.largo = parseInt(t.select.value, 10);
+            t.pagina = 0;
+            t.dibujar();
+        });
+        this.input.addEventListener('input', function () { t.buscar(t.input.value, true); });
+        raiz.querySelector('.previous').addEventListener('click', function () {
+            if (t.pagina > 0) { t.pagina--; t.dibujar(); }
+        });
+        raiz.querySelector('.next').addEventListener('click', function () {
+            if (t.largo > 0 && (t.pagina + 1) * t.largo < t.filtrados.length) { t.pagina++; t.dibujar(); }
+        });
+    }
+
+    MiniTabla.prototype.procesando = function (si) {
+        this.proc.style.display = si ? 'block' : 'none';
+        disparar('processing.dt');
+    };
+
+    MiniTabla.prototype.buscar = function (valor, dibujar) {
+        this.busqueda = valor;
+        this.settings.oPreviousSearch.sSearch = valor;
+        this.input.value = valor;
+        this.pagina = 0;
+        if (dibujar) this.dibujar();
+    };
+
+    MiniTabla.prototype.cargar = function (url, cuerpo) {
+        var t = this;
+        this.url = url;
+        this.cuerpo = cuerpo;
+        this.procesando(true);
+        var opciones = cuerpo ? {method: 'POST', body: JSON.stringify(cuerpo)} : {};
+        return fetch(url, opciones).then(function (r) { return r.json(); }).then(function (datos) {
+            t.datos = datos.map(function (fila) {
+                fila._texto = t.columnas.map(function (c) { return fila[c] === undefined ? '' : String(fila[c]); })
+                                        .join(' ').toLowerCase();
+                return fila;
+            });
+            t.procesando(false);
+            t.dibujar();
+        });
+    };
+
+    MiniTabla.prototype.dibujar = function () {
+        var t = this;
+        t.pendientes++;
+        t.procesando(true);
+        setTimeout(function () {
+            t.pendientes--;
+            var q = t.busqueda.toLowerCase();
+            t.filtrados = t.datos.filter(function (fila) { return !q || fila._texto.indexOf(q) >= 0; });
+            var inicio = t.largo < 0 ? 0 : t.pagina * t.largo;
+            var fin = t.largo < 0 ? t.filtrados.length : Math.min(inicio + t.largo, t.filtrados.length);
+            t.tbody.innerHTML = '';
+            if (!t.filtrados.length) {
+                t.tbody.innerHTML = '<tr><td class="dataTables_empty" colspan="' + t.columnas.length +
+                                    '">Ningún dato disponible</td></tr>';
+            }
+            for (var i = inicio; i < fin; i++) t.tbody.appendChild(t.renderFila(t.filtrados[i]));
+            t.info.textContent = t.filtrados.length
+                ? 'Mostrando ' + (inicio + 1) + ' a ' + fin + ' de ' + t.filtrados.length + ' registros'
+                : 'Mostrando 0 a 0 de 0 registros';
+            t.settings.iDraw++;
+            disparar('draw.dt');
+            if (!t.pendientes) t.procesando(false);
+        }, CONFIG.latencia);
+    };
+
+    window.MiniTabla = MiniTabla;
+})();
+"""
+
+
+ESTILO = """
+<style>
+  body { font-family: sans-serif; margin: 20px; }
+  .steps li { display: inline-block; margin-right: 12px; color: #999; }
+  .steps li.current { color: #000; font-weight: bold; }
+  tr.danger { background-color: #f8d7da; }
+  .modal { position: fixed; top: 30%; left: 35%; background: #fff; border: 1px solid #333; padding: 20px; }
+  .alert { background: #d4edda; padding: 10px; margin: 10px 0; }
+</style>
+"""
+
+
+LOGIN_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>WMS - Login</title>""" + ESTILO + """</head>
+<body>
+  <h2>WMS de prueba</h2>
+  <form method="post" action="/login">
+    <input type="text" name="usuario" placeholder="Usuario">
+    <input type="password" name="clave" placeholder="Clave">
+    <button type="submit">Ingresar</button>
+  </form>
+</body></html>
+"""
+
+
+INICIO_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>WMS - Inicio</title>""" + ESTILO + """</head>
+<body>
+  <h2>Bienvenido</h2>
+  <a href="/DocumentoDespacho/monitorsalida">Monitor de salida</a>
+  <a href="/OrdenTrabajo/index">Órdenes de trabajo</a>
+</body></html>
+"""
+
+
+MONITOR_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>WMS - Monitor de salida</title>""" + ESTILO + """
+<script>window.MOCK = __CONFIG__;</script>
+<script src="/static/minitabla.js"></script>
+</head>
+<body>
+  <ul class="steps">
+    <li class="current">1. Órdenes</li><li>2. Ubicación</li><li>3. Stock</li><li>4. Operario</li><li>5. Confirmar</li>
+  </ul>
+
+  <section id="paso1">
+    <h3>Órdenes de despacho</h3>
+    <div id="ordenes"></div>
+    <button class="siguiente">Siguiente paso</button>
+  </section>
+
+  <section id="paso2" hidden>
+    <h3>Ubicación de destino</h3>
+    <table class="table"><thead><tr><th></th><th>Ubicación</th><th>Descripción</th></tr></thead>
+      <tbody id="ubicaciones"></tbody></table>
+    <button class="siguiente">Siguiente paso</button>
+  </section>
+
+  <section id="paso3" hidden>
+    <h3>Disponibilidad de stock</h3>
+    <div id="stock"></div>
+    <button class="siguiente">Siguiente paso</button>
+  </section>
+
+  <section id="paso4" hidden>
+    <h3>Operario</h3>
+    <select><option>Operario 1</option><option>Operario 2</option></select>
+    <button class="siguiente">Siguiente paso</button>
+  </section>
+
+  <section id="paso5" hidden>
+    <h3>Confirmar orden de trabajo</h3>
+    <div><label><input type="checkbox"> Prioridad alta</label></div>
+    <div><label><input type="checkbox"> Reposición</label></div>
+    <div><label><input type="checkbox" id="consolidado"> Picking consolidado</label></div>
+    <button id="crear">Crear OT</button>
+  </section>
+
+  <div class="modal" id="modal" style="display:none">
+    <p>¿Desea crear la orden de trabajo?</p>
+    <button id="si">Si</button> <button id="no">No</button>
+  </div>
+  <div class="alert" id="alerta" style="display:none"></div>
+
+<script>
+  var paso = 1;
+  function elemento(html) {
+    var tbody = document.createElement('tbody');
+    tbody.innerHTML = html;
+    return tbody.firstChild;
+  }
+
+  var ordenes = new MiniTabla(document.getElementById('ordenes'),
+    ['Referencia', 'Cliente', 'Comuna', 'Estado'],
+    function (fila) {
+      var tr = elemento('<tr><td><input type="checkbox"' + (fila._marcada ? ' checked' : '') + '></td>' +
+                        '<td>' + fila.Referencia + '</td><td>' + fila.Cliente + '</td>' +
+                        '<td>' + fila.Comuna + '</td><td>' + fila.Estado + '</td></tr>');
+      tr.querySelector('input').addEventListener('change', function (e) { fila._marcada = e.target.checked; });
+      return tr;
+    });
+  ordenes.table.querySelector('thead tr').insertBefore(document.createElement('th'),
+                                                       ordenes.table.querySelector('thead th'));
+  ordenes.cargar('/api/ordenes');
+
+  var stock = new MiniTabla(document.getElementById('stock'), ['SKU', 'Descripcion', 'Cantidad', 'Disponible'],
+    function (fila) {
+      return elemento('<tr' + (fila.sin_stock ? ' class="danger"' : '') + '><td>' + fila.SKU + '</td>' +
+                      '<td>' + fila.Descripcion + '</td><td>' + fila.Cantidad + '</td>' +
+                      '<td>' + fila.Disponible + '</td></tr>');
+    }, -1);
+
+  function seleccionadas() {
+    return ordenes.datos.filter(function (f) { return f._marcada; }).map(function (f) { return f.Referencia; });
+  }
+  function ubicacion() {
+    var radio = document.querySelector('#ubicaciones input[type=radio]:checked');
+    return radio ? radio.value : null;
+  }
+
+  function irA(n) {
+    document.getElementById('paso' + paso).hidden = true;
+    paso = n;
+    document.querySelectorAll('.steps li').forEach(function (li, i) {
+      li.className = i + 1 === n ? 'current' : '';
+    });
+    document.getElementById('paso' + n).hidden = false;
+  }
+
+  document.querySelectorAll('.siguiente').forEach(function (boton) {
+    boton.addEventListener('click', function () {
+      if (paso === 1) {
+        if (!seleccionadas().length) return alert('Seleccione al menos una orden');
+        fetch('/api/ubicaciones').then(function (r) { return r.json(); }).then(function (lista) {
+          document.getElementById('ubicaciones').innerHTML = lista.map(function (u) {
+            return '<tr><td><input type="radio" name="ubicacion" value="' + u + '"></td>' +
+                   '<td>' + u + '</td><td>Zona de despacho ' + u + '</td></tr>';
+          }).join('');
+          irA(2);
+        });
+      } else if (paso === 2) {
+        irA(3);
+        stock.cargar('/api/stock', {ordenes: seleccionadas()});
+      } else {
+        irA(paso + 1);
+      }
+    });
+  });
+
+  document.getElementById('crear').addEventListener('click', function () {
+    document.getElementById('modal').style.display = 'block';
+  });
+  document.getElementById('no').addEventListener('click', function () {
+    document.getElementById('modal').style.display = 'none';
+  });
+  document.getElementById('si').addEventListener('click', function () {
+    var cuerpo = {ordenes: seleccionadas(), ubicacion: ubicacion(),
+                  consolidado: document.getElementById('consolidado').checked};
+    fetch('/api/ot', {method: 'POST', body: JSON.stringify(cuerpo)})
+      .then(function (r) { return r.json(); })
+      .then(function (respuesta) {
+        document.getElementById('modal').style.display = 'none';
+        var alerta = document.getElementById('alerta');
+        alerta.textContent = 'Orden de trabajo ' + respuesta.ot + ' creada';
+        alerta.style.display = 'block';
+      });
+  });
+</script>
+</body></html>
+"""
+
+
+OTS_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>WMS - Órdenes de trabajo</title>""" + ESTILO + """
+<script>window.MOCK = __CONFIG__;</script>
+<script src="/static/minitabla.js"></script>
+</head>
+<body>
+  <h3>Órdenes de trabajo</h3>
+  <div id="ots"></div>
+<script>
+  var ots = new MiniTabla(document.getElementById('ots'), ['Codigo', 'Ubicacion', 'Estado', 'Creada', 'Ordenes'],
+    function (fila) {
+      var tr = document.createElement('tr');
+      tr.innerHTML = '<td>' + fila.Codigo + '</td><td>' + fila.Ubicacion + '</td><td>' + fila.Estado + '</td>' +
+                     '<td>' + fila.Creada + '</td><td>' + fila.Ordenes + '</td>';
+      return tr;
+    }, 25);
+  ots.cargar('/api/ots');
+</script>
+</body></html>
+"""
+
+
+class MockWMS:
+    """Estado del WMS de prueba y servidor HTTP en un hilo aparte."""
+
+    def __init__(self, ordenes=200, latencia=0.2, sin_stock=0.05, api=True, canal="Falabella", seed=1,
+                 sesion=8 * 3600):
+        self.latencia = latencia
+        self.sesion = sesion
+        self.sesiones = {}  # token -> vencimiento
+        self.sin_stock = sin_stock
+        self.api = api
+        self.canal = canal
+        self.seed = seed
+        rnd = random.Random(seed)
+        comunas = ["Santiago", "Maipú", "Puente Alto", "Las Condes", "La Florida", "Ñuñoa", "Quilicura"]
+        self.orders = [{
+            "Referencia": ref,
+            "Cliente": f"Cliente {rnd.randrange(1, 5000)}",
+            "Comuna": rnd.choice(comunas),
+            "Estado": "PENDIENTE",
+        } for ref in make_references(canal, ordenes, seed)]
+        self.ubicaciones = sorted(set(UBICACIONES_CANALES + [f"ZDESP-{i:02d}-{j:02d}"
+                                                             for i in range(1, 11) for j in range(1, 11)]))
+        self.ots = []
+        self.next_ot = 98400 + rnd.randrange(100)
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def references(self, n, missing=0):
+        """`n` referencias del monitor y `missing` que no existen (para las NO ENCONTRADAS)."""
+        refs = [o["Referencia"] for o in self.orders[:n]]
+        if missing:
+            existentes = {o["Referencia"] for o in self.orders}
+            extra = [r for r in make_references(self.canal, n + missing * 2, self.seed + 1000)
+                     if r not in existentes]
+            refs += extra[:missing]
+        return refs
+
+    def stock_rows(self, ordenes):
+        rnd = random.Random(f"stock:{self.seed}:{len(ordenes)}")
+        filas = []
+        for i, ref in enumerate(ordenes):
+            sin_stock = rnd.random() < self.sin_stock
+            cantidad = rnd.randrange(1, 5)
+            filas.append({
+                "SKU": f"SKU{100000 + i}",
+                "Descripcion": f"Producto de la orden {ref}",
+                "Cantidad": cantidad,
+                "Disponible": 0 if sin_stock else cantidad + rnd.randrange(0, 20),
+                "sin_stock": sin_stock,
+            })
+        return filas
+
+    def login(self):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sesiones[token] = time.time() + self.sesion
+        return token
+
+    def session_valid(self, token):
+        with self.lock:
+            return time.time() < self.sesiones.get(token, 0)
+
+    def create_ot(self, cuerpo):
+        with self.lock:
+            codigo = f"PCKM{self.next_ot:09d}"
+            self.next_ot += 1
+            self.ots.insert(0, {
+                "Codigo": codigo,
+                "Ubicacion": cuerpo.get("ubicacion") or "",
+                "Estado": "CREADA",
+                "Creada": datetime.now().isoformat(timespec="milliseconds"),
+                "Ordenes": len(cuerpo.get("ordenes") or []),
+            })
+        return codigo
+
+    def start(self, host="127.0.0.1", port=0):
+        """Levanta el servidor (puerto 0 = uno libre) y devuelve su URL base."""
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    def send(self, cuerpo, tipo="text/html; charset=utf-8", status=200):
+        datos = cuerpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(datos)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def send_json(self, datos):
+        time.sleep(self.mock.latencia)
+        self.send(json.dumps(datos, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def page(self, html):
+        config = json.dumps({"latencia": int(self.mock.latencia * 1000), "api": self.mock.api})
+        self.send(html.replace("__CONFIG__", config))
+
+    def logged_in(self):
+        cookie = SimpleCookie(self.headers.get("Cookie") or "")
+        return COOKIE_SESION in cookie and self.mock.session_valid(cookie[COOKIE_SESION].value)
+
+    def redirect(self, destino, cookie=None):
+        self.send_response(303 if cookie else 302)
+        self.send_header("Location", destino)
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def read_json(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        crudo = self.rfile.read(largo) if largo else b""
+        try:
+            return json.loads(crudo or b"{}")
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        ruta = urlparse(self.path).path.rstrip("/").lower()
+        if ruta in ("", "/login"):
+            self.send(LOGIN_HTML)
+        elif ruta == "/home":
+            self.send(INICIO_HTML)
+        elif ruta in ("/documentodespacho/monitorsalida", "/ordentrabajo/index") and not self.logged_in():
+            self.redirect("/")
+        elif ruta == "/documentodespacho/monitorsalida":
+            self.page(MONITOR_HTML)
+        elif ruta == "/ordentrabajo/index":
+            self.page(OTS_HTML)
+        elif ruta == "/static/minitabla.js":
+            self.send(MINITABLA_JS, "application/javascript; charset=utf-8")
+        elif ruta == "/api/ordenes":
+            self.send_json(self.mock.orders)
+        elif ruta == "/api/ubicaciones":
+            self.send_json(self.mock.ubicaciones)
+        elif ruta == "/api/ots":
+            self.send_json(self.mock.ots)
+        else:
+            self.send("No encontrado", "text/plain; charset=utf-8", 404)
+
+    def do_POST(self):
+        ruta = urlparse(self.path).path.rstrip("/").lower()
+        if ruta == "/login":
+            token = self.mock.login()
+            self.redirect("/Home", f"{COOKIE_SESION}={token}; Max-Age={self.mock.sesion}; Path=/; HttpOnly")
+        elif ruta == "/api/stock":
+            self.send_json(self.mock.stock_rows(self.read_json().get("ordenes") or []))
+        elif ruta == "/api/ot":
+            self.send_json({"ok": True, "ot": self.mock.create_ot(self.read_json())})
+        else:
+            self.send("No encontrado", "text/plain; charset=utf-8", 404)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor WMS de prueba para WMSAutomation")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--ordenes", type=int, default=500, help="órdenes en el monitor")
+    parser.add_argument("--latencia", type=float, default=0.2, help="segundos por llamada a la API y por dibujo")
+    parser.add_argument("--sin-stock", type=float, default=0.05, help="fracción de filas rojas en el paso de stock")
+    parser.add_argument("--canal", default="Falabella", help="formato de las referencias")
+    parser.add_argument("--sin-api", action="store_true", help="sin jQuery.fn.dataTable (solo el DOM)")
+    parser.add_argument("--sesion", type=int, default=8 * 3600, help="segundos de vigencia de la cookie de login")
+    args = parser.parse_args(argv)
+
+    mock = MockWMS(ordenes=args.ordenes, latencia=args.latencia, sin_stock=args.sin_stock,
+                   api=not args.sin_api, canal=args.canal, sesion=args.sesion)
+    url = mock.start(port=args.puerto)
+    print(f"WMS de prueba en {url} ({args.ordenes} órdenes {args.canal}, latencia {args.latencia}s)")
+    print("Referencias de ejemplo:", ", ".join(mock.references(5)))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Bitácora (load_journal / last_journal) e historial (RunHistory) de corridas."""
+
+import json
+import time
+
+from wms_corridas import RunHistory, RunJournal, last_journal, load_journal
+
+
+def write_journal(path, eventos, truncada=None):
+    """Escribe una bitácora con `eventos` (tipo, campos) y, opcionalmente, una última línea a medias."""
+    journal = RunJournal(str(path))
+    for tipo, campos in eventos:
+        journal.write(tipo, **campos)
+    journal.file.close()
+    if truncada:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(truncada)
+    return str(path)
+
+
+INICIO = ("inicio", {"canal": "Falabella", "ubicacion": "ZDESP-FALA-01", "referencias": ["a1", "a2", "b1", "b2", "c1"]})
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    ruta = write_journal(tmp_path / "bitacora.jsonl", [
+        INICIO,
+        ("ref", {"tramo": 1, "ref": "a1", "estado": "seleccionada"}),
+        ("ref", {"tramo": 1, "ref": "a2", "estado": "seleccionada"}),
+        ("ot", {"tramo": 1, "ot": "PCKM000000001", "referencias": 2, "sin_stock": ["SKU1"]}),
+    ], truncada='{"tipo": "ref", "tramo": 2, "ref": "b1", "est')
+
+    estado = load_journal(ruta)
+
+    assert estado["confirmadas"] == ["a1", "a2"]
+    assert estado["ots"] == [{"ot": "PCKM000000001", "referencias": 2, "sin_stock": ["SKU1"]}]
+    assert estado["ot_por_referencia"] == {"a1": "PCKM000000001", "a2": "PCKM000000001"}
+    assert estado["pendientes"] == ["b1", "b2", "c1"]
+    assert not estado["terminada"]
+
+
+def test_crash_after_confirmando_is_sin_captura(tmp_path):
+    ruta = write_journal(tmp_path / "bitacora.jsonl", [
+        INICIO,
+        ("ref", {"tramo": 1, "ref": "a1", "estado": "seleccionada"}),
+        ("ref", {"tramo": 1, "ref": "a2", "estado": "no_encontrada"}),
+        ("paso", {"tramo": 1, "paso": "ubicacion"}),
+        ("confirmando", {"tramo": 1}),
+        ("ref", {"tramo": 2, "ref": "b1", "estado": "seleccionada"}),
+        ("paso", {"tramo": 2, "paso": "stock"}),
+    ])
+
+    estado = load_journal(ruta)
+
+    # La OT del tramo 1 puede existir: sus referencias no vuelven a pendientes
+    assert [p["seleccionadas"] for p in estado["sin_captura"]] == [["a1"]]
+    assert estado["sin_captura"][0]["tramo"] == 1
+    assert estado["confirmadas"] == []
+    assert estado["no_encontradas"] == ["a2"]
+    # El tramo 2 no llegó a confirmar: se vuelve a seleccionar
+    assert estado["pendientes"] == ["b1", "b2", "c1"]
+    assert estado["ultimo_paso"] == "stock (tramo 2)"
+    assert estado["tramos"] == 2
+
+
+def test_omitted_refs_are_not_pending(tmp_path):
+    ruta = write_journal(tmp_path / "bitacora.jsonl", [
+        INICIO,
+        ("ref", {"tramo": 1, "ref": "a2", "estado": "omitida", "ot": "PCKM000000007", "fecha": "2026-10-17 09:30"}),
+        ("ref", {"tramo": 1, "ref": "c1", "estado": "omitida", "ot": None, "fecha": "2026-10-17 09:30"}),
+        ("ref", {"tramo": 1, "ref": "a1", "estado": "seleccionada"}),
+    ])
+
+    estado = load_journal(ruta)
+
+    assert estado["omitidas"] == [
+        {"referencia": "a2", "ot": "PCKM000000007", "fecha": "2026-10-17 09:30"},
+        {"referencia": "c1", "ot": None, "fecha": "2026-10-17 09:30"},
+    ]
+    assert estado["pendientes"] == ["a1", "b1", "b2"]
+
+
+def test_failed_chunk_stays_pending(tmp_path):
+    ruta = write_journal(tmp_path / "bitacora.jsonl", [
+        INICIO,
+        ("ref", {"tramo": 1, "ref": "a1", "estado": "seleccionada"}),
+        ("ot", {"tramo": 1, "ot": "PCKM000000001", "referencias": 1, "sin_stock": []}),
+        ("ref", {"tramo": 2, "ref": "b1", "estado": "seleccionada"}),
+        ("error", {"tramo": 2, "error": "RuntimeError: La tabla no cargó"}),
+        ("fin", {"resultado": "parcial", "ots": ["PCKM000000001"]}),
+    ])
+
+    estado = load_journal(ruta)
+
+    assert not estado["terminada"]
+    assert estado["pendientes"] == ["a2", "b1", "b2", "c1"]
+    assert last_journal(str(tmp_path))["ruta"] == ruta
+
+
+def test_streaming_journal_without_references_has_no_pending_list(tmp_path):
+    ruta = write_journal(tmp_path / "bitacora.jsonl", [
+        ("inicio", {"canal": "Paris", "ubicacion": "ZDESP", "referencias": None, "pdfs": ["m.pdf"]}),
+    ])
+
+    estado = load_journal(ruta)
+
+    assert estado["pendientes"] is None
+    assert estado["pdfs"] == ["m.pdf"]
+
+
+def test_last_journal_skips_finished_runs(tmp_path):
+    write_journal(tmp_path / "bitacora_1.jsonl", [INICIO, ("ref", {"tramo": 1, "ref": "a1", "estado": "seleccionada"})])
+    write_journal(tmp_path / "bitacora_2.jsonl", [INICIO, ("fin", {"resultado": "ok", "ots": []})])
+
+    assert last_journal(str(tmp_path))["ruta"].endswith("bitacora_1.jsonl")
+    assert last_journal(str(tmp_path / "no_existe")) is None
+
+
+def test_journal_lines_are_json(tmp_path):
+    journal = RunJournal(str(tmp_path / "sub" / "bitacora.jsonl"))
+    journal.write("ref", tramo=1, ref="ñ1", estado="seleccionada")
+    journal.close(resultado="ok")
+    journal.write("ref", tramo=1, ref="tarde", estado="seleccionada")  # Tras cerrar no escribe
+
+    with open(journal.path, encoding="utf-8") as f:
+        eventos = [json.loads(linea) for linea in f]
+
+    assert [e["tipo"] for e in eventos] == ["ref", "fin"]
+    assert eventos[0]["ref"] == "ñ1"
+
+
+def corrida(id, **campos):
+    return {"id": id, "canal": "Falabella", "inicio": time.time(), "segundos": 60, "resultado": "ok", **campos}
+
+
+def test_recent_ots(tmp_path):
+    history = RunHistory(str(tmp_path / "historial.sqlite"))
+    history.record_ot("c1", "Falabella", "PCKM000000001", ["a1", "a2"])
+    history.record_ot("c1", "Falabella", None, ["b1"])  # Confirmada sin número capturado
+    history.record_run(corrida("c1"), [("a1", "en_ot", "PCKM000000001"), ("a2", "en_ot", "PCKM000000001"),
+                                       ("b1", "en_ot", None), ("c1", "seleccionada", None),
+                                       ("d1", "no_encontrada", None)],
+                       [{"ot": "PCKM000000001", "referencias": 2}, {"ot": None, "referencias": 1}], [], [])
+    history.record_ot("c2", "Paris", "PCKM000000009", ["e1"])
+
+    previas = history.recent_ots(["a1", "b1", "c1", "d1", "e1", "z1"], "Falabella", dias=2)
+
+    assert {ref: ot for ref, (ot, _) in previas.items()} == {"a1": "PCKM000000001", "b1": None}
+    assert history.recent_ots(["e1"], "Paris", dias=2)["e1"][0] == "PCKM000000009"
+    history.close()
+
+
+def test_recent_ots_ignores_old_runs(tmp_path):
+    history = RunHistory(str(tmp_path / "historial.sqlite"))
+    history.record_ot("c1", "Falabella", "PCKM000000001", ["a1"])
+    history.conn.execute("UPDATE referencias SET hora = hora - 3 * 86400")
+    history.conn.commit()
+
+    assert history.recent_ots(["a1"], "Falabella", dias=2) == {}
+    assert "a1" in history.recent_ots(["a1"], "Falabella", dias=4)
+    history.close()
+
+
+def test_record_run_does_not_duplicate_recorded_ots(tmp_path):
+    history = RunHistory(str(tmp_path / "historial.sqlite"))
+    history.record_ot("c1", "Falabella", "PCKM000000001", ["a1", "a2"])
+    history.record_run(corrida("c1"), [("a1", "en_ot", "PCKM000000001"), ("a2", "en_ot", "PCKM000000001"),
+                                       ("x1", "no_encontrada", None), ("o1", "omitida", "PCKM000000000")],
+                       [{"ot": "PCKM000000001", "referencias": 2}], ["SKU1"],
+                       [{"paso": "login", "n": 1, "fallidos": 0, "p50": 1.0, "p95": 1.0, "total": 1.0}])
+
+    referencias = history.conn.execute("SELECT referencia, estado FROM referencias ORDER BY referencia").fetchall()
+    assert referencias == [("a1", "en_ot"), ("a2", "en_ot"), ("o1", "omitida"), ("x1", "no_encontrada")]
+    assert history.conn.execute("SELECT COUNT(*) FROM ots").fetchone() == (1,)
+
+    fila = history.trends()[0]
+    assert (fila["corridas"], fila["referencias"], fila["seleccionadas"], fila["no_encontradas"],
+            fila["omitidas"], fila["ots"], fila["ordenes_min"]) == (1, 4, 2, 1, 1, 1, 2.0)
+    history.close()
+
+
+def test_not_found_refs_are_retried_after_an_error(tmp_path):
+    # Chrome se cayó en el tramo 2: cada búsqueda que siguió quedó como no encontrada
+    eventos = [
+        INICIO,
+        ("ref", {"tramo": 1, "ref": "a1", "estado": "seleccionada"}),
+        ("ref", {"tramo": 1, "ref": "a2", "estado": "no_encontrada"}),
+        ("ot", {"tramo": 1, "ot": "PCKM000000001", "referencias": 1, "sin_stock": []}),
+        ("ref", {"tramo": 2, "ref": "b1", "estado": "no_encontrada"}),
+        ("ref", {"tramo": 2, "ref": "b2", "estado": "no_encontrada"}),
+        ("ref", {"tramo": 2, "ref": "c1", "estado": "no_encontrada"}),
+    ]
+    ruta = write_journal(tmp_path / "bitacora.jsonl", eventos + [("fin", {"resultado": "error", "ots": ["PCKM000000001"]})])
+
+    estado = load_journal(ruta)
+
+    assert estado["no_encontradas"] == []
+    assert estado["pendientes"] == ["a2", "b1", "b2", "c1"]
+    assert last_journal(str(tmp_path))["ruta"] == ruta
+
+    # Si la corrida terminó bien, las no encontradas son definitivas
+    ruta = write_journal(tmp_path / "terminada.jsonl", eventos + [("fin", {"resultado": "sin_ot", "ots": []})])
+    assert load_journal(ruta)["no_encontradas"] == ["a2", "b1", "b2", "c1"]
+    assert load_journal(ruta)["pendientes"] == []
@@ -0,0 +1,143 @@
+"""Extracción de manifiestos (wms_extraccion) sobre el corpus sintético de bench/corpus.py."""
+
+import pdfplumber
+import pytest
+
+import wms_extraccion
+from bench.corpus import generate_corpus, load_corpus
+from wms_extraccion import (CANALES, SCANNER, ExtractionCache, ReferenceStream, classify_pdfs, detect_canal_from_pdf,
+                            extract_references_parallel, reference_chunks)
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    """Un manifiesto de texto de 2 páginas por canal, sin PDF de imagen (sin OCR)."""
+    directorio = str(tmp_path_factory.mktemp("corpus"))
+    generate_corpus(directorio, paginas=(2,), densidad=12, paginas_ocr=0)
+    return {archivo["canal"]: archivo for archivo in load_corpus(directorio)["archivos"]}
+
+
+def first_page_text(ruta):
+    with pdfplumber.open(ruta) as pdf:
+        return pdf.pages[0].extract_text() or ""
+
+
+def test_corpus_covers_every_canal(corpus):
+    assert sorted(corpus) == sorted(CANALES)
+
+
+def test_mixed_canal_scan(corpus):
+    textos = {canal: first_page_text(archivo["ruta"]) for canal, archivo in corpus.items()}
+
+    # Una sola pasada por el texto de todos los canales juntos
+    scan = SCANNER.scan_text("\n".join(textos.values()))
+
+    for canal, archivo in corpus.items():
+        # Cada canal encuentra las referencias de la primera página de su manifiesto, y solo esas
+        propias = SCANNER.scan_text(textos[canal])["refs"][canal]
+        assert propias == archivo["referencias"][:len(propias)]
+        assert len(propias) >= 10
+        assert scan["refs"][canal] == propias
+        assert scan["conteos"][canal] == len(propias)
+    assert {"falabella", "ripley"} <= set(scan["keywords"])
+
+
+@pytest.mark.parametrize("canal", sorted(CANALES))
+def test_detect_canal(corpus, canal):
+    assert detect_canal_from_pdf(corpus[canal]["ruta"]) == canal
+
+
+def test_classify_pdfs_reuses_the_shared_pool(corpus):
+    rutas = {canal: corpus[canal]["ruta"] for canal in ("Falabella", "Ripley", "Paris")}
+
+    dos = classify_pdfs([rutas["Falabella"], rutas["Ripley"]], workers=2)
+    pool = wms_extraccion.process_pool()
+    tres = classify_pdfs(list(rutas.values()), workers=3)
+
+    assert dos == {rutas["Falabella"]: "Falabella", rutas["Ripley"]: "Ripley"}
+    assert tres == {ruta: canal for canal, ruta in rutas.items()}
+    assert wms_extraccion.process_pool() is pool
+
+
+def test_extract_mixed_pdfs_with_cache(corpus, tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    rutas = [corpus["Falabella"]["ruta"], corpus["Ripley"]["ruta"]]
+
+    primera = extract_references_parallel(rutas, "Falabella", workers=1, cache_path=cache_path)
+    segunda = extract_references_parallel(rutas, "Falabella", workers=1, cache_path=cache_path)
+
+    assert primera["referencias"] == corpus["Falabella"]["referencias"]
+    assert segunda["referencias"] == primera["referencias"]
+    assert primera["cache"]["aciertos"] == 0
+    assert segunda["cache"] == {"aciertos": 4, "fallos": 0}
+
+
+def test_extraction_cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    assert cache.file_pages("archivo") is None
+
+    cache.put(files={"archivo": ["p1", "p2"]}, pages={"p1:escaneo": {"refs": ["a1"]}, "p2:escaneo": {"refs": []}})
+
+    assert cache.file_pages("archivo") == ["p1", "p2"]
+    assert cache.get_pages(["p1:escaneo", "p2:escaneo", "p3:escaneo"]) == {
+        "p1:escaneo": {"refs": ["a1"]}, "p2:escaneo": {"refs": []}}
+    cache.close()
+
+
+def test_extraction_cache_evicts_least_recently_used(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), max_mb=0.25)
+    relleno = ["x" * 40] * 50  # ~2 KB por página
+    cache.put(pages={"vieja:escaneo": relleno})
+    cache.conn.execute("UPDATE paginas SET usado = usado - 3600")
+    cache.conn.commit()
+
+    for lote in range(4):
+        cache.put(pages={f"p{lote}_{i}:escaneo": relleno for i in range(40)})
+
+    assert cache._size() <= cache.max_bytes
+    assert cache.get_pages(["vieja:escaneo"]) == {}
+    assert cache.get_pages(["p3_39:escaneo"])
+    cache.close()
+
+
+def test_reference_chunks():
+    assert list(reference_chunks(["a", "b", "c", "d", "e"], 2)) == [["a", "b"], ["c", "d"], ["e"]]
+    assert list(reference_chunks(["a", "b"], 5)) == [["a", "b"]]
+    assert list(reference_chunks([], 3)) == []
+
+
+def test_reference_chunks_from_stream(corpus, tmp_path):
+    stream = ReferenceStream([corpus["Paris"]["ruta"]], "Paris", workers=1, cache_path=str(tmp_path / "cache.sqlite"))
+    omitidas = set(corpus["Paris"]["referencias"][:3])
+    stream.skip = lambda refs: [ref for ref in refs if ref not in omitidas]
+
+    tramos = list(reference_chunks(stream.start(), 5))
+
+    esperadas = [ref for ref in corpus["Paris"]["referencias"] if ref not in omitidas]
+    assert [ref for tramo in tramos for ref in tramo] == esperadas
+    assert all(len(tramo) == 5 for tramo in tramos[:-1]) and 0 < len(tramos[-1]) <= 5
+    assert stream.references == corpus["Paris"]["referencias"]  # skip filtra al consumir, no al extraer
+
+
+def test_ocr_region_is_learned_with_cache(corpus, tmp_path, monkeypatch):
+    paginas = {1: ["2000012345678"], 2: ["2000087654321"]}
+    aprendidas = []
+    monkeypatch.setitem(CANALES["Mercadolibre"], "ocr_una_por_pagina", True)
+    monkeypatch.setattr(wms_extraccion, "OCR_AVAILABLE", True)
+    monkeypatch.setattr(wms_extraccion, "_load_ocr_regions", lambda: {})
+    monkeypatch.setattr(wms_extraccion, "convert_from_path",
+                        lambda ruta, dpi, first_page, last_page, **kw: list(range(first_page, last_page + 1)),
+                        raising=False)
+    monkeypatch.setattr(wms_extraccion, "_ocr_page", lambda ruta, numero, imagen, patron, region: (
+        paginas[numero], {"dpi": 150, "region": False, "caja": [0.1, 0.1, 0.3, 0.2]}))
+    monkeypatch.setattr(wms_extraccion, "_learn_ocr_region", lambda canal, cajas: aprendidas.append((canal, cajas)))
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    stats = {"aciertos": 0, "fallos": 0, "tocadas": []}
+
+    leidas = list(wms_extraccion._iter_ocr_cached(corpus["Mercadolibre"]["ruta"], "Mercadolibre", ["h1", "h2"],
+                                                  cache, stats, {}))
+
+    assert leidas == [(1, paginas[1]), (2, paginas[2])]
+    assert stats["fallos"] == 2
+    assert aprendidas == [("Mercadolibre", [[0.1, 0.1, 0.3, 0.2]] * 2)]
+    cache.close()
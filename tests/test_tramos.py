@@ -0,0 +1,132 @@
+"""OTs por tramos (WMSAutomation.process_chunks) con un navegador falso."""
+
+import json
+
+import wms_dcic_gui as wms
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+    
+    def new_window(self, tipo):
+        self.driver.abiertas += 1
+        handle = f"t{self.driver.abiertas}"
+        self.driver.window_handles.append(handle)
+        self.driver.current_window_handle = handle
+    
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    def __init__(self):
+        self.abiertas = 0
+        self.window_handles = ["t0"]
+        self.current_window_handle = "t0"
+        self.switch_to = FakeSwitchTo(self)
+    
+    def close(self):
+        self.window_handles.remove(self.current_window_handle)
+
+
+class FakeAutomation(wms.WMSAutomation):
+    """Selecciona y crea OTs sin navegador; `falla` son los tramos cuya selección lanza una excepción."""
+    
+    def __init__(self, falla=(), monitor_ok=True):
+        super().__init__("Falabella", log_callback=lambda msg: None)
+        self.driver = FakeDriver()
+        self.falla = set(falla)
+        self.monitor_ok = monitor_ok
+        self.navegaciones = 0
+    
+    def navigate_to_monitor(self):
+        self.navegaciones += 1
+        return self.monitor_ok
+    
+    def select_orders(self, references):
+        if self.tramo in self.falla:
+            raise RuntimeError("Chrome no responde")
+        for ref in references:
+            self.note_order(ref, True)
+        return list(references)
+    
+    def create_ot(self):
+        self.ot_mark = True
+        return True
+    
+    def capture_ot_number(self):
+        return f"PCKM{self.driver.current_window_handle}"
+
+
+def test_middle_chunk_failure_keeps_other_chunks():
+    automation = FakeAutomation(falla={2})
+    refs = [f"32000000{i:02d}" for i in range(9)]
+    
+    assert automation.process_chunks(refs, 3)
+    
+    # La OT del tramo 1 se leyó antes de recuperar el tramo 2, y el tramo 3 se procesó
+    assert [ot["ot"] for ot in automation.ots] == ["PCKMt0", "PCKMt1"]
+    assert automation.ref_ots[refs[0]] == "PCKMt0"
+    assert automation.ref_ots[refs[8]] == "PCKMt1"
+    assert not any(ref in automation.ref_ots for ref in refs[3:6])
+    assert [f["tramo"] for f in automation.tramos_fallidos] == [2]
+    assert automation.ot_pendiente is None
+    # Solo queda abierta la pestaña del último tramo
+    assert automation.driver.window_handles == ["t1"]
+    
+    tramos = [span for span in automation.tracer.spans if span["paso"] == "tramo"]
+    assert [span["resultado"] for span in tramos] == ["ok", "error: RuntimeError", "ok"]
+
+
+def test_chunk_failure_stops_when_monitor_does_not_reload():
+    automation = FakeAutomation(falla={2}, monitor_ok=False)
+    refs = [f"32000000{i:02d}" for i in range(9)]
+    
+    automation.process_chunks(refs, 3)
+    
+    assert [ot["ot"] for ot in automation.ots] == ["PCKMt0"]
+    assert [f["tramo"] for f in automation.tramos_fallidos] == [2]
+    assert not any(ref in automation.ref_ots for ref in refs[6:])
+
+
+class RunAutomation(FakeAutomation):
+    """FakeAutomation para run(): sin navegador ni login."""
+    
+    def start_browser(self):
+        self.driver = FakeDriver()
+        return False
+    
+    def login(self):
+        return True
+    
+    def close_browser(self, ok=True):
+        self.driver = None
+
+
+def journal_result(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f][-1]["resultado"]
+
+
+def test_failed_chunk_ends_run_as_parcial_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(wms, "BITACORA_DIR", str(tmp_path / "bitacora"))
+    monkeypatch.setattr(wms, "TRAZAS_DIR", str(tmp_path / "trazas"))
+    monkeypatch.setattr(wms, "HISTORIAL_DB", None)
+    monkeypatch.setattr(wms, "MAX_REFS_POR_OT", 3)
+    refs = [f"32000000{i:02d}" for i in range(9)]
+    
+    RunAutomation(falla={2}).run(list(refs))
+    
+    estado = wms.last_journal(wms.BITACORA_DIR)
+    assert journal_result(estado["ruta"]) == "parcial"
+    assert estado["confirmadas"] == refs[:3] + refs[6:]
+    assert estado["pendientes"] == refs[3:6]
+    
+    reanudada = RunAutomation()
+    reanudada.run(None, reanudar=estado)
+    
+    assert [ot["referencias"] for ot in reanudada.ots] == [3, 3, 3]
+    assert sorted(reanudada.orders_selected) == refs
+    assert journal_result(estado["ruta"]) == "ok"
+    assert wms.last_journal(wms.BITACORA_DIR) is None
@@ -0,0 +1,286 @@
+"""
+WMS DCIC - Bitácora e historial de corridas
+===========================================
+La bitácora (JSONL por corrida) permite reanudar una corrida interrumpida;
+el historial (SQLite) guarda cada corrida con sus referencias, OTs y tiempos
+por paso. Sin dependencias de la GUI ni de Selenium.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BITACORA_DIR = os.path.join(APP_DIR, "bitacora")
+HISTORIAL_DB = os.path.join(APP_DIR, "historial.sqlite")
+
+
+# ============== BITÁCORA DE CORRIDAS ==============
+# Si Chrome o el WMS fallan a mitad de camino, la bitácora dice qué quedó
+# hecho: qué referencias ya están en una OT, cuáles no se encontraron y si
+# "Crear OT" llegó a confirmarse. Reanudar no repite nada de eso.
+
+class RunJournal:
+    """Bitácora de una corrida: un JSONL de solo agregado, escrito evento a evento.
+    
+    Cada línea se escribe y se vacía al disco en el momento (sin fsync: resiste
+    que se caiga Chrome o el programa, no un corte de luz). Eventos:
+      - inicio: canal, ubicación, referencias (o los PDF si se extraen en streaming)
+      - referencias: lista completa, al terminar una extracción en streaming
+      - ref: resultado de una referencia en un tramo (seleccionada / no_encontrada),
+        u omitida por estar ya en una OT reciente según el historial
+      - paso: paso del asistente completado en un tramo
+      - confirmando: justo antes de confirmar "Crear OT" (desde aquí la OT puede existir)
+      - ot: OT creada en un tramo, con su número si se capturó
+      - error: un tramo que falló (sus referencias siguen pendientes)
+      - reanudacion y fin
+    """
+    
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+    
+    def write(self, tipo, **campos):
+        linea = json.dumps({"tipo": tipo, "hora": datetime.now().isoformat(timespec="seconds"), **campos},
+                           ensure_ascii=False)
+        with self.lock:
+            if self.file:
+                self.file.write(linea + "\n")
+                self.file.flush()
+    
+    def close(self, **campos):
+        self.write("fin", **campos)
+        with self.lock:
+            self.file.close()
+            self.file = None
+
+
+def load_journal(path):
+    """Estado de una corrida según su bitácora.
+    
+    Un tramo con evento "ot" está confirmado; uno que llegó a "confirmando"
+    sin "ot" puede tener la OT creada sin número capturado (sin_captura). Las
+    referencias seleccionadas en otros tramos se perdieron con el navegador y
+    vuelven a pendientes. `pendientes` es None si la extracción en streaming
+    no alcanzó a terminar (hay que volver a extraer de `pdfs`). Las omitidas
+    (ya en una OT reciente) tampoco vuelven a pendientes. Las no encontradas
+    sí, si la corrida terminó en "error" o "parcial": cuando se cae Chrome
+    durante la selección, cada búsqueda que sigue falla y queda como no
+    encontrada aunque la referencia exista.
+    """
+    estado = {"ruta": path, "canal": None, "inicio": None, "referencias": None, "pdfs": [],
+              "no_encontradas": [], "confirmadas": [], "omitidas": [], "ots": [], "sin_captura": [], "pendientes": None,
+              "ot_por_referencia": {}, "tramos": 0, "ultimo_paso": None, "terminada": False}
+    tramos = {}
+    no_encontradas = {}
+    omitidas = {}
+    final = None
+    with open(path, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                evento = json.loads(linea)
+            except ValueError:
+                continue  # Última línea a medio escribir
+            tipo = evento["tipo"]
+            tramo = tramos.setdefault(evento["tramo"], {"seleccionadas": []}) if "tramo" in evento else None
+            if tipo == "inicio":
+                estado["canal"] = evento["canal"]
+                estado["inicio"] = evento["hora"]
+                estado["referencias"] = evento.get("referencias")
+                estado["pdfs"] = evento.get("pdfs", [])
+            elif tipo == "referencias":
+                estado["referencias"] = evento["referencias"]
+            elif tipo == "ref" and evento["estado"] == "seleccionada":
+                tramo["seleccionadas"].append(evento["ref"])
+            elif tipo == "ref" and evento["estado"] == "no_encontrada":
+                no_encontradas[evento["ref"]] = True
+            elif tipo == "ref" and evento["estado"] == "omitida":
+                omitidas[evento["ref"]] = {"referencia": evento["ref"], "ot": evento.get("ot"),
+                                           "fecha": evento.get("fecha")}
+            elif tipo in ("paso", "confirmando"):
+                tramo["paso"] = evento.get("paso", tipo)
+                tramo["hora"] = evento["hora"]
+                estado["ultimo_paso"] = f"{tramo['paso']} (tramo {evento['tramo']})"
+            elif tipo == "ot":
+                tramo["ot"] = evento
+            elif tipo == "fin":
+                final = evento.get("resultado")
+                estado["terminada"] = final == "ok"
+    
+    if final in ("error", "parcial"):
+        no_encontradas = {}
+    
+    hechas = set()  # En una OT, o quizás en una (sin captura): no se vuelven a seleccionar
+    for numero, tramo in sorted(tramos.items()):
+        if "ot" in tramo:
+            estado["confirmadas"].extend(tramo["seleccionadas"])
+            estado["ot_por_referencia"].update(dict.fromkeys(tramo["seleccionadas"], tramo["ot"]["ot"]))
+            estado["ots"].append({"ot": tramo["ot"]["ot"], "referencias": len(tramo["seleccionadas"]),
+                                  "sin_stock": tramo["ot"].get("sin_stock", [])})
+        elif tramo.get("paso") == "confirmando":
+            estado["sin_captura"].append({"tramo": numero, "hora": tramo["hora"],
+                                          "seleccionadas": tramo["seleccionadas"]})
+        else:
+            continue
+        hechas.update(tramo["seleccionadas"])
+    estado["no_encontradas"] = [ref for ref in no_encontradas if ref not in hechas]
+    estado["omitidas"] = [o for ref, o in omitidas.items() if ref not in hechas]
+    estado["tramos"] = max(tramos, default=0)
+    if estado["referencias"] is not None:
+        estado["pendientes"] = [ref for ref in estado["referencias"]
+                                if ref not in hechas and ref not in no_encontradas and ref not in omitidas]
+    return estado
+
+
+def last_journal(directory=BITACORA_DIR, limite=20):
+    """Estado de la bitácora más reciente que quedó sin terminar, o None."""
+    if not os.path.isdir(directory):
+        return None
+    for nombre in sorted(os.listdir(directory), reverse=True)[:limite]:
+        if not nombre.endswith(".jsonl"):
+            continue
+        estado = load_journal(os.path.join(directory, nombre))
+        if not estado["terminada"] and estado["canal"] and (estado["pendientes"] != [] or estado["sin_captura"]):
+            return estado
+    return None
+
+
+# ============== HISTORIAL DE CORRIDAS ==============
+
+class RunHistory:
+    """Historial de corridas en SQLite: referencias, OTs, SKUs sin stock y tiempos por paso.
+    
+    Las referencias se indexan por número para saber al instante si ya están
+    en una OT reciente (recent_ots) y no pagar la búsqueda en el Monitor para
+    terminar en "NO ENCONTRADA". trends() resume el rendimiento por canal y día
+    (en consola: python wms_dcic_gui.py --historial).
+    """
+    
+    def __init__(self, path=HISTORIAL_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS corridas (
+                id TEXT PRIMARY KEY, canal TEXT NOT NULL, ubicacion TEXT, perfil TEXT, inicio REAL NOT NULL,
+                segundos REAL, referencias INTEGER, seleccionadas INTEGER, no_encontradas INTEGER,
+                omitidas INTEGER, sin_stock INTEGER, ots INTEGER, resultado TEXT, traza TEXT);
+            CREATE INDEX IF NOT EXISTS corridas_canal ON corridas (canal, inicio);
+            CREATE TABLE IF NOT EXISTS referencias (
+                referencia TEXT NOT NULL, canal TEXT NOT NULL, corrida TEXT NOT NULL,
+                estado TEXT NOT NULL, ot TEXT, hora REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS referencias_ref ON referencias (referencia, hora);
+            CREATE TABLE IF NOT EXISTS ots (
+                ot TEXT, corrida TEXT NOT NULL, canal TEXT NOT NULL, referencias INTEGER, hora REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS sin_stock (corrida TEXT NOT NULL, sku TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS pasos (
+                corrida TEXT NOT NULL, paso TEXT NOT NULL, n INTEGER, fallidos INTEGER,
+                p50 REAL, p95 REAL, total REAL);
+        """)
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+    
+    def recent_ots(self, references, canal, dias):
+        """{referencia: (OT, fecha)} de las referencias ya en una OT de los últimos `dias` días.
+        
+        Incluye las de una OT confirmada cuyo número no se capturó (OT NULL): la
+        OT existe en el WMS y volver a procesarlas la duplicaría, igual que al
+        reanudar (ver WMSAutomation.resume_from).
+        """
+        desde = time.time() - dias * 86400
+        found = {}
+        references = list(references)
+        for i in range(0, len(references), 500):
+            batch = references[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            for ref, ot, hora in self.conn.execute(
+                    f"SELECT referencia, ot, MAX(hora) FROM referencias WHERE referencia IN ({marks}) "
+                    f"AND canal = ? AND estado = 'en_ot' AND hora >= ? GROUP BY referencia",
+                    (*batch, canal, desde)):
+                found[ref] = (ot, datetime.fromtimestamp(hora).strftime("%Y-%m-%d %H:%M"))
+        return found
+    
+    def record_ot(self, corrida, canal, ot, referencias):
+        """Guarda una OT recién creada (`ot` None si no se capturó el número) y sus referencias como en_ot.
+        
+        Se llama al crear cada OT y no al final de la corrida, para que una
+        corrida que se cae a la mitad ya deje sus referencias en el historial.
+        """
+        hora = time.time()
+        with self.conn:
+            self.conn.execute("INSERT INTO ots VALUES (?, ?, ?, ?, ?)", (ot, corrida, canal, len(referencias), hora))
+            self.conn.executemany(
+                "INSERT INTO referencias VALUES (?, ?, ?, ?, ?, ?)",
+                [(ref, canal, corrida, "en_ot", ot, hora) for ref in referencias])
+    
+    def record_run(self, corrida, referencias, ots, sin_stock, pasos):
+        """Guarda el resumen de una corrida.
+        
+        `corrida`: {"id", "canal", "ubicacion", "perfil", "inicio", "segundos",
+        "resultado", "traza"}; `referencias`: [(referencia, estado, ot)] con
+        estado en_ot / seleccionada / no_encontrada / omitida; `ots`: las de
+        WMSAutomation.ots; `pasos`: RunTracer.summary(). Las referencias en_ot
+        y las OTs solo se cuentan: ya las guardó record_ot al crear cada OT.
+        """
+        canal, hora = corrida["canal"], time.time()
+        estados = [estado for _, estado, _ in referencias]
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO corridas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (corrida["id"], canal, corrida.get("ubicacion"), corrida.get("perfil"), corrida["inicio"],
+                 corrida.get("segundos"), len(referencias),
+                 estados.count("en_ot") + estados.count("seleccionada"), estados.count("no_encontrada"),
+                 estados.count("omitida"), len(sin_stock), len(ots), corrida.get("resultado"), corrida.get("traza")))
+            self.conn.executemany(
+                "INSERT INTO referencias VALUES (?, ?, ?, ?, ?, ?)",
+                [(ref, canal, corrida["id"], estado, ot, hora) for ref, estado, ot in referencias if estado != "en_ot"])
+            self.conn.executemany("INSERT INTO sin_stock VALUES (?, ?)", [(corrida["id"], sku) for sku in sin_stock])
+            self.conn.executemany(
+                "INSERT INTO pasos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(corrida["id"], p["paso"], p["n"], p["fallidos"], p["p50"], p["p95"], p["total"]) for p in pasos])
+    
+    def trends(self, canal=None, dias=30):
+        """Rendimiento por canal y día: corridas, órdenes, OTs, no encontradas, omitidas y órdenes por minuto."""
+        filas = self.conn.execute("""
+            SELECT canal, date(inicio, 'unixepoch', 'localtime') AS dia, COUNT(*), SUM(referencias),
+                   SUM(seleccionadas), SUM(no_encontradas), SUM(omitidas), SUM(sin_stock), SUM(ots), SUM(segundos)
+            FROM corridas
+            WHERE inicio >= ? AND (? IS NULL OR canal = ?)
+            GROUP BY canal, dia ORDER BY canal, dia
+        """, (time.time() - dias * 86400, canal, canal)).fetchall()
+        claves = ("canal", "dia", "corridas", "referencias", "seleccionadas", "no_encontradas", "omitidas",
+                  "sin_stock", "ots", "segundos")
+        resultado = []
+        for fila in filas:
+            fila = dict(zip(claves, fila))
+            fila["ordenes_min"] = round(fila["seleccionadas"] / fila["segundos"] * 60, 1) if fila["segundos"] else None
+            resultado.append(fila)
+        return resultado
+    
+    def step_totals(self, canal=None, dias=30):
+        """Segundos promedio por corrida de cada paso del asistente, por canal."""
+        return self.conn.execute("""
+            SELECT c.canal, p.paso, COUNT(DISTINCT c.id), ROUND(SUM(p.total) / COUNT(DISTINCT c.id), 2)
+            FROM pasos p JOIN corridas c ON c.id = p.corrida
+            WHERE c.inicio >= ? AND (? IS NULL OR c.canal = ?)
+            GROUP BY c.canal, p.paso ORDER BY c.canal, 4 DESC
+        """, (time.time() - dias * 86400, canal, canal)).fetchall()
+
+
+def format_trends(filas):
+    """Tabla de texto de RunHistory.trends()."""
+    lineas = [f"{'Canal':<14}{'Día':<12}{'corridas':>9}{'órdenes':>9}{'no enc.':>9}{'omitidas':>10}"
+              f"{'OTs':>6}{'órd/min':>9}"]
+    for f in filas:
+        lineas.append(f"{f['canal']:<14}{f['dia']:<12}{f['corridas']:>9}{f['seleccionadas']:>9}"
+                      f"{f['no_encontradas']:>9}{f['omitidas']:>10}{f['ots']:>6}{f['ordenes_min'] or '-':>9}")
+    return lineas
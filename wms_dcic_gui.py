@@ -12,57 +12,43 @@ Requiere: pip install customtkinter pdfplumber selenium webdriver-manager
 import sys
 import os
 import re
+import json
 import time
+import sqlite3
+import shutil
+import argparse
+import contextlib
+import subprocess
 import threading
-import winsound
-from datetime import datetime
-from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import winsound  # Solo en Windows: sin él no hay aviso sonoro
+except ImportError:
+    winsound = None
 
 # Instalar dependencias si no existen
 def install_deps():
     deps = ['customtkinter', 'pdfplumber', 'selenium', 'webdriver-manager', 'pytesseract', 'pdf2image', 'Pillow']
+    modulos = {'Pillow': 'PIL'}  # Nombre de import distinto al del paquete
     for dep in deps:
         try:
-            __import__(dep.replace('-', '_'))
+            __import__(modulos.get(dep, dep.replace('-', '_')))
         except ImportError:
             os.system(f'pip install {dep}')
 
-install_deps()
+# Solo al ejecutar el script: los procesos del pool de extracción (spawn en
+# Windows) vuelven a ejecutar este módulo como __mp_main__
+if __name__ == "__main__":
+    install_deps()
 
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-import pdfplumber
-
-# OCR para PDFs que son imágenes
-try:
-    import pytesseract
-    from pdf2image import convert_from_path
-    OCR_AVAILABLE = True
-    
-    # Configurar Tesseract
-    TESSERACT_PATHS = [
-        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-    ]
-    for path in TESSERACT_PATHS:
-        if os.path.exists(path):
-            pytesseract.pytesseract.tesseract_cmd = path
-            break
-    
-    # Configurar Poppler
-    POPPLER_PATHS = [
-        r'C:\poppler\poppler-24.07.0\Library\bin',
-        r'C:\poppler\Library\bin',
-        r'C:\poppler\bin',
-    ]
-    POPPLER_PATH = None
-    for path in POPPLER_PATHS:
-        if os.path.exists(path):
-            POPPLER_PATH = path
-            break
-except:
-    OCR_AVAILABLE = False
-    POPPLER_PATH = None
+from wms_trazas import RunTracer, CommandProfiler, format_summary, format_page_loads
+from wms_corridas import RunJournal, RunHistory, load_journal, last_journal, format_trends
+from wms_extraccion import (CANALES, ReferenceStream, classify_pdfs, detect_canal_from_pdf,
+                            extract_references_parallel, reference_chunks)
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -71,346 +57,956 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import (StaleElementReferenceException, JavascriptException, TimeoutException,
+                                        WebDriverException, SessionNotCreatedException)
 from webdriver_manager.chrome import ChromeDriverManager
 
 
 # ============== CONFIGURACIÓN ==============
 
-CANALES = {
-    "Falabella": {
-        "patron": r'^32\d{8}$',
-        "patron_busqueda": r'\b(32\d{8})\b',
-        "ubicacion": "ZDESP-FALA-01",
-        "color": "#28a745",  # Verde
-        "keywords": ["falabella", "fala", "32"]
-    },
-    "Mercadolibre": {
-        "patron": r'^2000\d{12,14}$',
-        "patron_busqueda": r'\b(2000\d{12,14})\b',
-        "ubicacion": "ZDESP-FLEXMELI-01",
-        "color": "#FFE600",  # Amarillo
-        "keywords": ["mercadolibre", "meli", "flex", "marketcenter", "mkc"]
-    },
-    "Walmart": {
-        "patron": r'^\d{13}$',
-        "patron_busqueda": r'\b(\d{13})\b',
-        "ubicacion": "ZDESP-WALMAT-01",  # Nota: es WALMAT sin R
-        "color": "#17a2b8",  # Celeste
-        "keywords": ["walmart", "wmt"]
-    },
-    "Paris": {
-        "patron": r'^307\d{7}$|^308\d{7}$',
-        "patron_busqueda": r'\b(30[78]\d{7})\b',
-        "ubicacion": "ZDESP-PARIS-01",
-        "color": "#001f5b",  # Azul marino
-        "keywords": ["paris", "cencosud", "mkc", "marketcenter"]
-    },
-    "Ripley": {
-        "patron": r'^243\d{8}-A$',
-        "patron_busqueda": r'\b(243\d{8}-A)\b',
-        "ubicacion": "ZDESP-RIPLEY-01",
-        "color": "#dc3545",  # Rojo
-        "keywords": ["ripley", "rpl"]
-    },
-    "Paginas": {
-        # Formatos: Vincenzi.cl-1369, GlowUp.cl-1700, Miglu-1004, Acqui-1017
-        "patron": r'^[A-Za-z]+\.cl-\d+$|^[A-Za-z]+-\d+$',
-        "patron_busqueda": r'\b([A-Za-z]+\.cl-\d+|[A-Za-z]+-\d{3,4})\b',
-        "ubicacion": "ZDESP-01-01",
-        "color": "#9C27B0",  # Morado
-        "keywords": ["starken", "paginas", "homeclaf", "vincenzi", "glowup", "miglu", "acqui"]
-    }
-}
-
 WMS_URL = "https://checkweb-prd-checkwms.azurewebsites.net/"
-MONITOR_URL = "https://checkweb-prd-checkwms.azurewebsites.net/DocumentoDespacho/monitorsalida"
+MONITOR_PATH = "DocumentoDespacho/monitorsalida"
+OT_PATH = "OrdenTrabajo/index"
+OT_CREAR_URL = r"ordentrabajo|crear|/ot\b"  # URL (regex JS, sin mayúsculas) de la petición POST que crea la OT
 WMS_USER = "18539597"
 WMS_PASS = "185395"
 
 WAIT_TIMEOUT = 60
-DELAY_STEP = 0.8      # Reducido de 1.5 para mayor velocidad
-DELAY_SEARCH = 1.0    # Reducido de 2.0
-DELAY_PAGE = 1.5      # Reducido de 3.0
+WAIT_STEP = 20        # Máximo para que el asistente cambie de paso o aparezca un botón
+WAIT_SEARCH = 10      # Máximo para que DataTables termine de filtrar
+WAIT_POLL = 0.1       # Cada cuánto se consulta una condición de espera
+WAIT_SLICE = 2        # Máximo de cada espera asíncrona sobre la tabla (para poder detener)
+WAIT_OT = 10          # Máximo para leer el número de OT de la respuesta de creación
+WAIT_RETRY = 0.5      # Retroceso inicial entre reintentos de búsqueda (se duplica hasta WAIT_SLICE)
 MAX_RETRIES = 3
 
+# Perfiles del navegador (GUI: menú "Navegador"; línea de comandos: --perfil)
+#   "estrategia": pageLoadStrategy de Selenium ("normal" espera el evento load,
+#                 "eager" vuelve con el DOM listo; las esperas de la tabla igual
+#                 aguardan a que nada esté cargando)
+#   "bloquear":   patrones de URL bloqueados por CDP (Network.setBlockedURLs).
+#                 Las hojas de estilo no se bloquean: la visibilidad depende de ellas
+BROWSER_PROFILES = {
+    "normal": {
+        "headless": False,
+        "estrategia": "normal",
+        "ventana": None,  # Maximizada
+        "bloquear": [],
+    },
+    "rendimiento": {
+        "headless": True,
+        "estrategia": "eager",
+        "ventana": (1920, 1080),
+        "bloquear": [
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+            "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+            "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+            "*clarity.ms*", "*hotjar.com*", "*applicationinsights*", "*visualstudio.com/v2/track*",
+        ],
+    },
+}
+PERFIL_NAVEGADOR = "normal"
 
-# ============== EXTRACCIÓN PDF ==============
+# Sesión persistente: un Chrome con la sesión iniciada que se reutiliza entre corridas
+SESION_PERSISTENTE = False  # Valor inicial del interruptor en la GUI
+SESION_COOKIES = [".AspNetCore.Cookies", ".ASPXAUTH", "ASP.NET_SessionId"]  # Cookies de autenticación
+SESION_MARGEN = 120         # Se vuelve a iniciar sesión si la cookie vence antes de estos segundos
 
-def detect_canal_from_pdf(pdf_path):
-    """Detecta automáticamente el canal basado en el contenido del PDF."""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            # Leer primera página
-            text = ""
-            text_lower = ""
-            if pdf.pages:
-                text = pdf.pages[0].extract_text() or ""
-                text_lower = text.lower()
-            
-            # PASO 1: Buscar primero por PATRÓN DE REFERENCIAS (más específico)
-            # Orden de búsqueda: del más específico al menos específico
-            
-            # Paginas: Texto.cl-XXXX o Texto-XXXX (ej: Vincenzi.cl-1369, Miglu-1004)
-            if re.search(r'\b[A-Za-z]+\.cl-\d+\b', text) or re.search(r'\b[A-Za-z]+-\d{3,4}\b', text):
-                # Verificar que no sea Ripley (que también tiene guión)
-                if not re.search(r'\b243\d{8}-A\b', text):
-                    return "Paginas"
-            
-            # Ripley: 243XXXXXXXX-A (muy específico por el -A)
-            if re.search(r'\b243\d{8}-A\b', text):
-                return "Ripley"
-            
-            # Mercadolibre: 2000 + 12-14 dígitos
-            if re.search(r'\b2000\d{12,14}\b', text):
-                return "Mercadolibre"
-            
-            # Paris: 307 o 308 + 7 dígitos
-            if re.search(r'\b30[78]\d{7}\b', text):
-                return "Paris"
-            
-            # Falabella: 32 + 8 dígitos
-            if re.search(r'\b32\d{8}\b', text):
-                return "Falabella"
-            
-            # Walmart: exactamente 13 dígitos (menos específico)
-            if re.search(r'\b\d{13}\b', text):
-                return "Walmart"
-            
-            # PASO 2: Buscar por KEYWORDS específicos
-            # Paginas / Starken
-            if any(kw in text_lower for kw in ["starken", "homeclaf", "vincenzi", "glowup", "miglu", "acqui", "paginas"]):
-                return "Paginas"
-            
-            # Ripley
-            if "ripley" in text_lower:
-                return "Ripley"
-            
-            # Falabella
-            if "falabella" in text_lower or "fala" in text_lower:
-                return "Falabella"
-            
-            # Mercadolibre
-            if "mercadolibre" in text_lower or "meli" in text_lower or "flex" in text_lower:
-                return "Mercadolibre"
-            
-            # Paris (cuidado: marketcenter puede ser Meli o Paris)
-            if "paris" in text_lower:
-                return "Paris"
-            
-            # Walmart
-            if "walmart" in text_lower:
-                return "Walmart"
-            
-            # Si tiene MARKETCENTER pero no detectó antes, verificar referencias
-            if "marketcenter" in text_lower:
-                # Verificar si tiene referencias de Paris (307/308)
-                if re.search(r'\b30[78]\d{7}\b', text):
-                    return "Paris"
-                # Si no, asumir Mercadolibre
-                return "Mercadolibre"
-                
-    except Exception as e:
-        print(f"Error detectando canal: {e}")
+# Trabajos en paralelo (JobScheduler): un navegador por trabajo
+TRABAJOS_PARALELOS = 2      # Máximo de WMSAutomation corriendo a la vez
+
+# Carpeta vigilada (--vigilar): manifiestos que llegan durante el día
+VIGILAR_INTERVALO = 5       # Segundos entre revisiones de la carpeta
+VIGILAR_ESTABLE = 10        # Segundos sin cambiar tamaño ni fecha para dar un PDF por terminado de escribir
+VIGILAR_VENTANA = 120       # Segundos que se esperan más PDFs del mismo canal antes de procesar el grupo
+VIGILAR_REPORTE = 600       # Cada cuánto se informa el rendimiento y lo pendiente
+
+# Selección masiva en el Monitor de salida
+SELECCION_MASIVA = True     # False = buscar y marcar cada referencia por separado
+SELECCION_LOTE = 200        # Referencias marcadas por llamada a execute_script
+
+# OTs por tramos: un lote grande se reparte en varias OTs seguidas en la misma sesión
+MAX_REFS_POR_OT = None      # None = todas las referencias en una sola OT
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Trazas por corrida (JSONL, resumen con: python wms_trazas.py)
+TRAZAS_DIR = os.path.join(APP_DIR, "trazas")
+
+# Bitácora por corrida (JSONL) para reanudar una corrida interrumpida
+BITACORA_DIR = os.path.join(APP_DIR, "bitacora")
+
+# Historial de corridas (SQLite): referencias ya en una OT y tendencias por canal
+HISTORIAL_DB = os.path.join(APP_DIR, "historial.sqlite")  # None = sin historial
+HISTORIAL_DIAS = 2          # Se omiten las referencias ya en una OT de los últimos N días (0 = no omitir)
+PERFILAR_COMANDOS = False   # True = contar comandos WebDriver por tipo y paso (resumen al final)
+
+# ChromeDriver (ver resolve_chromedriver): sin red mientras no cambie la versión de Chrome
+CHROMEDRIVER_PATH = None    # Ruta fija a un chromedriver local; None = resolver automáticamente
+CHROMEDRIVER_CACHE = os.path.join(APP_DIR, "cache", "chromedriver.json")
+CHROMEDRIVER_CACHES = [     # Carpetas donde Selenium Manager y webdriver-manager dejan sus descargas
+    os.path.join(os.path.expanduser("~"), ".cache", "selenium", "chromedriver"),
+    os.path.join(os.path.expanduser("~"), ".wdm", "drivers", "chromedriver"),
+]
+CHROME_BINARIOS = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser",
+                   "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"]  # Fuera de Windows
+
+def reference_batches(references, size=SELECCION_LOTE):
+    """Divide una lista (o un ReferenceStream) en lotes para la selección masiva."""
+    if isinstance(references, ReferenceStream):
+        yield from references.batches(size)
+        return
+    for i in range(0, len(references), size):
+        yield references[i:i + size]
+
+
+# ============== CHROMEDRIVER ==============
+# ChromeDriverManager().install() consulta versiones por la red en cada
+# arranque. La ruta resuelta se guarda junto a la versión de Chrome y se reusa
+# hasta que cambie la versión mayor de Chrome.
+
+_VERSION = re.compile(r"\d+\.\d+\.\d+\.\d+")
+_driver_lock = threading.Lock()
+
+
+def chrome_version():
+    """Versión de Chrome instalada, sin red: registro de Windows o `chrome --version`."""
+    if sys.platform == "win32":
+        import winreg
+        for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+            try:
+                with winreg.OpenKey(hive, r"Software\Google\Chrome\BLBeacon") as key:
+                    return winreg.QueryValueEx(key, "version")[0]
+            except OSError:
+                continue
+        return None
     
+    for binario in CHROME_BINARIOS:
+        try:
+            salida = subprocess.run([binario, "--version"], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        m = _VERSION.search(salida)
+        if m:
+            return m.group(0)
     return None
 
 
-def extract_with_ocr(pdf_path, patron_busqueda):
-    """Extrae referencias usando OCR para PDFs que son imágenes."""
-    refs = []
+def _major(version):
+    return version.split(".")[0] if version else None
+
+
+def _load_driver_cache():
+    try:
+        with open(CHROMEDRIVER_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_driver_cache(chrome, driver, origen):
+    os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE), exist_ok=True)
+    with open(CHROMEDRIVER_CACHE, "w", encoding="utf-8") as f:
+        json.dump({"chrome": chrome, "driver": driver, "origen": origen,
+                   "fecha": datetime.now().isoformat(timespec="seconds")}, f, indent=2)
+
+
+def _downloaded_drivers():
+    """(versión, ruta) de los chromedriver ya descargados por Selenium Manager o webdriver-manager."""
+    nombres = ("chromedriver.exe", "chromedriver")
+    encontrados = []
+    for raiz in CHROMEDRIVER_CACHES:
+        for carpeta, _, archivos in os.walk(raiz):
+            m = _VERSION.search(carpeta)
+            for nombre in nombres:
+                if m and nombre in archivos:
+                    encontrados.append((m.group(0), os.path.join(carpeta, nombre)))
+    return sorted(encontrados, key=lambda x: [int(n) for n in x[0].split(".")], reverse=True)
+
+
+def resolve_chromedriver(force=False):
+    """Ruta de ChromeDriver sin usar la red en el caso común. Devuelve (ruta, origen).
     
-    if not OCR_AVAILABLE:
-        return refs
+    Orden: CHROMEDRIVER_PATH fijo; la ruta guardada en CHROMEDRIVER_CACHE si la
+    versión mayor de Chrome no cambió; un chromedriver ya descargado por
+    Selenium Manager o webdriver-manager para esa versión; ChromeDriverManager
+    (red). Si la red falla, ruta None: Selenium Manager resuelve al crear el
+    Service. Con `force` se salta todo lo guardado (driver incompatible).
+    """
+    if CHROMEDRIVER_PATH and os.path.exists(CHROMEDRIVER_PATH):
+        return CHROMEDRIVER_PATH, "ruta fija"
     
-    try:
-        # Convertir PDF a imágenes
-        if POPPLER_PATH:
-            pages = convert_from_path(pdf_path, poppler_path=POPPLER_PATH, dpi=300)
-        else:
-            pages = convert_from_path(pdf_path, dpi=300)
-        
-        for page in pages:
-            # OCR
-            text = pytesseract.image_to_string(page, lang='eng')
+    with _driver_lock:
+        chrome = chrome_version()
+        if not force:
+            guardado = _load_driver_cache()
+            ruta = guardado.get("driver")
+            # Sin versión de Chrome detectable se confía en lo guardado
+            if ruta and os.path.exists(ruta) and (chrome is None or _major(guardado.get("chrome")) == _major(chrome)):
+                return ruta, f"caché (Chrome {guardado.get('chrome') or '?'})"
             
-            # Buscar referencias
-            found = re.findall(patron_busqueda, text)
-            refs.extend(found)
-            
-            # Limpiar errores OCR comunes
-            text_cleaned = text.replace('O', '0').replace('o', '0').replace('l', '1').replace('I', '1')
-            found_cleaned = re.findall(patron_busqueda, text_cleaned)
-            refs.extend(found_cleaned)
-    except Exception as e:
-        print(f"Error OCR: {e}")
+            for version, ruta in _downloaded_drivers():
+                if chrome and _major(version) == _major(chrome):
+                    _save_driver_cache(chrome, ruta, "descargado")
+                    return ruta, f"ya descargado ({version})"
+        
+        try:
+            ruta = ChromeDriverManager().install()
+        except Exception as e:
+            return None, f"Selenium Manager (sin red para webdriver-manager: {type(e).__name__})"
+        _save_driver_cache(chrome, ruta, "webdriver-manager")
+        return ruta, f"descargado para Chrome {chrome or '?'}"
+
+
+# ============== CONDICIONES DE ESPERA ==============
+# Condiciones para WebDriverWait.until (ver WMSAutomation.wait_until). Cada una
+# se evalúa con un solo execute_script y devuelve algo verdadero cuando la
+# página terminó de hacer lo esperado, en vez de dormir un tiempo fijo.
+
+_JS_PAGINA = """
+    function visible(el) {
+        return !!(el && el.getClientRects().length);
+    }
+    function ocupada() {
+        var indicadores = document.querySelectorAll('.dataTables_processing, .blockUI, .loading-overlay');
+        for (var i = 0; i < indicadores.length; i++) {
+            if (visible(indicadores[i])) return true;
+        }
+        var filas = document.querySelectorAll('table tbody tr');
+        for (var j = 0; j < filas.length; j++) {
+            if (visible(filas[j]) && filas[j].textContent.indexOf('Cargando') >= 0) return true;
+        }
+        return document.readyState !== 'complete';
+    }
+    function tablas() {
+        if (!(window.jQuery && jQuery.fn.dataTable)) return [];
+        return jQuery.fn.dataTable.settings.filter(function (s) { return visible(s.nTable); });
+    }
+"""
+
+
+# Monitor de la tabla: un MutationObserver y los eventos draw.dt/processing.dt
+# de DataTables actualizan window.__dcic (número de secuencia y filas con
+# datos). Python espera sobre ese estado con una sola llamada asíncrona que
+# responde apenas llega el evento, sin serializar el DOM en cada consulta.
+_JS_TABLA_ESTADO = _JS_PAGINA + """
+    function filasDatos() {
+        var n = 0;
+        document.querySelectorAll('table tbody tr').forEach(function (row) {
+            if (visible(row) && row.textContent.trim() && !row.querySelector('.dataTables_empty')) n++;
+        });
+        return n;
+    }
+    function sinDatos() {
+        var info = document.querySelector('.dataTables_info');
+        return !!info && /\\b0 (to|a) 0\\b|\\b0 of 0\\b/.test(info.textContent);
+    }
+    var estado = window.__dcic;
+    if (!estado) {
+        estado = window.__dcic = {seq: 0, filas: filasDatos(), esperas: []};
+        var pendiente = false;
+        var avisar = function () {
+            if (pendiente) return;
+            pendiente = true;
+            setTimeout(function () {
+                pendiente = false;
+                estado.seq++;
+                estado.filas = filasDatos();
+                estado.esperas.slice().forEach(function (revisar) { revisar(); });
+            }, 0);
+        };
+        if (window.jQuery) jQuery(document).on('draw.dt processing.dt', avisar);
+        new MutationObserver(avisar).observe(document.documentElement, {
+            childList: true, subtree: true, attributes: true, attributeFilter: ['style', 'class']
+        });
+        document.addEventListener('readystatechange', avisar);
+    }
+"""
+
+_JS_TABLA_ESPERA = _JS_TABLA_ESTADO + """
+    var previo = arguments[0], minimo = arguments[1], busqueda = arguments[2], limite = arguments[3];
+    var done = arguments[arguments.length - 1];
+    function buscada() {
+        if (busqueda === null) return true;
+        var activas = tablas();
+        return !activas.length || activas.some(function (s) { return s.oPreviousSearch.sSearch === busqueda; });
+    }
+    function listo() {
+        return estado.seq > previo && !ocupada() && estado.filas >= minimo &&
+               !(minimo > 0 && sinDatos()) && buscada();
+    }
+    function resultado(ok) {
+        return {listo: ok, seq: estado.seq, filas: estado.filas};
+    }
+    if (listo()) return done(resultado(true));
+    var timer;
+    var revisar = function () {
+        if (!listo()) return;
+        clearTimeout(timer);
+        estado.esperas.splice(estado.esperas.indexOf(revisar), 1);
+        done(resultado(true));
+    };
+    timer = setTimeout(function () {
+        estado.esperas.splice(estado.esperas.indexOf(revisar), 1);
+        done(resultado(false));
+    }, limite);
+    estado.esperas.push(revisar);
+"""
+
+
+# Recarga los datos de la tabla del Monitor sin navegar (ajax.reload de
+# DataTables). Solo si está a la vista el paso de órdenes con su buscador y la
+# tabla se carga por ajax; si no, devuelve false y hay que navegar.
+_JS_RECARGAR_TABLA = _JS_PAGINA + """
+    var buscador = document.querySelector('.dataTables_filter input, input[type="search"]');
+    if (!tablas().length || !visible(buscador)) return false;
+    var api = jQuery.fn.dataTable.tables({visible: true, api: true});
+    if (!api.ajax || !api.ajax.url()) return false;
+    api.search('');
+    api.ajax.reload(null, true);
+    return true;
+"""
+
+
+# Tiempos de la última navegación (Navigation Timing) y lo descargado (Resource Timing)
+_JS_CARGA = """
+    var nav = performance.getEntriesByType('navigation')[0];
+    if (!nav) return null;
+    var recursos = performance.getEntriesByType('resource');
+    var bytes = nav.transferSize || 0;
+    recursos.forEach(function (r) { bytes += r.transferSize || 0; });
+    return {
+        url: location.pathname,
+        dom_ms: Math.round(nav.domContentLoadedEventEnd),
+        carga_ms: nav.loadEventEnd ? Math.round(nav.loadEventEnd) : null,
+        recursos: recursos.length,
+        kb: Math.round(bytes / 1024)
+    };
+"""
+
+
+def step_marker(driver):
+    """Firma del paso actual del asistente: URL, paso activo, títulos y encabezados de tabla visibles."""
+    return driver.execute_script(_JS_PAGINA + """
+        var partes = [location.pathname + location.hash];
+        var selectores = '.steps .current, .wizard .active, .stepper .active, .step.active, ' +
+                         '.nav-tabs .active, [role="tab"][aria-selected="true"], ' +
+                         'h1, h2, h3, h4, h5, legend, .card-title, .panel-title, table thead';
+        document.querySelectorAll(selectores).forEach(function (el) {
+            if (visible(el)) partes.push(el.textContent.replace(/\\s+/g, ' ').trim());
+        });
+        return partes.join('|');
+    """)
+
+
+def step_changed(previous):
+    """El asistente dejó el paso con firma `previous` y el nuevo terminó de cargar."""
+    def condition(driver):
+        return not driver.execute_script(_JS_PAGINA + "return ocupada();") and step_marker(driver) != previous
+    return condition
+
+
+def button_enabled(*texts, exact=False):
+    """Primer botón visible y habilitado cuyo texto contiene (o es, con `exact`) alguno de `texts`.
+    
+    Los textos se prueban en orden, así el primero tiene prioridad. Se ignoran
+    los botones de paginación de DataTables.
+    """
+    def condition(driver):
+        return driver.execute_script(_JS_PAGINA + """
+            var textos = arguments[0], exacto = arguments[1];
+            var botones = Array.prototype.filter.call(document.querySelectorAll('button'), function (b) {
+                return visible(b) && !b.disabled && (b.className || '').toLowerCase().indexOf('paginate') < 0;
+            });
+            for (var i = 0; i < textos.length; i++) {
+                for (var j = 0; j < botones.length; j++) {
+                    var texto = botones[j].textContent.trim().toLowerCase();
+                    if (exacto ? texto === textos[i] : texto.indexOf(textos[i]) >= 0) return botones[j];
+                }
+            }
+            return null;
+        """, [t.lower() for t in texts], exact)
+    return condition
+
+
+def element_gone(element):
+    """El elemento ya no está visible (o fue quitado de la página) y nada está cargando."""
+    def condition(driver):
+        try:
+            return driver.execute_script(_JS_PAGINA + """
+                var el = arguments[0];
+                return !ocupada() && (!document.contains(el) || !visible(el));
+            """, element)
+        except StaleElementReferenceException:
+            return True
+    return condition
+
+
+def login_inputs():
+    """Campos visibles del formulario de login, cuando ya hay al menos dos."""
+    def condition(driver):
+        inputs = driver.execute_script(_JS_PAGINA + """
+            return Array.prototype.filter.call(document.querySelectorAll('input'), function (i) {
+                return visible(i) && ['hidden', 'submit', 'button'].indexOf(i.type) < 0;
+            });
+        """)
+        return inputs if len(inputs) >= 2 else None
+    return condition
+
+
+def login_form(driver):
+    """Hay un campo de contraseña visible: el WMS está pidiendo iniciar sesión."""
+    return driver.execute_script(_JS_PAGINA + """
+        return Array.prototype.some.call(document.querySelectorAll('input[type="password"]'), visible);
+    """)
+
+
+def login_done(login_url):
+    """La página salió del login: cambió la URL o ya no hay campo de contraseña visible."""
+    def condition(driver):
+        if driver.current_url != login_url:
+            return True
+        return driver.execute_script(_JS_PAGINA + """
+            var claves = document.querySelectorAll('input[type="password"]');
+            return !Array.prototype.some.call(claves, visible) && !ocupada();
+        """)
+    return condition
+
+
+# Captura del número de OT: un gancho sobre fetch/XMLHttpRequest lee los códigos
+# PCKM de la respuesta de la petición de creación y de ninguna otra. Se arma
+# justo antes de "Crear OT"; la primera petición que no sea GET y cuya URL calce
+# con OT_CREAR_URL es la creación, y con ella el gancho se desarma.
+_JS_OT_GANCHO = """
+    var ot = window.__dcicOT;
+    if (!ot) {
+        ot = window.__dcicOT = {armado: false, patronUrl: null, codigos: [], url: null};
+        var esCreacion = function (metodo, url) {
+            if (!ot.armado || /^(GET|HEAD)$/i.test(metodo || 'GET')) return false;
+            if (ot.patronUrl && !new RegExp(ot.patronUrl, 'i').test(String(url))) return false;
+            ot.armado = false;
+            ot.url = String(url);
+            return true;
+        };
+        var anotar = function (texto) {
+            (String(texto || '').match(/PCKM\\d{9,12}/g) || []).forEach(function (c) {
+                if (ot.codigos.indexOf(c) < 0) ot.codigos.push(c);
+            });
+        };
+        if (window.fetch) {
+            var fetchOriginal = window.fetch;
+            window.fetch = function (entrada, opciones) {
+                var promesa = fetchOriginal.apply(this, arguments);
+                var metodo = (opciones && opciones.method) || (entrada && entrada.method) || 'GET';
+                if (!esCreacion(metodo, entrada && entrada.url ? entrada.url : entrada)) return promesa;
+                return promesa.then(function (respuesta) {
+                    respuesta.clone().text().then(anotar, function () {});
+                    return respuesta;
+                });
+            };
+        }
+        var openOriginal = XMLHttpRequest.prototype.open;
+        XMLHttpRequest.prototype.open = function (metodo, url) {
+            this.__dcicPeticion = [metodo, url];
+            return openOriginal.apply(this, arguments);
+        };
+        var sendOriginal = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            var peticion = this.__dcicPeticion || [];
+            if (esCreacion(peticion[0], peticion[1])) {
+                this.addEventListener('load', function () {
+                    try {
+                        anotar(this.responseType === '' || this.responseType === 'text'
+                               ? this.responseText : JSON.stringify(this.response));
+                    } catch (e) {}
+                });
+            }
+            return sendOriginal.apply(this, arguments);
+        };
+    }
+    ot.armado = true;
+    ot.patronUrl = arguments[0];
+    ot.codigos = [];
+    ot.url = null;
+    return true;
+"""
+
+
+def ot_created():
+    """Código PCKM de la respuesta a la petición de creación de OT (ver _JS_OT_GANCHO)."""
+    def condition(driver):
+        return driver.execute_script("""
+            var ot = window.__dcicOT;
+            return ot && ot.codigos.length ? ot.codigos[0] : null;
+        """)
+    return condition
+
+
+# ============== ANÁLISIS DE STOCK ==============
+# El paso de stock se lee con un solo execute_script (una "foto" de todas las
+# filas) y las banderas rojas se clasifican en Python sobre esa foto.
+
+STOCK_CLASES_FILA = ["danger", "error", "warning", "red", "alert"]
+STOCK_CLASES_CELDA = ["danger", "error", "red"]
+STOCK_ESTILOS = ["red", "rojo", "#f", "rgb(255", "rgba(255"]
+STOCK_SELECTORES_ERROR = [
+    "tr.danger",
+    "tr.error",
+    "tr.table-danger",
+    "tr[style*='red']",
+    "tr[style*='255']",
+    ".table-danger",
+    "tbody tr.bg-danger"
+]
+STOCK_TEXTOS_ERROR = ["sin stock", "stock insuficiente", "no disponible"]
+
+_JS_STOCK = """
+    var selectores = arguments[0], textos = arguments[1];
+    function visible(el) {
+        return !!el.getClientRects().length && getComputedStyle(el).visibility !== 'hidden';
+    }
+    function celdas(el) {
+        var tds = el.querySelectorAll('td');
+        return {
+            n_celdas: tds.length,
+            textos: Array.prototype.slice.call(tds, 0, 2).map(function (td) { return td.innerText.trim(); }),
+            clases_celdas: Array.prototype.map.call(tds, function (td) { return (td.className || '').toLowerCase(); })
+        };
+    }
+    var filas = Array.prototype.map.call(document.querySelectorAll('table tbody tr'), function (row) {
+        var fila = celdas(row);
+        fila.visible = visible(row);
+        fila.clase = row.getAttribute('class') || '';
+        fila.estilo = row.getAttribute('style') || '';
+        fila.fondo = getComputedStyle(row).backgroundColor;
+        return fila;
+    });
+    var marcadas = [];
+    selectores.forEach(function (selector) {
+        document.querySelectorAll(selector).forEach(function (el) {
+            if (visible(el)) marcadas.push(celdas(el));
+        });
+    });
+    var texto = document.body.innerText.toLowerCase();
+    return {
+        filas: filas,
+        marcadas: marcadas,
+        texto_error: textos.some(function (t) { return texto.indexOf(t) >= 0; })
+    };
+"""
+
+
+def _css_color(color):
+    """Normaliza "rgb(r, g, b)" a "rgba(r, g, b, 1)", como lo entrega value_of_css_property."""
+    match = re.match(r'rgb\((\d+), (\d+), (\d+)\)$', color or "")
+    if match:
+        return f"rgba({match.group(1)}, {match.group(2)}, {match.group(3)}, 1)"
+    return color
+
+
+def _is_red_row(fila):
+    clase = fila["clase"].lower()
+    estilo = fila["estilo"].lower()
+    fondo = _css_color(fila["fondo"])
+    
+    # Por clase CSS
+    if any(x in clase for x in STOCK_CLASES_FILA):
+        return True
+    
+    # Por estilo inline
+    if any(x in estilo for x in STOCK_ESTILOS):
+        return True
+    
+    # Por color de fondo (RGB): tonos de rojo/rosado
+    if fondo:
+        if "255" in fondo and ("0," in fondo or ", 0" in fondo):
+            return True
+        if "248" in fondo or "252" in fondo or "244" in fondo:
+            return True
+        if fondo.startswith("rgba(2") and ", 0," in fondo:
+            return True
     
-    # Eliminar duplicados
-    return list(dict.fromkeys(refs))
+    # Alguna celda con clase de error
+    return any(x in clase_celda for clase_celda in fila["clases_celdas"] for x in STOCK_CLASES_CELDA)
 
 
-def extract_references(pdf_paths, canal):
-    """Extrae referencias de los PDFs según el canal."""
-    config = CANALES[canal]
-    patron = config["patron"]
-    patron_busqueda = config["patron_busqueda"]
+def classify_stock_snapshot(snapshot):
+    """Clasifica la foto del paso de stock: devuelve (hay_errores, skus_sin_stock)."""
+    has_errors = False
+    skus = []
+    
+    def add_sku(elemento):
+        textos = elemento["textos"]
+        codigo = textos[0] if textos else ""
+        descripcion = textos[1] if len(textos) > 1 else ""
+        sku_info = codigo
+        if descripcion:
+            sku_info += f" - {descripcion[:50]}"
+        if sku_info and sku_info not in skus:
+            skus.append(sku_info)
+    
+    for fila in snapshot["filas"]:
+        if fila["visible"] and _is_red_row(fila) and fila["n_celdas"] >= 2:
+            has_errors = True
+            add_sku(fila)
+    
+    # Elementos marcados directamente con clases o estilos de error
+    for elemento in snapshot["marcadas"]:
+        has_errors = True
+        if elemento["n_celdas"] >= 2:
+            add_sku(elemento)
+    
+    # Texto de la página que indique error de stock
+    if snapshot["texto_error"]:
+        has_errors = True
+    
+    return has_errors, skus
+
+
+# ============== AUTOMATIZACIÓN WMS ==============
+
+class BrowserSession:
+    """Chrome con la sesión del WMS iniciada, reutilizado entre corridas.
+    
+    Lo conserva App mientras esté activo el interruptor de sesión persistente:
+    la corrida siguiente se salta el arranque de Chrome y, si la cookie de
+    autenticación sigue vigente, el login. Al terminar una corrida el navegador
+    vuelve al Monitor en segundo plano (park), así la próxima solo recarga la
+    tabla.
+    """
+    
+    def __init__(self):
+        self.driver = None
+        self.key = None  # (servidor, headless, perfil) del driver abierto
+        self.corridas = 0
+        self.parking = None
+    
+    def acquire(self, *key):
+        """Driver vivo de la sesión para ese servidor y perfil, o None si hay que crear uno."""
+        if self.parking:
+            self.parking.join()
+            self.parking = None
+        if self.driver and self.key != key:
+            self.close()
+        if not self.driver:
+            return None
+        try:
+            self.driver.current_url  # Un comando: falla si Chrome se cerró
+        except WebDriverException:
+            self.driver = None
+            return None
+        self.corridas += 1
+        return self.driver
     
-    all_refs = []
+    def adopt(self, driver, *key):
+        """Guarda el driver recién creado por una corrida."""
+        self.driver = driver
+        self.key = key
+        self.corridas = 1
     
-    for pdf_path in pdf_paths:
-        refs_from_pdf = []
+    def cookie_valid(self, margin=SESION_MARGEN):
+        """True si la cookie de autenticación existe y no vence en los próximos `margin` segundos.
         
-        # Primer intento: pdfplumber
+        Se revisan las cookies de SESION_COOKIES; si el WMS usa otros nombres,
+        todas las del sitio. Las cookies de sesión (sin "expiry") solo vencen
+        en el servidor: eso lo detecta return_to_monitor al ver el login.
+        """
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    # De tablas
-                    tables = page.extract_tables()
-                    for table in tables:
-                        for row in table:
-                            if row:
-                                for cell in row:
-                                    if cell:
-                                        cell_str = str(cell).strip()
-                                        if re.match(patron, cell_str):
-                                            if cell_str not in refs_from_pdf:
-                                                refs_from_pdf.append(cell_str)
-                    
-                    # De texto
-                    text = page.extract_text() or ""
-                    found = re.findall(patron_busqueda, text)
-                    for ref in found:
-                        if ref not in refs_from_pdf:
-                            refs_from_pdf.append(ref)
-        except Exception as e:
-            print(f"Error pdfplumber {pdf_path}: {e}")
+            cookies = self.driver.get_cookies()
+        except WebDriverException:
+            return False
+        auth = [c for c in cookies if c["name"] in SESION_COOKIES] or cookies
+        limit = time.time() + margin
+        return bool(auth) and all(c.get("expiry", limit + 1) > limit for c in auth)
+    
+    def park(self, url):
+        """Deja el navegador en `url` en segundo plano, fuera del tiempo de la próxima corrida."""
+        driver = self.driver
         
-        # Si no encontró nada, intentar OCR
-        if not refs_from_pdf and OCR_AVAILABLE:
-            print(f"Intentando OCR para {os.path.basename(pdf_path)}...")
-            refs_from_pdf = extract_with_ocr(pdf_path, patron_busqueda)
+        def navigate():
+            try:
+                driver.get(url)
+            except WebDriverException:
+                pass
         
-        # Agregar al total
-        for ref in refs_from_pdf:
-            if ref not in all_refs:
-                all_refs.append(ref)
+        self.parking = threading.Thread(target=navigate, daemon=True)
+        self.parking.start()
     
-    return all_refs
-
+    def close(self):
+        if self.parking:
+            self.parking.join(timeout=WAIT_TIMEOUT)
+            self.parking = None
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
 
-# ============== AUTOMATIZACIÓN WMS ==============
 
 class WMSAutomation:
-    def __init__(self, canal, log_callback=None):
+    def __init__(self, canal, log_callback=None, base_url=WMS_URL, headless=None, session=None,
+                 perfil=PERFIL_NAVEGADOR):
         self.canal = canal
         self.config = CANALES[canal]
+        self.base_url = base_url.rstrip("/") + "/"  # Otro servidor, p. ej. bench/mock_wms.py
+        self.perfil = perfil
+        self.browser = BROWSER_PROFILES[perfil]
+        self.headless = self.browser["headless"] if headless is None else headless
+        self.page_loads = []      # Tiempos de carga de cada navegación (ver open_page)
+        self.session = session    # BrowserSession: reutilizar Chrome y la sesión entre corridas
+        self.reused = False       # El navegador vino de la sesión persistente
         self.driver = None
         self.wait = None
         self.orders_selected = []
         self.orders_not_found = []
         self.skus_sin_stock = []  # SKUs con error de stock (filas rojas)
-        self.ot_generada = None   # Número de OT generada
+        self.ot_generada = None   # Número de OT generada (la última, si hubo varias)
+        self.ots = []             # OTs creadas: {"ot", "referencias", "sin_stock"} (ver process_chunks)
+        self.ot_mark = None       # True si el gancho de creación de OT quedó armado en la pestaña
+        self.tracer = RunTracer(directory=None)  # run() la reemplaza por una traza en TRAZAS_DIR
+        self.journal = None       # RunJournal de la corrida (ver run)
+        self.history = None       # RunHistory, abierto durante run()
+        self.orders_skipped = []  # Ya en una OT reciente según el historial: {"referencia", "ot", "fecha"}
+        self.ref_ots = {}         # Referencia -> OT en que quedó, para el historial
+        self.tramo = 1            # Tramo (OT) en curso, para la bitácora
+        self.ot_pendiente = None  # OT creada por process_chunks cuyo número aún no se leyó
+        self.tramos_fallidos = []  # {"tramo", "referencias", "error"} (ver chunk_failed)
+        self.profiler = None
         self.log_callback = log_callback or print
         self.running = True
     
     def log(self, message):
         self.log_callback(message)
     
+    def span(self, paso, **campos):
+        """Tramo de la traza de la corrida (ver wms_trazas.py)."""
+        return self.tracer.span(paso, **campos)
+    
+    def journal_write(self, tipo, tramo=None, **campos):
+        """Evento de la bitácora (ver RunJournal), en el tramo actual si no se indica otro."""
+        if self.journal:
+            self.journal.write(tipo, tramo=tramo or self.tramo, **campos)
+    
+    def note_order(self, ref, found):
+        """Anota el resultado de una referencia en la corrida y en la bitácora."""
+        (self.orders_selected if found else self.orders_not_found).append(ref)
+        self.journal_write("ref", ref=ref, estado="seleccionada" if found else "no_encontrada")
+    
+    def start_browser(self):
+        """Toma el Chrome de la sesión persistente si sigue vivo; si no, crea uno.
+        
+        Devuelve True si el navegador fue reutilizado.
+        """
+        key = (self.base_url, self.headless, self.perfil)
+        driver = self.session.acquire(*key) if self.session else None
+        if driver:
+            self.log(f"Reutilizando navegador (corrida {self.session.corridas} de la sesión)")
+            self.driver = driver
+            self.wait = WebDriverWait(self.driver, WAIT_TIMEOUT)
+            self.install_profiler()
+            return True
+        
+        self.setup_driver()
+        if self.session:
+            self.session.adopt(self.driver, *key)
+        return False
+    
+    def close_browser(self, ok=True):
+        """Cierra Chrome; con sesión persistente lo deja abierto y de vuelta en el Monitor."""
+        if self.session and ok:
+            self.log("Navegador abierto para la próxima corrida (sesión persistente)")
+            self.session.park(self.base_url + MONITOR_PATH)
+        elif self.session:
+            self.session.close()
+        else:
+            self.log("\nCerrando navegador...")
+            self.driver.quit()
+    
+    def install_profiler(self):
+        if PERFILAR_COMANDOS:
+            self.profiler = CommandProfiler(step=lambda: self.tracer.current)
+            self.profiler.install(self.driver)
+    
     def setup_driver(self):
         options = Options()
-        options.add_argument("--start-maximized")
+        options.page_load_strategy = self.browser["estrategia"]
+        ventana = self.browser["ventana"] or ((1920, 1080) if self.headless else None)
+        if ventana:
+            options.add_argument(f"--window-size={ventana[0]},{ventana[1]}")
+        else:
+            options.add_argument("--start-maximized")
         options.add_argument("--disable-notifications")
         options.add_argument("--disable-blink-features=AutomationControlled")
         options.add_experimental_option("excludeSwitches", ["enable-logging", "enable-automation"])
         options.add_experimental_option("useAutomationExtension", False)
+        if self.headless:
+            options.add_argument("--headless=new")
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+        self.log(f"Navegador: perfil {self.perfil}{' (headless)' if self.headless else ''}, "
+                 f"carga {self.browser['estrategia']}")
+        ruta, origen = resolve_chromedriver()
+        self.log(f"ChromeDriver: {origen}")
+        try:
+            self.driver = webdriver.Chrome(service=Service(ruta), options=options)
+        except SessionNotCreatedException:
+            if ruta is None or origen.startswith(("ruta fija", "descargado")):
+                raise
+            # El driver guardado no sirve para este Chrome: se vuelve a resolver
+            ruta, origen = resolve_chromedriver(force=True)
+            self.log(f"ChromeDriver incompatible, nuevo: {origen}")
+            self.driver = webdriver.Chrome(service=Service(ruta), options=options)
+        self.install_profiler()
+        if self.browser["bloquear"]:
+            try:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.browser["bloquear"]})
+            except Exception as e:
+                self.log(f"  (No se pudieron bloquear recursos: {e})")
         self.wait = WebDriverWait(self.driver, WAIT_TIMEOUT)
+        self.driver.set_script_timeout(WAIT_SLICE + 5)
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     
+    def open_page(self, url):
+        """Navega a `url` y anota en la traza cuánto tardó la carga (por paso y perfil)."""
+        t0 = time.perf_counter()
+        self.driver.get(url)
+        segundos = round(time.perf_counter() - t0, 3)
+        try:
+            carga = self.driver.execute_script(_JS_CARGA) or {}
+        except WebDriverException:
+            carga = {}
+        registro = {"paso": self.tracer.current or "-", "segundos": segundos, **carga}
+        self.page_loads.append(registro)
+        self.tracer.record({"tipo": "carga", "perfil": self.perfil, **registro})
+    
     def js_click(self, element):
         self.driver.execute_script("arguments[0].click();", element)
     
+    def wait_until(self, condition, timeout=WAIT_STEP, message=None):
+        """Espera una condición de la página (ver CONDICIONES DE ESPERA).
+        
+        Devuelve el valor de la condición, o None si se agota el tiempo o se
+        detiene la automatización.
+        """
+        def check(driver):
+            return not self.running or condition(driver)
+        
+        try:
+            value = WebDriverWait(
+                self.driver, timeout, poll_frequency=WAIT_POLL,
+                ignored_exceptions=(StaleElementReferenceException, JavascriptException)
+            ).until(check)
+        except TimeoutException:
+            if message:
+                self.log(f"  ⚠️ {message} ({timeout}s)")
+            return None
+        return value if self.running else None
+    
     def login(self):
-        self.log(f"Navegando a {WMS_URL}")
-        self.driver.get(WMS_URL)
-        time.sleep(3)
+        self.log(f"Navegando a {self.base_url}")
+        self.open_page(self.base_url)
         
         self.log("Iniciando sesión...")
         
         try:
-            inputs = self.driver.find_elements(By.TAG_NAME, "input")
-            visible_inputs = [i for i in inputs if i.is_displayed() and i.get_attribute("type") not in ["hidden", "submit", "button"]]
+            visible_inputs = self.wait_until(login_inputs(), message="No aparecieron los campos de login") or []
             
             if len(visible_inputs) >= 2:
                 visible_inputs[0].click()
                 visible_inputs[0].clear()
                 visible_inputs[0].send_keys(WMS_USER)
-                time.sleep(0.3)
                 
                 visible_inputs[1].click()
                 visible_inputs[1].clear()
                 visible_inputs[1].send_keys(WMS_PASS)
-                time.sleep(0.3)
                 
-                buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                for btn in buttons:
-                    if "ingresar" in btn.text.lower():
-                        self.js_click(btn)
-                        time.sleep(4)
-                        self.log("Login OK")
-                        return True
+                login_url = self.driver.current_url
+                btn = button_enabled("ingresar")(self.driver)
+                if btn:
+                    self.js_click(btn)
+                else:
+                    visible_inputs[1].send_keys(Keys.ENTER)
                 
-                visible_inputs[1].send_keys(Keys.ENTER)
-                time.sleep(4)
-                self.log("Login OK")
-                return True
+                if self.wait_until(login_done(login_url), timeout=WAIT_TIMEOUT):
+                    self.log("Login OK")
+                    return True
+                self.log("Error login: la página no salió del formulario")
+                return False
         except Exception as e:
             self.log(f"Error login: {e}")
             return False
         
         return False
     
-    def wait_for_table_data(self):
-        self.log("Esperando carga de datos...")
-        
-        max_wait = 60
-        start_time = time.time()
-        
-        while time.time() - start_time < max_wait and self.running:
+    def table_seq(self):
+        """Instala el monitor de la tabla (si falta) y devuelve su número de secuencia."""
+        return self.driver.execute_script(_JS_TABLA_ESTADO + "return estado.seq;")
+    
+    def wait_table(self, after=-1, rows=0, search=None, timeout=WAIT_SEARCH):
+        """Espera a que la tabla quede lista según el monitor de la página.
+        
+        Lista = hubo un evento después de la secuencia `after`, nada está
+        cargando, hay al menos `rows` filas con datos y, con `search`, DataTables
+        ya aplicó esa búsqueda. Devuelve el estado ({"listo", "seq", "filas"})
+        o None si se agota el tiempo o se detiene la automatización.
+        """
+        limit = time.time() + timeout
+        while self.running:
+            remaining = limit - time.time()
+            if remaining <= 0:
+                return None
             try:
-                body_text = self.driver.find_element(By.TAG_NAME, "body").text
-                
-                if "Cargando" in body_text:
-                    time.sleep(1)
-                    continue
-                
-                info_elements = self.driver.find_elements(By.CSS_SELECTOR, ".dataTables_info")
-                if info_elements:
-                    info_text = info_elements[0].text
-                    if "0 to 0" in info_text or "0 of 0" in info_text or "0 a 0" in info_text:
-                        time.sleep(1)
-                        continue
-                
-                rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-                data_rows = [r for r in rows if r.is_displayed() and r.text.strip() and "Cargando" not in r.text]
-                
-                if len(data_rows) > 0:
-                    self.log(f"Tabla cargada ({len(data_rows)} filas)")
-                    time.sleep(1)
-                    return True
-                
-                time.sleep(1)
-            except:
-                time.sleep(1)
+                state = self.driver.execute_async_script(
+                    _JS_TABLA_ESPERA, after, rows, search, int(min(remaining, WAIT_SLICE) * 1000))
+            except (JavascriptException, TimeoutException):
+                # La página se está recargando: el monitor se instala de nuevo
+                after = -1
+                time.sleep(WAIT_POLL)
+                continue
+            if state and state["listo"]:
+                return state
+        return None
+    
+    def wait_for_table_data(self, timeout=WAIT_TIMEOUT):
+        self.log("Esperando carga de datos...")
         
+        state = self.wait_table(rows=1, timeout=timeout)
+        if state:
+            self.log(f"Tabla cargada ({state['filas']} filas)")
+            return True
         return False
     
     def navigate_to_monitor(self):
         self.log("Abriendo Monitor de salida...")
-        self.driver.get(MONITOR_URL)
-        time.sleep(2)
+        self.open_page(self.base_url + MONITOR_PATH)
+        return self.wait_for_table_data()
+    
+    def return_to_monitor(self):
+        """Vuelve al Monitor con un navegador reutilizado.
+        
+        Si el Monitor quedó abierto en el paso de órdenes solo se recargan los
+        datos de la tabla; si no, se navega. Si el WMS pide login (la sesión
+        venció en el servidor), se inicia sesión de nuevo.
+        """
+        if self.driver.current_url.startswith(self.base_url + MONITOR_PATH):
+            try:
+                seq = self.table_seq()
+                recargada = self.driver.execute_script(_JS_RECARGAR_TABLA)
+            except (JavascriptException, WebDriverException):
+                recargada = False
+            if recargada:
+                self.log("Recargando tabla del Monitor...")
+                state = self.wait_table(after=seq, rows=1, timeout=WAIT_SEARCH)
+                if state:
+                    self.log(f"Tabla cargada ({state['filas']} filas)")
+                    return True
+        
+        self.log("Abriendo Monitor de salida...")
+        self.open_page(self.base_url + MONITOR_PATH)
+        if login_form(self.driver):
+            self.log("La sesión del WMS expiró, iniciando sesión de nuevo...")
+            return self.login() and self.navigate_to_monitor()
         return self.wait_for_table_data()
     
     def find_search_box(self):
@@ -425,25 +1021,10 @@ class WMSAutomation:
                 continue
         return None
     
-    def wait_for_search_results(self):
-        time.sleep(0.5)
-        max_wait = 10
-        start_time = time.time()
-        
-        while time.time() - start_time < max_wait:
-            try:
-                processing = self.driver.find_elements(By.CSS_SELECTOR, ".dataTables_processing")
-                if any(p.is_displayed() for p in processing):
-                    time.sleep(0.3)
-                    continue
-                
-                if "Cargando" in self.driver.find_element(By.TAG_NAME, "body").text:
-                    time.sleep(0.3)
-                    continue
-                
-                return True
-            except:
-                time.sleep(0.3)
+    def wait_for_search_results(self, text=None, seq=-1):
+        """Espera a que la tabla quede inactiva; con `text`, a que DataTables
+        haya aplicado esa búsqueda después de la secuencia `seq`."""
+        self.wait_table(after=seq, search=text)
         return True
     
     def clear_and_type_search(self, text):
@@ -453,21 +1034,18 @@ class WMSAutomation:
                 if not search_box:
                     return False
                 
+                # Si la búsqueda no cambia, DataTables no vuelve a dibujar
+                seq = self.table_seq() if search_box.get_attribute("value") != text else -1
                 search_box.click()
-                time.sleep(0.2)
                 search_box.send_keys(Keys.CONTROL + "a")
-                time.sleep(0.1)
                 search_box.send_keys(Keys.DELETE)
-                time.sleep(0.5)
                 search_box.send_keys(text)
                 
-                self.wait_for_search_results()
-                time.sleep(DELAY_SEARCH)
+                self.wait_for_search_results(text, seq)
                 return True
-            except StaleElementReferenceException:
-                time.sleep(0.5)
             except:
-                time.sleep(0.5)
+                # Cuadro de búsqueda reemplazado o página ocupada
+                self.wait_before_retry(None, attempt)
         return False
     
     def get_visible_rows(self):
@@ -492,22 +1070,31 @@ class WMSAutomation:
         return False
     
     def search_and_select(self, reference):
+        with self.span("busqueda", referencia=reference) as span:
+            found = self._search_attempts(reference, span)
+            span.resultado = "ok" if found else "no_encontrada"
+            return found
+    
+    def _search_attempts(self, reference, span):
         for attempt in range(MAX_RETRIES):
+            span.intentos = attempt + 1
             if not self.running:
                 return False
             
+            seq = None
             try:
                 if not self.clear_and_type_search(reference):
                     if attempt < MAX_RETRIES - 1:
-                        time.sleep(1)
+                        self.wait_before_retry(seq, attempt)
                         continue
                     return False
                 
+                seq = self.table_seq()
                 visible_rows = self.get_visible_rows()
                 
                 if not visible_rows:
                     if attempt < MAX_RETRIES - 1:
-                        time.sleep(1.5)
+                        self.wait_before_retry(seq, attempt)
                         continue
                     return False
                 
@@ -515,155 +1102,214 @@ class WMSAutomation:
                     try:
                         if reference in row.text:
                             if self.try_select_checkbox(row):
-                                time.sleep(0.5)
                                 return True
                     except:
                         continue
                 
                 if attempt < MAX_RETRIES - 1:
-                    time.sleep(1.5)
+                    self.wait_before_retry(seq, attempt)
             except:
                 if attempt < MAX_RETRIES - 1:
-                    time.sleep(1)
+                    self.wait_before_retry(seq, attempt)
         
         return False
     
+    def wait_before_retry(self, seq, attempt):
+        """Pausa antes de reintentar una búsqueda.
+        
+        Termina apenas la tabla vuelve a dibujarse después de la secuencia
+        `seq` (reintentar sobre el mismo estado daría lo mismo) o al cumplirse
+        un retroceso acotado que se duplica en cada intento. Sin secuencia
+        (la página no respondió) solo espera el retroceso.
+        """
+        backoff = min(WAIT_RETRY * 2 ** attempt, WAIT_SLICE)
+        if seq is None:
+            time.sleep(backoff)
+        else:
+            self.wait_table(after=seq, timeout=backoff)
+    
     def clear_search(self):
         try:
             search_box = self.find_search_box()
-            if search_box:
+            if search_box and search_box.get_attribute("value"):
+                seq = self.table_seq()
                 search_box.click()
                 search_box.send_keys(Keys.CONTROL + "a")
                 search_box.send_keys(Keys.DELETE)
-                time.sleep(1)
-                self.wait_for_search_results()
+                self.wait_for_search_results("", seq)
         except:
             pass
     
-    def click_next(self):
-        selectors = [
-            "//button[contains(text(), 'Siguiente paso')]",
-            "//button[contains(text(), 'Siguiente Paso')]",
-        ]
+    def show_all_rows(self):
+        """Deja todas las órdenes del monitor en una sola página de la tabla.
         
-        for selector in selectors:
-            try:
-                btn = self.driver.find_element(By.XPATH, selector)
-                if btn.is_displayed():
-                    self.js_click(btn)
-                    return True
-            except:
-                continue
+        Usa la API de DataTables (page.len(-1)) si está disponible; si no, elige
+        la opción más grande del selector de largo de página. Devuelve True si
+        quedaron cargadas todas las filas del monitor.
+        """
+        try:
+            seq = self.table_seq()
+            self.driver.execute_script("""
+                if (window.jQuery && jQuery.fn.dataTable) {
+                    var api = jQuery.fn.dataTable.tables({visible: true, api: true});
+                    if (api.length) {
+                        api.search('').page.len(-1).draw(false);
+                        return;
+                    }
+                }
+                var select = document.querySelector('.dataTables_length select');
+                if (!select) return;
+                var best = null;
+                for (var i = 0; i < select.options.length; i++) {
+                    var value = parseInt(select.options[i].value, 10);
+                    if (value === -1) { best = select.options[i]; break; }
+                    if (!best || value > parseInt(best.value, 10)) best = select.options[i];
+                }
+                if (best && select.value !== best.value) {
+                    select.value = best.value;
+                    select.dispatchEvent(new Event('change', {bubbles: true}));
+                }
+            """)
+            self.wait_for_search_results("", seq)
+            
+            filas, total = self.driver.execute_script("""
+                var filas = 0;
+                document.querySelectorAll('table tbody tr').forEach(function (row) {
+                    if (row.getClientRects().length && !row.querySelector('.dataTables_empty')) filas++;
+                });
+                var total = null;
+                if (window.jQuery && jQuery.fn.dataTable) {
+                    var api = jQuery.fn.dataTable.tables({visible: true, api: true});
+                    if (api.length) total = api.page.info().recordsDisplay;
+                }
+                if (total === null) {
+                    var info = document.querySelector('.dataTables_info');
+                    if (info) {
+                        var nums = (info.textContent.replace(/[.,](?=\\d{3})/g, '').match(/\\d+/g) || []).map(Number);
+                        if (nums.length >= 3) total = nums[2];
+                    }
+                }
+                return [filas, total];
+            """)
+        except Exception as e:
+            self.log(f"  No se pudo cargar la tabla completa: {e}")
+            return False
         
-        buttons = self.driver.find_elements(By.TAG_NAME, "button")
-        for btn in buttons:
-            if "siguiente" in btn.text.lower() and "paginate" not in (btn.get_attribute("class") or "").lower():
-                self.js_click(btn)
-                return True
-        return False
+        completa = total is not None and filas >= total
+        self.log(f"  Tabla en una página: {filas}/{total if total is not None else '?'} filas")
+        return completa
     
-    def check_stock_error(self):
-        """Verifica errores de stock y captura los SKUs afectados."""
-        has_errors = False
+    def bulk_select(self, references):
+        """Marca en una sola llamada todas las referencias presentes en la tabla.
+        
+        Arma dentro de la página un índice referencia→fila con el texto de cada
+        celda y con cada palabra de la celda, y marca el checkbox de cada fila
+        encontrada. Solo cuentan coincidencias exactas: Miglu-1004 no marca la
+        fila de Miglu-10045. Lo que no coincide queda en no_encontradas para
+        buscarlo con search_and_select. Devuelve (seleccionadas, no_encontradas).
+        """
         try:
-            # Esperar un momento para que la tabla cargue completamente
-            time.sleep(1)
-            
-            # Obtener todas las filas de la tabla
-            rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
+            selected, not_found = self.driver.execute_script("""
+                var refs = arguments[0];
+                var index = Object.create(null);
+                document.querySelectorAll('table tbody tr').forEach(function (row) {
+                    if (!row.getClientRects().length || row.querySelector('.dataTables_empty')) return;
+                    var cells = Array.prototype.map.call(row.cells, function (cell) {
+                        return cell.textContent.trim();
+                    });
+                    if (cells.join('').indexOf('Cargando') >= 0) return;
+                    cells.forEach(function (cell) {
+                        if (cell && !(cell in index)) index[cell] = row;
+                        cell.split(/\\s+/).forEach(function (token) {
+                            if (token && !(token in index)) index[token] = row;
+                        });
+                    });
+                });
+                
+                var selected = [], notFound = [];
+                refs.forEach(function (ref) {
+                    var row = index[ref];
+                    var checkbox = row && row.querySelector("input[type='checkbox']");
+                    if (!checkbox) {
+                        notFound.push(ref);
+                        return;
+                    }
+                    if (!checkbox.checked) checkbox.click();
+                    selected.push(ref);
+                });
+                return [selected, notFound];
+            """, list(references))
+        except Exception as e:
+            self.log(f"  Error en selección masiva: {e}")
+            return [], list(references)
+        return selected, not_found
+    
+    def select_orders_bulk(self, references, total):
+        """Paso 1 en modo masivo: una llamada por lote en vez de una búsqueda por orden.
+        
+        Las referencias sin coincidencia exacta en la tabla (o que faltan
+        porque no pudo mostrar todas las filas) se buscan una a una con
+        search_and_select.
+        """
+        count = 0
+        completa = None  # None = hay que (re)cargar la tabla completa
+        
+        for batch in reference_batches(references):
+            if not self.running:
+                break
             
-            for row in rows:
-                try:
-                    if not row.is_displayed():
-                        continue
-                    
-                    # Obtener atributos de la fila
-                    row_class = (row.get_attribute("class") or "").lower()
-                    row_style = (row.get_attribute("style") or "").lower()
-                    bg_color = row.value_of_css_property("background-color")
-                    
-                    # Múltiples formas de detectar error
-                    is_error = False
-                    
-                    # Por clase CSS
-                    if any(x in row_class for x in ["danger", "error", "warning", "red", "alert"]):
-                        is_error = True
-                    
-                    # Por estilo inline
-                    if any(x in row_style for x in ["red", "rojo", "#f", "rgb(255", "rgba(255"]):
-                        is_error = True
-                    
-                    # Por color de fondo (RGB)
-                    if bg_color:
-                        # Detectar tonos de rojo/rosado
-                        if "255" in bg_color and ("0," in bg_color or ", 0" in bg_color):
-                            is_error = True
-                        if "248" in bg_color or "252" in bg_color or "244" in bg_color:
-                            is_error = True
-                        # rgba(255, 0, 0) o similar
-                        if bg_color.startswith("rgba(2") and ", 0," in bg_color:
-                            is_error = True
-                    
-                    # Buscar si alguna celda tiene clase de error
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    for cell in cells:
-                        cell_class = (cell.get_attribute("class") or "").lower()
-                        if any(x in cell_class for x in ["danger", "error", "red"]):
-                            is_error = True
-                            break
-                    
-                    if is_error and len(cells) >= 2:
-                        has_errors = True
-                        codigo = cells[0].text.strip() if cells[0].text else ""
-                        descripcion = cells[1].text.strip() if len(cells) > 1 and cells[1].text else ""
-                        
-                        if codigo or descripcion:
-                            sku_info = f"{codigo}"
-                            if descripcion:
-                                sku_info += f" - {descripcion[:50]}"
-                            if sku_info and sku_info not in self.skus_sin_stock:
-                                self.skus_sin_stock.append(sku_info)
-                                
-                except Exception as e:
-                    continue
+            if completa is None:
+                completa = self.show_all_rows()
             
-            # Método alternativo: buscar directamente elementos con clases de error
-            error_selectors = [
-                "tr.danger",
-                "tr.error", 
-                "tr.table-danger",
-                "tr[style*='red']",
-                "tr[style*='255']",
-                ".table-danger",
-                "tbody tr.bg-danger"
-            ]
+            with self.span("seleccion_lote", referencias=len(batch)) as span:
+                selected, not_found = self.bulk_select(batch)
+                span.set(seleccionadas=len(selected), no_encontradas=len(not_found))
+            selected = set(selected)
             
-            for selector in error_selectors:
-                try:
-                    error_rows = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for row in error_rows:
-                        if row.is_displayed():
-                            has_errors = True
-                            cells = row.find_elements(By.TAG_NAME, "td")
-                            if len(cells) >= 2:
-                                codigo = cells[0].text.strip()
-                                descripcion = cells[1].text.strip() if len(cells) > 1 else ""
-                                sku_info = f"{codigo}"
-                                if descripcion:
-                                    sku_info += f" - {descripcion[:50]}"
-                                if sku_info and sku_info not in self.skus_sin_stock:
-                                    self.skus_sin_stock.append(sku_info)
-                except:
-                    pass
+            for ref in batch:
+                count += 1
+                if ref in selected:
+                    self.note_order(ref, True)
+                    self.log(f"  [{count}/{total}] {ref} OK")
+                elif self.running and self.search_and_select(ref):
+                    self.note_order(ref, True)
+                    self.log(f"  [{count}/{total}] {ref} OK (búsqueda)")
+                else:
+                    self.note_order(ref, False)
+                    self.log(f"  [{count}/{total}] {ref} NO ENCONTRADA")
             
-            # Método adicional: buscar por texto que indique error de stock
-            try:
-                body_text = self.driver.find_element(By.TAG_NAME, "body").text.lower()
-                if "sin stock" in body_text or "stock insuficiente" in body_text or "no disponible" in body_text:
-                    has_errors = True
-            except:
-                pass
+            if not_found:
+                # La búsqueda individual dejó la tabla filtrada
+                completa = None
+    
+    def click_next(self):
+        """Pulsa "Siguiente paso" apenas está habilitado y espera a que cargue el paso nuevo."""
+        btn = self.wait_until(button_enabled("siguiente paso", "siguiente"),
+                              message="Botón Siguiente no disponible")
+        if not btn:
+            return False
+        
+        marker = step_marker(self.driver)
+        self.js_click(btn)
+        self.wait_until(step_changed(marker), message="El asistente no cambió de paso")
+        return True
+    
+    def stock_snapshot(self):
+        """Foto del paso de stock en una sola llamada (ver classify_stock_snapshot)."""
+        return self.driver.execute_script(_JS_STOCK, STOCK_SELECTORES_ERROR, STOCK_TEXTOS_ERROR)
+    
+    def check_stock_error(self, snapshot=None):
+        """Verifica errores de stock y captura los SKUs afectados."""
+        try:
+            if snapshot is None:
+                # Esperar a que la tabla termine de cargar
+                self.wait_table()
+                snapshot = self.stock_snapshot()
             
+            has_errors, skus = classify_stock_snapshot(snapshot)
+            for sku_info in skus:
+                if sku_info not in self.skus_sin_stock:
+                    self.skus_sin_stock.append(sku_info)
             return has_errors
             
         except Exception as e:
@@ -692,249 +1338,380 @@ class WMSAutomation:
         return False
     
     def click_crear_ot(self):
-        for selector in ["//button[contains(text(), 'Crear OT')]", "//button[contains(text(), 'CREAR OT')]"]:
-            try:
-                btn = self.driver.find_element(By.XPATH, selector)
-                if btn.is_displayed():
-                    self.js_click(btn)
-                    return True
-            except:
-                continue
+        btn = self.wait_until(button_enabled("crear ot"), message="Botón Crear OT no disponible")
+        if btn:
+            self.js_click(btn)
+            return True
         return False
     
     def confirm_modal(self):
-        time.sleep(0.5)  # Reducido de 1.5
-        
-        for selector in ["//button[text()='Si']", "//button[text()='Sí']", "//button[contains(text(), 'Si')]"]:
-            try:
-                btn = self.driver.find_element(By.XPATH, selector)
-                if btn.is_displayed():
-                    time.sleep(0.2)  # Reducido de 0.5
-                    self.js_click(btn)
-                    return True
-            except:
-                continue
+        """Confirma el modal de creación de OT y espera a que se cierre."""
+        btn = self.wait_until(button_enabled("si", "sí", exact=True), message="No apareció la confirmación")
+        if not btn:
+            return False
         
-        try:
-            for btn in self.driver.find_elements(By.TAG_NAME, "button"):
-                if btn.text.strip().lower() in ["si", "sí"] and btn.is_displayed():
-                    self.js_click(btn)
-                    return True
-        except:
-            pass
-        return False
+        self.js_click(btn)
+        self.wait_until(element_gone(btn), message="La confirmación no se cerró")
+        return True
     
     def process_batch(self, references):
-        ubicacion = self.config["ubicacion"]
+        """Selecciona las órdenes, recorre el asistente y captura la OT (una sola OT)."""
+        seleccionadas = self.select_orders(references)
+        if not seleccionadas:
+            self.log("No hay órdenes para procesar")
+            return False
+        
+        sin_stock = len(self.skus_sin_stock)
+        if not self.create_ot():
+            self.log("Error: no se pudo crear la OT")
+            return False
+        
+        # Capturar número de OT generada
+        with self.span("captura_ot") as span:
+            ot_number = self.capture_ot_number()
+            span.resultado = "ok" if ot_number else "sin_numero"
+        self.record_ot(ot_number, seleccionadas, self.skus_sin_stock[sin_stock:])
+        return True
+    
+    def select_orders(self, references):
+        """Paso 1: marca las órdenes en el Monitor. Devuelve las seleccionadas en esta llamada."""
+        # Con un ReferenceStream el total se conoce recién al terminar la extracción
+        total = len(references) if isinstance(references, list) else "?"
+        antes = len(self.orders_selected)
         
         # PASO 1
         self.log("\n[1/5] Seleccionando órdenes...")
         
-        for i, ref in enumerate(references):
-            if not self.running:
-                break
-            
-            if self.search_and_select(ref):
-                self.orders_selected.append(ref)
-                self.log(f"  [{i+1}/{len(references)}] {ref} OK")
+        with self.span("seleccion", masiva=SELECCION_MASIVA) as span:
+            if SELECCION_MASIVA:
+                self.select_orders_bulk(references, total)
             else:
-                self.orders_not_found.append(ref)
-                self.log(f"  [{i+1}/{len(references)}] {ref} NO ENCONTRADA")
-        
-        self.clear_search()
-        time.sleep(0.5)  # Reducido de 1
-        
-        if not self.orders_selected:
-            self.log("No hay órdenes para procesar")
-            return False
-        
-        self.log(f"  Seleccionadas: {len(self.orders_selected)}")
+                for i, ref in enumerate(references):
+                    if not self.running:
+                        break
+                    
+                    if self.search_and_select(ref):
+                        self.note_order(ref, True)
+                        self.log(f"  [{i+1}/{total}] {ref} OK")
+                    else:
+                        self.note_order(ref, False)
+                        self.log(f"  [{i+1}/{total}] {ref} NO ENCONTRADA")
+            
+            if isinstance(references, ReferenceStream):
+                self.log(f"  Extracción terminada: {len(references.references)} referencias")
+                self.journal_write("referencias", referencias=references.references)
+                if references.error:
+                    self.log(f"  ⚠️ ADVERTENCIA: error en la extracción: {references.error}")
+            
+            self.clear_search()
+            span.set(seleccionadas=len(self.orders_selected) - antes, no_encontradas=len(self.orders_not_found))
+        
+        seleccionadas = self.orders_selected[antes:]
+        if seleccionadas:
+            self.log(f"  Seleccionadas: {len(seleccionadas)}")
+            self.journal_write("paso", paso="seleccion")
+        return seleccionadas
+    
+    def create_ot(self):
+        """Pasos 2 a 5 del asistente, con las órdenes ya marcadas: termina al confirmar "Crear OT".
         
+        Devuelve True si se pulsó "Crear OT" y se confirmó el modal.
+        """
+        ubicacion = self.config["ubicacion"]
         self.log("  Siguiente paso...")
         self.click_next()
-        time.sleep(DELAY_PAGE)
         # PASO 2 - Seleccionar ubicación usando CTRL+F del navegador
-        self.log(f"[2/5] Ubicación: {ubicacion}")
-        ubicacion_found = False
-        
-        # Esperar a que la tabla cargue
-        time.sleep(1)  # Reducido de 2
-        
-        # MÉTODO 1: Usar CTRL+F del navegador para buscar y hacer scroll
-        try:
-            from selenium.webdriver.common.action_chains import ActionChains
-            
-            # Abrir búsqueda del navegador con CTRL+F
-            body = self.driver.find_element(By.TAG_NAME, "body")
-            body.send_keys(Keys.CONTROL + "f")
-            time.sleep(0.3)  # Reducido de 0.5
-            
-            # Escribir la ubicación en la búsqueda
-            actions = ActionChains(self.driver)
-            actions.send_keys(ubicacion)
-            actions.perform()
-            time.sleep(0.5)  # Reducido de 1
-            
-            # Presionar Enter para ir al resultado
-            actions = ActionChains(self.driver)
-            actions.send_keys(Keys.ENTER)
-            actions.perform()
-            time.sleep(0.3)  # Reducido de 0.5
+        with self.span("ubicacion") as span:
+            self.log(f"[2/5] Ubicación: {ubicacion}")
+            ubicacion_found = False
             
-            # Cerrar la búsqueda con Escape
-            actions = ActionChains(self.driver)
-            actions.send_keys(Keys.ESCAPE)
-            actions.perform()
-            time.sleep(0.3)  # Reducido de 0.5
+            # Esperar a que la tabla cargue
+            self.wait_table()
             
-            self.log(f"  Buscando con CTRL+F...")
-        except Exception as e:
-            self.log(f"  Error en CTRL+F: {e}")
-        
-        # Ahora buscar y seleccionar el radio button de la ubicación
-        time.sleep(0.5)  # Reducido de 1
-        
-        # Buscar la fila que contiene la ubicación
-        try:
-            rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-            for row in rows:
-                try:
-                    if ubicacion in row.text:
-                        # Hacer scroll adicional para asegurarse
-                        self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", row)
-                        time.sleep(0.2)  # Reducido de 0.3
-                        
-                        # Buscar el radio button
-                        radios = row.find_elements(By.CSS_SELECTOR, "input[type='radio']")
-                        if radios:
-                            self.js_click(radios[0])
-                            self.log(f"  {ubicacion} OK")
-                            ubicacion_found = True
-                            break
-                except:
-                    continue
-        except:
-            pass
-        
-        # MÉTODO 2: Si aún no encontró, usar JavaScript para buscar en toda la página
-        if not ubicacion_found:
-            try:
-                # Buscar el elemento que contiene el texto
-                script = f"""
-                    var elements = document.querySelectorAll('table tbody tr');
-                    for (var i = 0; i < elements.length; i++) {{
-                        if (elements[i].textContent.includes('{ubicacion}')) {{
-                            elements[i].scrollIntoView({{block: 'center'}});
-                            var radio = elements[i].querySelector('input[type="radio"]');
-                            if (radio) {{
-                                radio.click();
-                                return true;
-                            }}
-                        }}
-                    }}
-                    return false;
-                """
-                result = self.driver.execute_script(script)
-                if result:
-                    self.log(f"  {ubicacion} OK (JavaScript)")
-                    ubicacion_found = True
-            except:
-                pass
-        
-        # MÉTODO 3: Último intento - scroll completo hacia abajo y buscar
-        if not ubicacion_found:
+            # MÉTODO 1: Usar CTRL+F del navegador para buscar y hacer scroll
             try:
-                # Scroll hasta el final de la página
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
+                from selenium.webdriver.common.action_chains import ActionChains
+                
+                # Abrir búsqueda del navegador con CTRL+F
+                body = self.driver.find_element(By.TAG_NAME, "body")
+                body.send_keys(Keys.CONTROL + "f")
                 
+                # Escribir la ubicación, ir al resultado con Enter y cerrar con Escape
+                actions = ActionChains(self.driver)
+                actions.send_keys(ubicacion)
+                actions.send_keys(Keys.ENTER)
+                actions.send_keys(Keys.ESCAPE)
+                actions.perform()
+                
+                self.log(f"  Buscando con CTRL+F...")
+            except Exception as e:
+                self.log(f"  Error en CTRL+F: {e}")
+            
+            # Buscar la fila que contiene la ubicación
+            try:
                 rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
                 for row in rows:
                     try:
                         if ubicacion in row.text:
+                            # Hacer scroll adicional para asegurarse
                             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", row)
-                            time.sleep(0.3)
+                            
+                            # Buscar el radio button
                             radios = row.find_elements(By.CSS_SELECTOR, "input[type='radio']")
                             if radios:
                                 self.js_click(radios[0])
-                                self.log(f"  {ubicacion} OK (scroll final)")
+                                self.log(f"  {ubicacion} OK")
                                 ubicacion_found = True
                                 break
                     except:
                         continue
             except:
                 pass
-        
-        if not ubicacion_found:
-            self.log(f"  ⚠️ ADVERTENCIA: {ubicacion} no encontrada")
-            self.log(f"  Intentando continuar de todos modos...")
-        
-        time.sleep(DELAY_STEP)
-        self.click_next()
-        time.sleep(DELAY_PAGE)
-        
-        # PASO 3
-        self.log("[3/5] Stock...")
-        
-        # Debug: mostrar info de las primeras filas para diagnosticar
-        try:
-            rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-            self.log(f"  Analizando {len(rows)} filas de stock...")
             
-            # Mostrar info de las primeras 5 filas para debug
-            for i, row in enumerate(rows[:5]):
+            # MÉTODO 2: Si aún no encontró, usar JavaScript para buscar en toda la página
+            if not ubicacion_found:
                 try:
-                    if row.is_displayed():
-                        row_class = row.get_attribute("class") or "(sin clase)"
-                        bg = row.value_of_css_property("background-color")
-                        cells = row.find_elements(By.TAG_NAME, "td")
-                        first_cell = cells[0].text[:20] if cells else "?"
-                        self.log(f"    Fila {i+1}: clase='{row_class}' bg='{bg}' texto='{first_cell}'")
+                    # Buscar el elemento que contiene el texto
+                    script = f"""
+                        var elements = document.querySelectorAll('table tbody tr');
+                        for (var i = 0; i < elements.length; i++) {{
+                            if (elements[i].textContent.includes('{ubicacion}')) {{
+                                elements[i].scrollIntoView({{block: 'center'}});
+                                var radio = elements[i].querySelector('input[type="radio"]');
+                                if (radio) {{
+                                    radio.click();
+                                    return true;
+                                }}
+                            }}
+                        }}
+                        return false;
+                    """
+                    result = self.driver.execute_script(script)
+                    if result:
+                        self.log(f"  {ubicacion} OK (JavaScript)")
+                        ubicacion_found = True
                 except:
                     pass
-        except Exception as e:
-            self.log(f"  Error debug: {e}")
-        
-        if self.check_stock_error():
-            self.log(f"  ⚠️ ADVERTENCIA: {len(self.skus_sin_stock)} SKU(s) SIN STOCK")
-            for sku in self.skus_sin_stock:
-                self.log(f"    🔴 {sku}")
-        else:
-            self.log("  ✅ OK (Sin errores detectados)")
+            
+            # MÉTODO 3: Último intento - scroll completo hacia abajo y buscar
+            if not ubicacion_found:
+                try:
+                    # Scroll hasta el final de la página
+                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                    self.wait_table()
+                    
+                    rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
+                    for row in rows:
+                        try:
+                            if ubicacion in row.text:
+                                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", row)
+                                radios = row.find_elements(By.CSS_SELECTOR, "input[type='radio']")
+                                if radios:
+                                    self.js_click(radios[0])
+                                    self.log(f"  {ubicacion} OK (scroll final)")
+                                    ubicacion_found = True
+                                    break
+                        except:
+                            continue
+                except:
+                    pass
+            
+            if not ubicacion_found:
+                span.resultado = "no_encontrada"
+                self.log(f"  ⚠️ ADVERTENCIA: {ubicacion} no encontrada")
+                self.log(f"  Intentando continuar de todos modos...")
+            
+            self.click_next()
+            self.journal_write("paso", paso="ubicacion")
         
-        time.sleep(DELAY_STEP)
-        self.click_next()
-        time.sleep(DELAY_PAGE)
+        # PASO 3
+        with self.span("stock") as span:
+            self.log("[3/5] Stock...")
+            
+            # Debug: mostrar info de las primeras filas para diagnosticar
+            snapshot = None
+            try:
+                self.wait_table()
+                snapshot = self.stock_snapshot()
+                self.log(f"  Analizando {len(snapshot['filas'])} filas de stock...")
+                
+                # Mostrar info de las primeras 5 filas para debug
+                for i, fila in enumerate(snapshot["filas"][:5]):
+                    if fila["visible"]:
+                        row_class = fila["clase"] or "(sin clase)"
+                        bg = _css_color(fila["fondo"])
+                        first_cell = fila["textos"][0][:20] if fila["textos"] else "?"
+                        self.log(f"    Fila {i+1}: clase='{row_class}' bg='{bg}' texto='{first_cell}'")
+            except Exception as e:
+                self.log(f"  Error debug: {e}")
+            
+            if self.check_stock_error(snapshot):
+                span.resultado = "sin_stock"
+                self.log(f"  ⚠️ ADVERTENCIA: {len(self.skus_sin_stock)} SKU(s) SIN STOCK")
+                for sku in self.skus_sin_stock:
+                    self.log(f"    🔴 {sku}")
+            else:
+                self.log("  ✅ OK (Sin errores detectados)")
+            span.set(filas=len(snapshot["filas"]) if snapshot else None, sin_stock=len(self.skus_sin_stock))
+            
+            self.click_next()
+            self.journal_write("paso", paso="stock")
         
         # PASO 4
-        self.log("[4/5] Operario... OK")
-        time.sleep(DELAY_STEP)
-        self.click_next()
-        time.sleep(DELAY_PAGE)
+        with self.span("operario"):
+            self.log("[4/5] Operario... OK")
+            self.click_next()
+            self.journal_write("paso", paso="operario")
         
         # PASO 5
-        self.log("[5/5] Creando OT...")
-        self.mark_picking_consolidado()
-        time.sleep(DELAY_STEP)
-        self.click_crear_ot()
-        time.sleep(1.5)
-        self.confirm_modal()
-        time.sleep(DELAY_PAGE)
-        
-        # Capturar número de OT generada
-        ot_number = self.capture_ot_number()
-        
+        with self.span("crear_ot") as span:
+            self.log("[5/5] Creando OT...")
+            self.mark_picking_consolidado()
+            self.watch_ot_responses()
+            if not self.click_crear_ot():
+                span.resultado = "sin_boton"
+                return False
+            # Desde aquí la OT puede existir: al reanudar se busca en vez de crearla de nuevo
+            self.journal_write("confirmando")
+            if not self.confirm_modal():
+                span.resultado = "sin_confirmacion"
+                return False
+        return True
+    
+    def record_ot(self, ot_number, seleccionadas, sin_stock, tramo=None):
+        """Anota una OT creada (con o sin número capturado) en self.ots, en la bitácora y en el historial."""
         if ot_number:
             self.log(f"\n🎉 ¡OT CREADA EXITOSAMENTE!")
             self.log(f"📋 Número de OT: {ot_number}")
             self.ot_generada = ot_number
         else:
             self.log("\n¡OT CREADA EXITOSAMENTE!")
+        self.ots.append({"ot": ot_number, "referencias": len(seleccionadas), "sin_stock": list(sin_stock)})
+        self.ref_ots.update(dict.fromkeys(seleccionadas, ot_number))
+        self.journal_write("ot", tramo=tramo, ot=ot_number, referencias=len(seleccionadas), sin_stock=list(sin_stock))
+        if self.history:
+            try:
+                self.history.record_ot(self.tracer.id, self.canal, ot_number, seleccionadas)
+            except sqlite3.Error as e:
+                self.log(f"  (No se pudo guardar la OT en el historial: {e})")
+    
+    def process_chunks(self, references, size):
+        """Reparte las referencias en OTs de hasta `size` órdenes, creadas una tras otra.
+        
+        Un asistente más corto es más rápido en stock y "Crear OT", y un error
+        solo pierde su tramo (ver chunk_failed). Al confirmar una OT, el tramo
+        siguiente se selecciona en una pestaña nueva mientras la anterior sigue
+        esperando la respuesta de creación; el número de esa OT se lee al
+        terminar la selección y luego se cierra su pestaña.
+        """
+        primero = self.tramo  # Al reanudar, los tramos siguen la numeración de la bitácora
+        for n, tramo in enumerate(reference_chunks(references, size), primero):
+            if not self.running:
+                break
+            self.tramo = n
+            try:
+                with self.span("tramo", numero=n, referencias=len(tramo)) as span:
+                    self.log(f"\n📑 TRAMO {n}: {len(tramo)} referencias")
+                    span.resultado = self.process_chunk(n, tramo)
+            except Exception as e:
+                if not self.chunk_failed(n, tramo, e):
+                    break
         
-        return True
+        self.finish_pending_ot()
+        if isinstance(references, ReferenceStream):
+            self.journal_write("referencias", referencias=references.references)
+        return bool(self.ots)
+    
+    def process_chunk(self, n, tramo):
+        """Un tramo de process_chunks: selecciona, lee la OT anterior y crea la del tramo.
+        
+        La OT creada queda en self.ot_pendiente hasta que el tramo siguiente (o
+        el final) lea su número. Devuelve el resultado del tramo para la traza
+        y lanza RuntimeError si el tramo no se pudo completar.
+        """
+        if self.ot_pendiente:
+            self.driver.switch_to.new_window("tab")
+            if not self.navigate_to_monitor():
+                raise RuntimeError("La tabla no cargó")
+        
+        sin_stock = len(self.skus_sin_stock)
+        seleccionadas = self.select_orders(tramo)
+        self.finish_pending_ot()
+        if not seleccionadas:
+            self.log("No hay órdenes para procesar en este tramo")
+            return "sin_ordenes"
+        
+        if not self.create_ot():
+            raise RuntimeError("no se pudo crear la OT")
+        self.ot_pendiente = {"tramo": n, "pestana": self.driver.current_window_handle, "marca": self.ot_mark,
+                             "seleccionadas": seleccionadas, "sin_stock_desde": sin_stock}
+        return "ok"
+    
+    def chunk_failed(self, n, tramo, error):
+        """Registra un tramo fallido y deja el navegador listo para el siguiente.
+        
+        Primero se lee la OT del tramo anterior si seguía pendiente (ya existe
+        en el WMS). Las referencias del tramo fallido no quedan en ninguna OT y
+        en la bitácora siguen pendientes, así que se retoman al reanudar. Si el
+        Monitor no vuelve a cargar, devuelve False: los tramos restantes no se
+        procesan.
+        """
+        self.log(f"❌ Tramo {n} falló: {error}")
+        self.tramos_fallidos.append({"tramo": n, "referencias": len(tramo), "error": str(error)})
+        self.journal_write("error", tramo=n, error=str(error))
+        try:
+            self.finish_pending_ot()
+            if self.running and self.navigate_to_monitor():
+                return True
+        except Exception as e:
+            self.log(f"  Error recuperando el navegador: {e}")
+        if self.running:
+            self.log("  Se detienen los tramos restantes")
+        return False
+    
+    def finish_pending_ot(self):
+        """Lee el número de la OT pendiente en la pestaña donde se creó y vuelve a la pestaña actual."""
+        pendiente, self.ot_pendiente = self.ot_pendiente, None
+        if not pendiente:
+            return
+        actual = self.driver.current_window_handle
+        if actual != pendiente["pestana"]:
+            self.driver.switch_to.window(pendiente["pestana"])
+        self.ot_mark = pendiente["marca"]
+        with self.span("captura_ot", tramo=pendiente["tramo"]) as span:
+            ot_number = self.capture_ot_number()
+            span.resultado = "ok" if ot_number else "sin_numero"
+        self.record_ot(ot_number, pendiente["seleccionadas"], self.skus_sin_stock[pendiente["sin_stock_desde"]:],
+                       tramo=pendiente["tramo"])
+        if actual != pendiente["pestana"]:
+            self.driver.close()
+            self.driver.switch_to.window(actual)
+    
+    def watch_ot_responses(self):
+        """Arma el gancho de fetch/XHR que lee el código PCKM de la petición de creación."""
+        try:
+            self.ot_mark = self.driver.execute_script(_JS_OT_GANCHO, OT_CREAR_URL) or None
+        except Exception as e:
+            self.ot_mark = None
+            self.log(f"  (No se pudo observar la creación de la OT: {e})")
     
     def capture_ot_number(self):
-        """Captura el número de OT navegando al listado de Órdenes de Trabajo."""
+        """Lee el número de OT de la respuesta de creación; si no aparece, lo busca en el listado."""
+        if self.ot_mark is not None:
+            ot_number = self.wait_until(ot_created(), timeout=WAIT_OT)
+            if ot_number:
+                self.log(f"  ✅ OT leída de la respuesta de creación: {ot_number}")
+                return ot_number
+            self.log("  La respuesta de creación no trajo el número de OT")
+        return self.capture_ot_from_listing()
+    
+    def capture_ot_from_listing(self, desde=None):
+        """Captura el número de OT navegando al listado de Órdenes de Trabajo.
+        
+        Nunca devuelve una OT que la corrida ya tiene (otro tramo, o la bitácora
+        al reanudar). Con `desde` (datetime) se descartan las OTs creadas antes
+        de esa hora y las filas sin una hora legible.
+        """
         ot_number = None
         ubicacion = self.config["ubicacion"]
         
@@ -942,28 +1719,15 @@ class WMSAutomation:
             self.log(f"  Buscando OT con ubicación: {ubicacion}")
             
             # Navegar al listado de Órdenes de Trabajo (URL correcta con /index)
-            ot_url = "https://checkweb-prd-checkwms.azurewebsites.net/OrdenTrabajo/index"
-            self.driver.get(ot_url)
-            time.sleep(3)
+            ot_url = self.base_url + OT_PATH
+            self.open_page(ot_url)
             
             # Hacer doble refresh para asegurar datos actualizados
             self.driver.refresh()
-            time.sleep(2)
             self.driver.refresh()
-            time.sleep(4)  # Esperar más después del segundo refresh
             
             # Esperar a que cargue la tabla (que no diga "0 to 0 of 0")
-            for _ in range(20):  # Intentar hasta 20 veces
-                try:
-                    # Verificar si hay datos en la tabla
-                    info_text = self.driver.find_element(By.CSS_SELECTOR, ".dataTables_info, [class*='info']").text
-                    if "0 to 0" not in info_text and "0 of 0" not in info_text:
-                        break
-                except:
-                    pass
-                time.sleep(1)
-            
-            time.sleep(3)  # Espera adicional para asegurar datos completos
+            self.wait_for_table_data(timeout=WAIT_STEP)
             
             # USAR BÚSQUEDA RÁPIDA para filtrar por ubicación
             try:
@@ -989,16 +1753,14 @@ class WMSAutomation:
                 
                 if search_input:
                     # Limpiar y escribir ubicación en búsqueda rápida
+                    seq = self.table_seq()
                     search_input.clear()
                     search_input.send_keys(ubicacion)
-                    time.sleep(2)  # Esperar que filtre
+                    self.wait_for_search_results(ubicacion, seq)  # Esperar que filtre
                     self.log(f"  Filtrando por: {ubicacion}")
             except Exception as e:
                 self.log(f"  (Búsqueda rápida no disponible)")
             
-            # Esperar un poco más para asegurar que la tabla esté cargada
-            time.sleep(2)
-            
             # Ahora buscar en las filas
             rows = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
             self.log(f"  Revisando {len(rows)} OTs...")
@@ -1047,6 +1809,14 @@ class WMSAutomation:
                 except:
                     continue
             
+            conocidas = {ot["ot"] for ot in self.ots if ot["ot"]}
+            ots_candidatas = [ot for ot in ots_candidatas if ot['codigo'] not in conocidas]
+            if desde:
+                # Margen por diferencia de reloj entre este equipo y el WMS. Sin hora
+                # no se puede saber si la OT es de esta corrida: se descarta
+                limite = desde - timedelta(minutes=2)
+                ots_candidatas = [ot for ot in ots_candidatas if ot['hora'] and ot['hora'] >= limite]
+            
             # Si hay candidatas, tomar la de número más alto (más reciente)
             if ots_candidatas:
                 self.log(f"  Encontradas {len(ots_candidatas)} OTs con ubicación correcta")
@@ -1079,38 +1849,116 @@ class WMSAutomation:
         
         return ot_number
     
-    def run(self, references):
+    def run(self, references, reanudar=None):
+        """Ejecuta la automatización completa.
+        
+        `references` puede ser una lista o un ReferenceStream ya iniciado: en ese
+        caso el navegador, el login y la selección de órdenes avanzan mientras
+        la extracción sigue corriendo. Con `reanudar` (estado de load_journal)
+        se continúa esa corrida y `references` se ignora (ver resume_from).
+        Pase lo que pase, al salir se cierra la traza (ver finish_run).
+        """
+        inicio = time.time()
+        resultado = "error"  # Si run_steps termina con una excepción
+        try:
+            resultado = self.run_steps(references, reanudar)
+        finally:
+            self.finish_run(resultado, inicio)
+    
+    def run_steps(self, references, reanudar):
+        """Cuerpo de run(): devuelve el resultado de la corrida para la traza."""
         self.log(f"\n{'='*50}")
         self.log(f"WMS {self.canal.upper()} AUTOMATION")
         self.log(f"{'='*50}")
-        self.log(f"Órdenes: {len(references)} | Destino: {self.config['ubicacion']}")
-        
-        self.setup_driver()
-        
-        if not self.login():
+        if reanudar:
+            references = reanudar["pendientes"]
+            ordenes = f"{len(references)} pendientes" if references is not None else "por extraer"
+        else:
+            ordenes = len(references) if isinstance(references, list) else "en extracción"
+        self.log(f"Órdenes: {ordenes} | Destino: {self.config['ubicacion']}")
+        
+        self.tracer = RunTracer(TRAZAS_DIR, canal=self.canal, ubicacion=self.config["ubicacion"],
+                                ordenes=len(references) if isinstance(references, list) else None,
+                                perfil=self.perfil, headless=self.headless, reanudada=bool(reanudar))
+        if reanudar:
+            self.journal = RunJournal(reanudar["ruta"])
+            self.journal.write("reanudacion", traza=self.tracer.path)
+        else:
+            self.journal = RunJournal(os.path.join(BITACORA_DIR, f"bitacora_{self.tracer.id}_{self.canal}.jsonl"))
+            self.journal.write("inicio", canal=self.canal, ubicacion=self.config["ubicacion"],
+                               referencias=references if isinstance(references, list) else None,
+                               pdfs=references.pdf_paths if isinstance(references, ReferenceStream) else [],
+                               max_por_ot=MAX_REFS_POR_OT, traza=self.tracer.path)
+        
+        if HISTORIAL_DB:
+            self.history = RunHistory(HISTORIAL_DB)
+        if isinstance(references, ReferenceStream):
+            references.skip = self.skip_recent
+        elif not reanudar:
+            references = self.skip_recent(references)
+            if not references and self.orders_skipped:
+                self.log("Todas las referencias ya están en una OT reciente: no hay nada que procesar")
+                return "omitida"
+        
+        with self.span("navegador") as span:
+            self.reused = self.start_browser()
+            span.set(reutilizado=self.reused)
+        
+        with self.span("login") as span:
+            if self.reused and self.session.cookie_valid():
+                self.log("Sesión vigente: se omite el login")
+                span.resultado = "omitido"
+                ok = True
+            else:
+                ok = self.login()
+                span.resultado = "ok" if ok else "error"
+        if not ok:
             self.log("Error en login")
-            self.driver.quit()
-            return
+            return "error_login"
         
-        if not self.navigate_to_monitor():
+        if reanudar:
+            references = self.resume_from(reanudar)
+        
+        with self.span("monitor") as span:
+            ok = self.return_to_monitor() if self.reused else self.navigate_to_monitor()
+            span.resultado = "ok" if ok else "error"
+        if not ok:
             self.log("Error: La tabla no cargó")
-            self.driver.quit()
-            return
+            return "error_monitor"
         
         start = datetime.now()
-        self.process_batch(references)
+        with self.span("proceso", tramos=MAX_REFS_POR_OT) as span:
+            if reanudar and not references:
+                self.log("No quedan referencias pendientes")
+                ok = bool(self.ots)
+            elif MAX_REFS_POR_OT:
+                ok = self.process_chunks(references, MAX_REFS_POR_OT)
+            else:
+                ok = self.process_batch(references)
+            span.resultado = "ok" if ok else "sin_ot"
         elapsed = datetime.now() - start
         
         # RESUMEN
         self.log(f"\n{'='*50}")
         self.log("RESUMEN")
         self.log(f"{'='*50}")
-        if self.ot_generada:
+        if len(self.ots) > 1:
+            self.log(f"📋 OTs Generadas: {len(self.ots)}")
+            for i, ot in enumerate(self.ots, 1):
+                sin_stock = f", {len(ot['sin_stock'])} SKU(s) sin stock" if ot["sin_stock"] else ""
+                self.log(f"  {i}. {ot['ot'] or '(sin número)'}: {ot['referencias']} órdenes{sin_stock}")
+        elif self.ot_generada:
             self.log(f"📋 OT Generada: {self.ot_generada}")
         self.log(f"Tiempo: {elapsed}")
         self.log(f"Procesadas: {len(self.orders_selected)}")
         self.log(f"No encontradas: {len(self.orders_not_found)}")
+        if self.orders_skipped:
+            self.log(f"Omitidas (ya en una OT reciente): {len(self.orders_skipped)}")
         self.log(f"SKUs sin stock: {len(self.skus_sin_stock)}")
+        if self.tramos_fallidos:
+            self.log(f"Tramos fallidos: {len(self.tramos_fallidos)} (sus referencias quedan pendientes para reanudar)")
+            for fallo in self.tramos_fallidos:
+                self.log(f"  -> Tramo {fallo['tramo']} ({fallo['referencias']} referencias): {fallo['error']}")
         
         if self.orders_not_found:
             self.log(f"\n❌ NO ENCONTRADAS:")
@@ -1122,14 +1970,312 @@ class WMSAutomation:
             for sku in self.skus_sin_stock:
                 self.log(f"  -> {sku}")
         
-        self.log("\nCerrando navegador...")
-        time.sleep(2)
-        self.driver.quit()
-        self.log("Finalizado.")
+        self.log(f"\n⏱️ TIEMPOS POR PASO:")
+        for linea in format_summary(self.tracer.summary()):
+            self.log(f"  {linea}")
+        
+        if self.page_loads:
+            self.log(f"\n🌐 CARGA DE PÁGINAS (perfil {self.perfil}):")
+            for linea in format_page_loads(self.page_loads):
+                self.log(f"  {linea}")
+        
+        if self.profiler:
+            self.log(f"\n🔁 COMANDOS WEBDRIVER:")
+            for linea in self.profiler.report_lines():
+                self.log(f"  {linea}")
+            self.tracer.record({"tipo": "comandos", **self.profiler.as_dict()})
+        resultado = "detenida" if not self.running else "sin_ot" if not ok else "parcial" if self.tramos_fallidos else "ok"
+        self.log(f"Traza: {self.tracer.path}")
+        return resultado
+    
+    def finish_run(self, resultado, inicio):
+        """Cierre de run(), también cuando la corrida termina con una excepción.
+        
+        La traza queda con `resultado` ("error" si hubo una excepción; los
+        tramos abiertos ya se cerraron como fallidos al salir de su `with`).
+        El navegador se cierra; con sesión persistente vuelve al Monitor para
+        la próxima corrida solo si esta no terminó en error, si no la sesión
+        se descarta. La bitácora se cierra con el mismo resultado: solo "ok"
+        (u "omitida", que no deja nada pendiente) la da por terminada; con
+        cualquier otro se puede reanudar. El historial guarda el resumen de la
+        corrida (las OTs ya las fue guardando record_ot).
+        """
+        self.save_history(resultado, inicio)
+        if self.journal:
+            self.journal.close(resultado="ok" if resultado == "omitida" else resultado,
+                               ots=[ot["ot"] for ot in self.ots])
+            self.journal = None
+        if self.driver is not None:
+            try:
+                self.close_browser(ok=not resultado.startswith("error"))
+            except Exception as e:
+                self.log(f"  (No se pudo cerrar el navegador: {e})")
+        self.tracer.close(resultado=resultado, ot=self.ot_generada, ots=[ot["ot"] for ot in self.ots],
+                          procesadas=len(self.orders_selected), no_encontradas=len(self.orders_not_found))
+        self.log("Finalizado." if resultado != "error" else "Corrida interrumpida por un error.")
+    
+    def resume_from(self, estado):
+        """Restaura lo que la bitácora da por hecho y devuelve las referencias que faltan.
+        
+        Las referencias ya en una OT y las no encontradas no se vuelven a buscar
+        (las no encontradas sí, si la corrida terminó en error; ver load_journal).
+        Los tramos que llegaron a confirmar "Crear OT" sin capturar el número se
+        buscan en el listado en vez de crear la OT otra vez. El resto del
+        asistente vive en la página y se pierde con el navegador: las
+        referencias pendientes vuelven a empezar desde la selección.
+        """
+        self.log(f"\n↩️ Reanudando corrida del {estado['inicio']} (último paso: {estado['ultimo_paso'] or 'ninguno'})")
+        self.orders_selected = list(estado["confirmadas"])
+        self.orders_not_found = list(estado["no_encontradas"])
+        self.orders_skipped = [dict(o) for o in estado["omitidas"]]
+        self.ots = [dict(ot) for ot in estado["ots"]]
+        self.ref_ots.update(estado["ot_por_referencia"])
+        for ot in self.ots:
+            self.skus_sin_stock.extend(sku for sku in ot["sin_stock"] if sku not in self.skus_sin_stock)
+        self.ot_generada = next((ot["ot"] for ot in reversed(self.ots) if ot["ot"]), None)
+        self.tramo = estado["tramos"] + 1
+        self.log(f"  Ya en OT: {len(self.orders_selected)} en {len(self.ots)} OT(s) | "
+                 f"No encontradas: {len(self.orders_not_found)} (no se vuelven a buscar)"
+                 + (f" | Omitidas: {len(self.orders_skipped)}" if self.orders_skipped else ""))
+        
+        for pendiente in estado["sin_captura"]:
+            self.log(f"  Tramo {pendiente['tramo']}: \"Crear OT\" se confirmó sin capturar el número")
+            with self.span("captura_ot", tramo=pendiente["tramo"], reanudada=True) as span:
+                ot_number = self.capture_ot_from_listing(desde=datetime.fromisoformat(pendiente["hora"]))
+                span.resultado = "ok" if ot_number else "sin_numero"
+            if ot_number:
+                self.orders_selected.extend(pendiente["seleccionadas"])
+                self.record_ot(ot_number, pendiente["seleccionadas"], [], tramo=pendiente["tramo"])
+            else:
+                self.log(f"  ⚠️ ADVERTENCIA: no se encontró la OT del tramo {pendiente['tramo']}; sus "
+                         f"{len(pendiente['seleccionadas'])} referencias no se reprocesan para no duplicar "
+                         f"la OT. Revise el listado de Órdenes de Trabajo.")
+        
+        referencias = estado["pendientes"]
+        if referencias is None:
+            # La extracción en streaming no alcanzó a terminar (la caché la hace rápida)
+            self.log(f"  Extrayendo de nuevo {len(estado['pdfs'])} PDF(s)...")
+            referencias = extract_references_parallel(estado["pdfs"], self.canal)["referencias"]
+            self.journal.write("referencias", referencias=referencias)
+            hechas = set(estado["confirmadas"]) | set(estado["no_encontradas"])
+            hechas.update(o["referencia"] for o in estado["omitidas"])
+            hechas.update(ref for p in estado["sin_captura"] for ref in p["seleccionadas"])
+            referencias = [ref for ref in referencias if ref not in hechas]
+        self.log(f"  Pendientes: {len(referencias)}")
+        return self.skip_recent(referencias)
+    
+    def skip_recent(self, references):
+        """Quita las referencias que el historial ya tiene en una OT de los últimos HISTORIAL_DIAS días."""
+        if not self.history or not HISTORIAL_DIAS or not references:
+            return references
+        previas = self.history.recent_ots(references, self.canal, HISTORIAL_DIAS)
+        for ref in references:
+            if ref in previas:
+                ot, fecha = previas[ref]
+                self.orders_skipped.append({"referencia": ref, "ot": ot, "fecha": fecha})
+                self.log(f"  ⏭️ {ref}: ya está en la OT {ot or '(sin número)'} del {fecha}, se omite")
+                self.journal_write("ref", ref=ref, estado="omitida", ot=ot, fecha=fecha)
+        return [ref for ref in references if ref not in previas]
+    
+    def save_history(self, resultado, inicio):
+        """Guarda la corrida en el historial; un error aquí no afecta la corrida."""
+        if not self.history:
+            return
+        referencias = [(ref, "en_ot" if ref in self.ref_ots else "seleccionada", self.ref_ots.get(ref))
+                       for ref in self.orders_selected]
+        referencias += [(ref, "no_encontrada", None) for ref in self.orders_not_found]
+        referencias += [(o["referencia"], "omitida", o["ot"]) for o in self.orders_skipped]
+        try:
+            self.history.record_run(
+                {"id": self.tracer.id, "canal": self.canal, "ubicacion": self.config["ubicacion"],
+                 "perfil": self.perfil, "inicio": inicio, "segundos": round(time.time() - inicio, 2),
+                 "resultado": resultado, "traza": self.tracer.path},
+                referencias, self.ots, self.skus_sin_stock, self.tracer.summary())
+        except sqlite3.Error as e:
+            self.log(f"  (No se pudo guardar el historial: {e})")
+        finally:
+            self.history.close()
+            self.history = None
+    
+    def result(self):
+        """Resultado de la corrida para el resumen de trabajos y la salida JSON."""
+        return {
+            "canal": self.canal,
+            "ubicacion": self.config["ubicacion"],
+            "ot": self.ot_generada,
+            "ots": list(self.ots),
+            "seleccionadas": list(self.orders_selected),
+            "no_encontradas": list(self.orders_not_found),
+            "omitidas": list(self.orders_skipped),
+            "sin_stock": list(self.skus_sin_stock),
+            "tramos_fallidos": list(self.tramos_fallidos),
+            "pasos": self.tracer.summary(),
+            "traza": self.tracer.path,
+        }
     
     def stop(self):
         self.running = False
 
+
+# ============== TRABAJOS EN PARALELO ==============
+
+def run_outcome(resultado):
+    """Estado final de una corrida según WMSAutomation.result(): listo, ya en OT o sin OT."""
+    if resultado["ot"] or resultado.get("ots"):
+        return "listo"
+    if resultado.get("omitidas") and not resultado["seleccionadas"] and not resultado["no_encontradas"]:
+        return "ya en OT"  # Todas las referencias estaban en una OT reciente (historial)
+    return "sin OT"
+
+
+class Job:
+    """Una corrida de WMSAutomation (un canal, sus referencias) dentro de JobScheduler."""
+    
+    def __init__(self, numero, canal, references):
+        self.numero = numero
+        self.canal = canal
+        self.references = references
+        self.estado = "en cola"   # en cola, ejecutando, listo, ya en OT, sin OT, detenido, error
+        self.automation = None
+        self.resultado = None
+        self.error = None
+        self.inicio = None
+        self.fin = None
+    
+    @property
+    def terminado(self):
+        return self.estado not in ("en cola", "ejecutando")
+    
+    @property
+    def segundos(self):
+        if not self.inicio:
+            return 0.0
+        return round((self.fin or time.time()) - self.inicio, 1)
+    
+    def as_dict(self):
+        resultado = self.resultado or {}
+        return {
+            "trabajo": self.numero,
+            "canal": self.canal,
+            "estado": self.estado,
+            "referencias": len(self.references),
+            "ot": resultado.get("ot"),
+            "ots": [ot["ot"] for ot in resultado.get("ots", []) if ot["ot"]],
+            "seleccionadas": len(resultado.get("seleccionadas", [])),
+            "no_encontradas": resultado.get("no_encontradas", []),
+            "omitidas": len(resultado.get("omitidas", [])),
+            "sin_stock": resultado.get("sin_stock", []),
+            "segundos": self.segundos,
+            "error": self.error,
+        }
+
+
+class JobScheduler:
+    """Ejecuta varias WMSAutomation en paralelo, cada una con su navegador y canal.
+    
+    Hasta `limite` trabajos corren a la vez (un hilo y un Chrome por trabajo);
+    los demás esperan en cola. `on_update(job)` se llama desde el hilo del
+    trabajo cada vez que cambia su estado. `opciones` (base_url, headless,
+    perfil) se pasan a cada WMSAutomation.
+    """
+    
+    def __init__(self, limite=TRABAJOS_PARALELOS, on_update=None, log_callback=None, **opciones):
+        self.limite = limite
+        self.pool = ThreadPoolExecutor(max_workers=limite, thread_name_prefix="trabajo")
+        self.on_update = on_update or (lambda job: None)
+        self.log_callback = log_callback or print
+        self.opciones = opciones
+        self.jobs = []
+        self.futures = []
+        self.lock = threading.Lock()
+        self.detenido = False
+    
+    def submit(self, canal, references):
+        with self.lock:
+            job = Job(len(self.jobs) + 1, canal, list(references))
+            self.jobs.append(job)
+            self.futures.append(self.pool.submit(self._run, job))
+        self.on_update(job)
+        return job
+    
+    def _run(self, job):
+        if self.detenido:
+            job.estado = "detenido"
+            self.on_update(job)
+            return job
+        
+        job.estado = "ejecutando"
+        job.inicio = time.time()
+        self.on_update(job)
+        prefijo = f"[{job.canal} #{job.numero}]"
+        job.automation = WMSAutomation(job.canal, log_callback=lambda m: self.log_callback(f"{prefijo} {m}"),
+                                       **self.opciones)
+        try:
+            job.automation.run(job.references)
+            job.resultado = job.automation.result()
+            if not job.automation.running:
+                job.estado = "detenido"
+            else:
+                job.estado = run_outcome(job.resultado)
+        except Exception as e:
+            job.error = str(e)
+            job.estado = "error"
+            self.log_callback(f"{prefijo} Error: {e}")
+            if job.automation.driver:
+                try:
+                    job.automation.driver.quit()
+                except Exception:
+                    pass
+        job.fin = time.time()
+        self.on_update(job)
+        return job
+    
+    @property
+    def pendientes(self):
+        return sum(1 for job in self.jobs if not job.terminado)
+    
+    def wait(self):
+        """Espera a que terminen todos los trabajos enviados y devuelve el resumen."""
+        for future in list(self.futures):
+            future.result()
+        return self.summary()
+    
+    def stop(self):
+        """Detiene los trabajos en curso; los que estaban en cola no arrancan."""
+        self.detenido = True
+        for job in self.jobs:
+            if job.automation:
+                job.automation.stop()
+    
+    def shutdown(self):
+        self.stop()
+        self.pool.shutdown(wait=False)
+    
+    def summary(self):
+        """Resumen agregado: OTs, no encontradas y SKUs sin stock por trabajo."""
+        trabajos = [job.as_dict() for job in self.jobs]
+        return {
+            "trabajos": trabajos,
+            "ots": [ot for t in trabajos for ot in t["ots"]],
+            "seleccionadas": sum(t["seleccionadas"] for t in trabajos),
+            "no_encontradas": sum(len(t["no_encontradas"]) for t in trabajos),
+            "sin_stock": sum(len(t["sin_stock"]) for t in trabajos),
+        }
+    
+    def summary_lines(self):
+        """Líneas del RESUMEN DE TRABAJOS para el log."""
+        resumen = self.summary()
+        lineas = [f"{'#':>3} {'Canal':<14}{'Estado':<11}{'OT':<17}{'refs':>6}{'selecc.':>9}"
+                  f"{'no enc.':>9}{'sin stock':>11}{'s':>8}"]
+        for t in resumen["trabajos"]:
+            ot = f"{t['ot']} (+{len(t['ots']) - 1})" if len(t["ots"]) > 1 else t["ot"] or "-"
+            lineas.append(f"{t['trabajo']:>3} {t['canal']:<14}{t['estado']:<11}{ot:<17}"
+                          f"{t['referencias']:>6}{t['seleccionadas']:>9}{len(t['no_encontradas']):>9}"
+                          f"{len(t['sin_stock']):>11}{t['segundos']:>8.0f}")
+        lineas.append(f"OTs: {len(resumen['ots'])} | Seleccionadas: {resumen['seleccionadas']} | "
+                      f"No encontradas: {resumen['no_encontradas']} | SKUs sin stock: {resumen['sin_stock']}")
+        return lineas
+
 # ============== INTERFAZ GRÁFICA MEJORADA ==============
 
 # Colores por canal
@@ -1143,7 +2289,7 @@ CANAL_COLORS = {
 }
 
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, perfil=PERFIL_NAVEGADOR):
         super().__init__()
         
         self.title("DCIC - Sistema de Despachos")
@@ -1157,7 +2303,13 @@ class App(ctk.CTk):
         self.references = []
         self.canal_actual = "Falabella"
         self.automation = None
+        self.browser_session = BrowserSession()  # Chrome que sobrevive entre corridas (opt-in)
+        self.scheduler = None                    # JobScheduler, al agregar el primer trabajo a la cola
+        self.job_rows = {}
+        self.perfil_inicial = perfil
         self.running = False
+        self.streaming = False
+        self.extraction_id = 0                   # Solo se aplica el resultado de la última extracción
         self.current_step = 0
         
         # Configurar drag and drop
@@ -1165,6 +2317,7 @@ class App(ctk.CTk):
         
         self.create_widgets()
         self.apply_canal_theme()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def create_widgets(self):
         # Frame principal con gradiente
@@ -1310,6 +2463,63 @@ class App(ctk.CTk):
         )
         self.extract_btn.pack(fill="x", padx=15, pady=5)
         
+        # Modo pipeline: la automatización arranca mientras se extrae
+        self.pipeline_var = ctk.BooleanVar(value=False)
+        self.pipeline_switch = ctk.CTkSwitch(
+            self.left_panel,
+            text="⚡ Automatizar mientras se extrae",
+            variable=self.pipeline_var,
+            font=ctk.CTkFont(size=12),
+            text_color="#cccccc"
+        )
+        self.pipeline_switch.pack(anchor="w", padx=15, pady=(5, 0))
+        
+        # Sesión persistente: el navegador queda abierto y con la sesión iniciada entre corridas
+        self.session_var = ctk.BooleanVar(value=SESION_PERSISTENTE)
+        self.session_switch = ctk.CTkSwitch(
+            self.left_panel,
+            text="🔁 Mantener navegador abierto",
+            variable=self.session_var,
+            command=self.on_session_toggle,
+            font=ctk.CTkFont(size=12),
+            text_color="#cccccc"
+        )
+        self.session_switch.pack(anchor="w", padx=15, pady=(5, 0))
+        
+        # Perfil del navegador (ver BROWSER_PROFILES)
+        self.perfil_frame = ctk.CTkFrame(self.left_panel, fg_color="transparent")
+        self.perfil_frame.pack(fill="x", padx=15, pady=(5, 0))
+        
+        ctk.CTkLabel(
+            self.perfil_frame,
+            text="🌐 Navegador:",
+            font=ctk.CTkFont(size=12),
+            text_color="#cccccc"
+        ).pack(side="left")
+        
+        self.perfil_var = ctk.StringVar(value=self.perfil_inicial)
+        self.perfil_menu = ctk.CTkOptionMenu(
+            self.perfil_frame,
+            values=list(BROWSER_PROFILES.keys()),
+            variable=self.perfil_var,
+            width=130,
+            height=28,
+            font=ctk.CTkFont(size=12)
+        )
+        self.perfil_menu.pack(side="left", padx=5)
+        
+        # Cola de trabajos: varios canales en paralelo, cada uno en su navegador
+        self.queue_btn = ctk.CTkButton(
+            self.left_panel,
+            text="➕ AGREGAR A LA COLA",
+            command=self.add_job,
+            height=35,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#6c757d",
+            hover_color="#5a6268"
+        )
+        self.queue_btn.pack(fill="x", padx=15, pady=(8, 0))
+        
         # Referencias encontradas
         self.ref_header = ctk.CTkFrame(self.left_panel, fg_color="transparent")
         self.ref_header.pack(fill="x", padx=15, pady=(10, 5))
@@ -1335,6 +2545,16 @@ class App(ctk.CTk):
         self.right_panel = ctk.CTkFrame(self.content_frame, fg_color="#252525", corner_radius=15)
         self.right_panel.pack(side="right", fill="both", expand=True, padx=(10, 0), pady=5)
         
+        # Trabajos en cola (se muestra al agregar el primero)
+        self.jobs_frame = ctk.CTkFrame(self.right_panel, fg_color="#1e1e1e", corner_radius=10)
+        self.jobs_title = ctk.CTkLabel(
+            self.jobs_frame,
+            text=f"🗂️ Trabajos (hasta {TRABAJOS_PARALELOS} en paralelo)",
+            font=ctk.CTkFont(size=13, weight="bold"),
+            text_color="#ffffff"
+        )
+        self.jobs_title.pack(anchor="w", padx=10, pady=(8, 2))
+        
         # Header del log
         self.log_header = ctk.CTkFrame(self.right_panel, fg_color="transparent")
         self.log_header.pack(fill="x", padx=15, pady=(15, 5))
@@ -1390,6 +2610,19 @@ class App(ctk.CTk):
         )
         self.stop_btn.pack(side="left", padx=10)
         
+        # Reanudar la última corrida interrumpida (ver RunJournal)
+        self.resume_btn = ctk.CTkButton(
+            self.control_container,
+            text="↩️  REANUDAR",
+            command=self.resume_automation,
+            width=140,
+            height=50,
+            font=ctk.CTkFont(size=14, weight="bold"),
+            fg_color="#fd7e14",
+            hover_color="#e8590c"
+        )
+        self.resume_btn.pack(side="left", padx=10)
+        
         # Botón NUEVO (limpiar todo)
         self.new_btn = ctk.CTkButton(
             self.control_container,
@@ -1413,10 +2646,34 @@ class App(ctk.CTk):
         self.status_label.pack(side="left", padx=20)
     def reset_all(self):
         """Limpia todo para empezar de nuevo."""
+        self.clear_inputs()
+        
+        # Limpiar log
+        self.log_textbox.configure(state="normal")
+        self.log_textbox.delete("1.0", "end")
+        self.log_textbox.configure(state="disabled")
+        
+        # Reset progreso
+        self.update_progress(0)
+        
+        # Reset status
+        self.status_label.configure(text="● Listo", text_color="#28a745")
+        
+        # Log mensaje
+        self.log("🔄 Listo para nuevo proceso", "info")
+    
+    def clear_inputs(self):
+        """Limpia los PDFs y las referencias (no el log)."""
         # Limpiar PDFs
         self.pdf_paths = []
         self.references = []
         
+        # Descartar el resultado de una extracción en curso
+        self.extraction_id += 1
+        if not self.running:
+            self.extract_btn.configure(state="normal")
+            self.start_btn.configure(state="normal")
+        
         # Reset área de drop
         self.drop_label.configure(
             text="📂 Haz clic para seleccionar PDFs\no arrástralos aquí",
@@ -1433,20 +2690,6 @@ class App(ctk.CTk):
         self.ref_textbox.configure(state="normal")
         self.ref_textbox.delete("1.0", "end")
         self.ref_textbox.configure(state="disabled")
-        
-        # Limpiar log
-        self.log_textbox.configure(state="normal")
-        self.log_textbox.delete("1.0", "end")
-        self.log_textbox.configure(state="disabled")
-        
-        # Reset progreso
-        self.update_progress(0)
-        
-        # Reset status
-        self.status_label.configure(text="● Listo", text_color="#28a745")
-        
-        # Log mensaje
-        self.log("🔄 Listo para nuevo proceso", "info")
     
     def apply_canal_theme(self):
         """Aplica los colores según el canal seleccionado."""
@@ -1516,26 +2759,87 @@ class App(ctk.CTk):
             
             self.log(f"📂 Seleccionados {len(self.pdf_paths)} archivos PDF", "info")
             
-            # Detectar canal automáticamente
-            detected = detect_canal_from_pdf(self.pdf_paths[0])
-            if detected:
-                self.canal_actual = detected
-                self.canal_var.set(detected)
-                self.apply_canal_theme()
-                self.log(f"🔍 Canal detectado: {detected}", "success")
-    
-    def extract_references(self):
+            if self.pipeline_var.get():
+                # La extracción corre durante la automatización: solo detectar canal
+                detected = detect_canal_from_pdf(self.pdf_paths[0])
+                if detected:
+                    self.canal_actual = detected
+                    self.canal_var.set(detected)
+                    self.apply_canal_theme()
+                    self.log(f"🔍 Canal detectado: {detected}", "success")
+            else:
+                # Detectar canal y extraer en el mismo escaneo
+                self.extract_references(detect=True)
+    
+    def extract_references(self, detect=False):
         if not self.pdf_paths:
             messagebox.showwarning("Aviso", "Primero selecciona archivos PDF")
             return
         
         self.status_label.configure(text="● Extrayendo...", text_color="#FFE600")
         self.update_progress(2)
-        self.update()
+        self.extract_btn.configure(state="disabled")
+        self.start_btn.configure(state="disabled")
+        
+        # La extracción corre en un hilo; el resultado vuelve al hilo de Tk con after()
+        self.extraction_id += 1
+        thread = threading.Thread(target=self.extract_worker,
+                                  args=(self.extraction_id, list(self.pdf_paths), detect, self.canal_actual),
+                                  daemon=True)
+        thread.start()
+    
+    def extract_worker(self, extraction_id, pdf_paths, detect, canal):
+        """Extrae fuera del hilo de Tk y entrega el resultado a on_extraction_complete."""
+        try:
+            resultado = extract_references_parallel(pdf_paths, None if detect else canal)
+            if detect and not resultado["detectado"]:
+                # Sin canal detectado (p. ej. PDF imagen): usar el canal actual.
+                # Las páginas ya escaneadas salen de la caché.
+                resultado = extract_references_parallel(pdf_paths, canal)
+        except Exception as e:
+            self.after(0, self.on_extraction_complete, extraction_id, None, e)
+            return
+        self.after(0, self.on_extraction_complete, extraction_id, resultado, None)
+    
+    def on_extraction_complete(self, extraction_id, resultado, error):
+        if extraction_id != self.extraction_id:
+            return  # Otra extracción (otros PDFs u otro canal) empezó mientras tanto
+        self.extract_btn.configure(state="normal")
+        if not self.running:
+            self.start_btn.configure(state="normal")
+        if error:
+            self.status_label.configure(text="● Error", text_color="#dc3545")
+            self.log(f"Error extrayendo referencias: {error}", "error")
+            return
         
-        self.references = extract_references(self.pdf_paths, self.canal_actual)
+        detected = resultado["detectado"]
+        if detected:
+            self.canal_actual = detected
+            self.canal_var.set(detected)
+            self.apply_canal_theme()
+            self.log(f"🔍 Canal detectado: {detected}", "success")
+        
+        self.references = resultado["referencias"]
+        
+        for archivo in resultado["archivos"]:
+            if archivo["detectado"] and archivo["detectado"] != self.canal_actual:
+                self.log(f"{os.path.basename(archivo['archivo'])} parece de {archivo['detectado']}", "warning")
+            metodo = " (OCR)" if archivo["ocr"] else ""
+            self.log(f"📄 {os.path.basename(archivo['archivo'])}: {len(archivo['referencias'])} refs, "
+                     f"{archivo['paginas']} págs, {archivo['segundos']:.1f}s{metodo}")
+        self.log(f"⏱️ Extracción: {resultado['segundos']:.1f}s con {resultado['trabajadores']} proceso(s)")
+        self.log(f"💾 Caché: {resultado['cache']['aciertos']} páginas en caché, "
+                 f"{resultado['cache']['fallos']} procesadas")
+        self.log(f"📑 Tablas: {resultado['tablas']['solo_texto']} páginas solo texto, "
+                 f"{resultado['tablas']['respaldo']} con respaldo de tablas")
+        
+        self.show_references()
         
-        # Mostrar referencias
+        self.status_label.configure(text="● Listo", text_color="#28a745")
+        self.log(f"✅ Extraídas {len(self.references)} referencias para {self.canal_actual}", "success")
+    
+    def show_references(self):
+        """Muestra la lista completa de referencias."""
         self.ref_label.configure(text=f"Referencias encontradas: {len(self.references)}")
         
         self.ref_textbox.configure(state="normal")
@@ -1543,9 +2847,16 @@ class App(ctk.CTk):
         for i, ref in enumerate(self.references, 1):
             self.ref_textbox.insert("end", f"{i:3}. {ref}\n")
         self.ref_textbox.configure(state="disabled")
+    
+    def add_reference(self, ref):
+        """Agrega una referencia llegada desde la extracción en streaming."""
+        self.references.append(ref)
+        self.ref_label.configure(text=f"Referencias encontradas: {len(self.references)}")
         
-        self.status_label.configure(text="● Listo", text_color="#28a745")
-        self.log(f"✅ Extraídas {len(self.references)} referencias para {self.canal_actual}", "success")
+        self.ref_textbox.configure(state="normal")
+        self.ref_textbox.insert("end", f"{len(self.references):3}. {ref}\n")
+        self.ref_textbox.see("end")
+        self.ref_textbox.configure(state="disabled")
     
     def log(self, message, msg_type="normal"):
         """Agrega mensaje al log con color según tipo."""
@@ -1604,26 +2915,60 @@ class App(ctk.CTk):
         self.update()
     
     def start_automation(self):
-        if not self.references:
+        # Modo pipeline: sin referencias extraídas, se extraen durante la automatización
+        self.streaming = self.pipeline_var.get() and bool(self.pdf_paths) and not self.references
+        
+        if not self.references and not self.streaming:
             messagebox.showwarning("Aviso", "No hay referencias para procesar.\nExtrae las referencias primero.")
             return
         
-        if not messagebox.askyesno("Confirmar", f"¿Procesar {len(self.references)} referencias de {self.canal_actual}?"):
+        if self.streaming:
+            pregunta = f"¿Extraer y procesar las referencias de {len(self.pdf_paths)} PDF(s) de {self.canal_actual}?"
+        else:
+            pregunta = f"¿Procesar {len(self.references)} referencias de {self.canal_actual}?"
+        if not messagebox.askyesno("Confirmar", pregunta):
+            return
+        self.launch()
+    
+    def resume_automation(self):
+        """Reanuda la última corrida que quedó sin terminar (ver RunJournal)."""
+        estado = last_journal(BITACORA_DIR)
+        if not estado:
+            messagebox.showinfo("Reanudar", "No hay corridas interrumpidas para reanudar.")
+            return
+        
+        pendientes = len(estado["pendientes"]) if estado["pendientes"] is not None else "por extraer"
+        pregunta = (f"Corrida de {estado['canal']} del {estado['inicio']}\n"
+                    f"Último paso: {estado['ultimo_paso'] or 'ninguno'}\n\n"
+                    f"Ya en OT: {len(estado['confirmadas'])} en {len(estado['ots'])} OT(s)\n"
+                    f"No encontradas: {len(estado['no_encontradas'])}\n"
+                    f"OTs a buscar en el listado: {len(estado['sin_captura'])}\n"
+                    f"Pendientes: {pendientes}\n\n¿Reanudar?")
+        if not messagebox.askyesno("Reanudar", pregunta):
             return
         
+        self.canal_actual = estado["canal"]
+        self.canal_var.set(estado["canal"])
+        self.apply_canal_theme()
+        self.streaming = False
+        self.launch(reanudar=estado)
+    
+    def launch(self, reanudar=None):
         self.running = True
         self.start_btn.configure(state="disabled")
+        self.resume_btn.configure(state="disabled")
         self.stop_btn.configure(state="normal")
         self.extract_btn.configure(state="disabled")
         self.canal_menu.configure(state="disabled")
+        self.perfil_menu.configure(state="disabled")
         self.status_label.configure(text="● Ejecutando...", text_color="#FFE600")
         
         # Ejecutar en thread separado
-        thread = threading.Thread(target=self.run_automation)
+        thread = threading.Thread(target=self.run_automation, args=(reanudar,))
         thread.daemon = True
         thread.start()
     
-    def run_automation(self):
+    def run_automation(self, reanudar=None):
         try:
             # Wrapper del log para actualizar progreso
             def log_wrapper(msg):
@@ -1638,8 +2983,21 @@ class App(ctk.CTk):
                 elif "[4/5]" in msg or "[5/5]" in msg:
                     self.after(0, lambda: self.update_progress(6))
             
-            self.automation = WMSAutomation(self.canal_actual, log_callback=log_wrapper)
-            self.automation.run(self.references.copy())
+            if reanudar:
+                references = None
+            elif self.streaming:
+                self.after(0, self.show_references)
+                references = ReferenceStream(
+                    self.pdf_paths, self.canal_actual,
+                    on_reference=lambda item: self.after(0, self.add_reference, item["referencia"])
+                ).start()
+            else:
+                references = self.references.copy()
+            
+            session = self.browser_session if self.session_var.get() else None
+            self.automation = WMSAutomation(self.canal_actual, log_callback=log_wrapper, session=session,
+                                            perfil=self.perfil_var.get())
+            self.automation.run(references, reanudar=reanudar)
         except Exception as e:
             self.log(f"Error: {e}", "error")
         finally:
@@ -1647,10 +3005,14 @@ class App(ctk.CTk):
             self.after(0, self.on_automation_complete)
     
     def on_automation_complete(self):
+        self.on_session_toggle()
         self.start_btn.configure(state="normal")
-        self.stop_btn.configure(state="disabled")
+        self.resume_btn.configure(state="normal")
+        if not (self.scheduler and self.scheduler.pendientes):
+            self.stop_btn.configure(state="disabled")
         self.extract_btn.configure(state="normal")
         self.canal_menu.configure(state="normal")
+        self.perfil_menu.configure(state="normal")
         self.status_label.configure(text="● Completado", text_color="#28a745")
         self.update_progress(6)
         
@@ -1659,13 +3021,14 @@ class App(ctk.CTk):
         self.focus_force()
         
         # Notificación sonora (3 beeps)
-        try:
-            for _ in range(3):
-                winsound.Beep(800, 200)  # Frecuencia 800Hz, duración 200ms
-                time.sleep(0.1)
-            winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
-        except:
-            pass
+        if winsound:
+            try:
+                for _ in range(3):
+                    winsound.Beep(800, 200)  # Frecuencia 800Hz, duración 200ms
+                    time.sleep(0.1)
+                winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
+            except:
+                pass
         
         # Mostrar mensaje popup
         messagebox.showinfo("✅ Completado", f"Automatización de {self.canal_actual} finalizada.\\n\\nRevisa el log para ver el resumen.")
@@ -1674,12 +3037,428 @@ class App(ctk.CTk):
         if self.automation:
             self.automation.stop()
             self.log("⏹️ Deteniendo automatización...", "warning")
+        if self.scheduler and self.scheduler.pendientes:
+            self.scheduler.stop()
+            self.log("⏹️ Deteniendo trabajos en cola...", "warning")
+    
+    def add_job(self):
+        """Agrega el canal y las referencias actuales como trabajo en paralelo."""
+        if not self.references:
+            messagebox.showwarning("Aviso", "No hay referencias para agregar.\nExtrae las referencias primero.")
+            return
+        
+        if not self.scheduler or self.scheduler.detenido:
+            self.scheduler = JobScheduler(
+                on_update=lambda job: self.after(0, self.on_job_update, job),
+                log_callback=lambda msg: self.after(0, self.log, msg),
+                perfil=self.perfil_var.get()
+            )
+            for row in self.job_rows.values():
+                row.destroy()
+            self.job_rows = {}
+        
+        if not self.jobs_frame.winfo_ismapped():
+            self.jobs_frame.pack(fill="x", padx=15, pady=(15, 0), before=self.log_header)
+        
+        job = self.scheduler.submit(self.canal_actual, self.references)
+        self.log(f"➕ Trabajo #{job.numero}: {self.canal_actual} con {len(job.references)} referencias", "info")
+        self.clear_inputs()
+        self.stop_btn.configure(state="normal")
+        self.status_label.configure(text=f"● {self.scheduler.pendientes} trabajo(s) en curso", text_color="#FFE600")
+    
+    def on_job_update(self, job):
+        """Actualiza la fila del trabajo (hilo de la GUI)."""
+        colores = {"en cola": "#888888", "ejecutando": "#FFE600", "listo": "#28a745", "ya en OT": "#28a745",
+                   "sin OT": "#FF8C00", "detenido": "#FF8C00", "error": "#dc3545"}
+        texto = f"#{job.numero} {job.canal} · {len(job.references)} refs · {job.estado}"
+        if job.resultado:
+            texto += (f" · OT {job.resultado['ot'] or '-'} · {len(job.resultado['no_encontradas'])} no enc."
+                      f" · {len(job.resultado['sin_stock'])} sin stock")
+        if job.terminado and job.inicio:
+            texto += f" · {job.segundos:.0f}s"
+        
+        row = self.job_rows.get(job.numero)
+        if not row:
+            row = ctk.CTkLabel(self.jobs_frame, font=ctk.CTkFont(family="Consolas", size=11), anchor="w")
+            row.pack(fill="x", padx=10, pady=(0, 4))
+            self.job_rows[job.numero] = row
+        row.configure(text=texto, text_color=colores.get(job.estado, "#cccccc"))
+        
+        if job.terminado and not self.scheduler.pendientes:
+            self.on_jobs_complete()
+        elif self.scheduler.pendientes:
+            self.status_label.configure(text=f"● {self.scheduler.pendientes} trabajo(s) en curso",
+                                        text_color="#FFE600")
+    
+    def on_jobs_complete(self):
+        self.log(f"\n{'='*50}")
+        self.log("RESUMEN DE TRABAJOS")
+        self.log(f"{'='*50}")
+        for linea in self.scheduler.summary_lines():
+            self.log(linea)
+        if not self.running:
+            self.stop_btn.configure(state="disabled")
+        self.status_label.configure(text="● Trabajos completados", text_color="#28a745")
+        if winsound:
+            try:
+                winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
+            except:
+                pass
+    
+    def on_session_toggle(self):
+        """Al apagar la sesión persistente se cierra el navegador que quedó abierto."""
+        if not self.session_var.get() and not self.running:
+            threading.Thread(target=self.browser_session.close, daemon=True).start()
+    
+    def on_close(self):
+        if self.automation:
+            self.automation.stop()
+        if self.scheduler:
+            self.scheduler.shutdown()
+        self.browser_session.close()
+        self.destroy()
+
+
+# ============== MODO LOTE (SIN GUI) ==============
+
+def list_pdfs(rutas):
+    """PDFs de una lista de archivos y carpetas (las carpetas sin recursión)."""
+    pdfs = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            pdfs.extend(sorted(os.path.join(ruta, f) for f in os.listdir(ruta) if f.lower().endswith(".pdf")))
+        elif ruta.lower().endswith(".pdf"):
+            pdfs.append(ruta)
+    return pdfs
+
+
+def run_batch(pdf_paths, canal=None, perfil="rendimiento", trabajos=TRABAJOS_PARALELOS, solo_extraer=False,
+              log=print):
+    """Clasifica cada PDF por canal, extrae por grupo y corre un WMSAutomation por canal.
+    
+    Los PDF sin canal detectado (p. ej. solo imagen) usan `canal` si se indica;
+    si no, quedan en "sin_canal". Devuelve el resultado para la salida JSON.
+    """
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    
+    clasificados = classify_pdfs(pdf_paths)
+    segundos_clasificacion = round(time.perf_counter() - t0, 2)
+    grupos = {}
+    sin_canal = []
+    for path in pdf_paths:
+        detectado = clasificados[path] or canal
+        if detectado:
+            grupos.setdefault(detectado, []).append(path)
+        else:
+            sin_canal.append(path)
+        log(f"📄 {os.path.basename(path)}: {clasificados[path] or 'sin detectar'}"
+            f"{f' -> {canal}' if not clasificados[path] and canal else ''}")
+    
+    extracciones = {}
+    for nombre, paths in grupos.items():
+        extracciones[nombre] = extract_references_parallel(paths, nombre)
+        log(f"🔍 {nombre}: {len(extracciones[nombre]['referencias'])} referencias de {len(paths)} PDF(s) "
+            f"en {extracciones[nombre]['segundos']:.1f}s")
+    
+    jobs = {}
+    if not solo_extraer:
+        scheduler = JobScheduler(limite=trabajos, log_callback=log, perfil=perfil)
+        for nombre, extraccion in extracciones.items():
+            if extraccion["referencias"]:
+                jobs[nombre] = scheduler.submit(nombre, extraccion["referencias"])
+        scheduler.wait()
+        for linea in scheduler.summary_lines():
+            log(linea)
+    
+    grupos_json = []
+    for nombre, paths in grupos.items():
+        extraccion = extracciones[nombre]
+        job = jobs.get(nombre)
+        resultado = (job.resultado if job else None) or {}
+        grupos_json.append({
+            "canal": nombre,
+            "archivos": [os.path.basename(p) for p in paths],
+            "referencias": len(extraccion["referencias"]),
+            "estado": job.estado if job else ("sin referencias" if not extraccion["referencias"] else "extraido"),
+            "ot": resultado.get("ot"),
+            "ots": resultado.get("ots", []),
+            "seleccionadas": resultado.get("seleccionadas", []),
+            "no_encontradas": resultado.get("no_encontradas", []),
+            "omitidas": resultado.get("omitidas", []),
+            "sin_stock": resultado.get("sin_stock", []),
+            "tramos_fallidos": resultado.get("tramos_fallidos", []),
+            "error": job.error if job else None,
+            "tiempos": {
+                "extraccion": round(extraccion["segundos"], 2),
+                "automatizacion": job.segundos if job else None,
+                "pasos": resultado.get("pasos", []),
+            },
+            "traza": resultado.get("traza"),
+        })
+    
+    return {
+        "inicio": inicio.isoformat(timespec="seconds"),
+        "segundos": round(time.perf_counter() - t0, 2),
+        "clasificacion_segundos": segundos_clasificacion,
+        "perfil": perfil,
+        "grupos": grupos_json,
+        "sin_canal": [os.path.basename(p) for p in sin_canal],
+    }
+
+
+class FolderWatcher:
+    """Procesa los manifiestos que van llegando a una carpeta, con un solo navegador caliente.
+    
+    Cada `intervalo` segundos se listan los PDF de la carpeta. Uno queda listo
+    cuando su tamaño y fecha no cambian durante `estable` segundos y ya se
+    puede abrir como PDF. Los listos se clasifican por canal y cada grupo se
+    procesa cuando su primer archivo lleva `ventana` segundos esperando, así
+    una tanda que llega junta va en la misma OT. Todas las corridas usan la
+    misma BrowserSession. Cada PDF procesado se mueve a
+    `archivo/AAAA-MM-DD/` (o `archivo/errores/`, `archivo/sin_canal/`) con
+    un `.json` al lado con su resultado.
+    """
+    
+    def __init__(self, carpeta, archivo=None, canal=None, perfil="rendimiento", ventana=VIGILAR_VENTANA,
+                 intervalo=VIGILAR_INTERVALO, estable=VIGILAR_ESTABLE, log=print):
+        self.carpeta = carpeta
+        self.archivo = archivo or os.path.join(carpeta, "procesados")
+        self.canal = canal
+        self.perfil = perfil
+        self.ventana = ventana
+        self.intervalo = intervalo
+        self.estable = estable
+        self.log = log
+        self.session = BrowserSession()
+        self.vistos = {}      # ruta -> (tamaño, fecha, sin cambios desde)
+        self.pendientes = {}  # canal -> [(ruta, listo desde)]
+        self.omitidos = set() # Rutas que no se pudieron mover: no se vuelven a procesar
+        self.stats = {"archivos": 0, "referencias": 0, "ots": 0, "errores": 0, "grupos": 0,
+                      "segundos_proceso": 0.0, "inicio": time.time()}
+        self.running = True
+    
+    def _is_complete(self, ruta):
+        try:
+            with open(ruta, "rb") as f:
+                return f.read(5) == b"%PDF-"
+        except OSError:
+            return False  # Todavía bloqueado por quien lo está copiando
+    
+    def poll(self, ahora):
+        """Revisa la carpeta y devuelve los PDF que quedaron listos en esta pasada."""
+        en_espera = {ruta for rutas in self.pendientes.values() for ruta, _ in rutas}
+        actuales = set()
+        listos = []
+        for nombre in sorted(os.listdir(self.carpeta)):
+            ruta = os.path.join(self.carpeta, nombre)
+            if (not nombre.lower().endswith(".pdf") or ruta in en_espera or ruta in self.omitidos
+                    or not os.path.isfile(ruta)):
+                continue
+            try:
+                info = os.stat(ruta)
+            except OSError:
+                continue
+            actuales.add(ruta)
+            firma = (info.st_size, info.st_mtime)
+            previo = self.vistos.get(ruta)
+            if not previo or previo[:2] != firma:
+                self.vistos[ruta] = (*firma, ahora)
+            elif info.st_size and ahora - previo[2] >= self.estable and self._is_complete(ruta):
+                del self.vistos[ruta]
+                listos.append(ruta)
+        # Olvidar los que desaparecieron antes de quedar listos
+        for ruta in set(self.vistos) - actuales:
+            del self.vistos[ruta]
+        return listos
+    
+    def enqueue(self, ruta, ahora):
+        canal = detect_canal_from_pdf(ruta) or self.canal
+        if not canal:
+            self.log(f"📄 {os.path.basename(ruta)}: canal no detectado")
+            self.archive([ruta], "sin_canal", {"estado": "sin canal"})
+            return
+        self.log(f"📄 {os.path.basename(ruta)}: {canal}")
+        self.pendientes.setdefault(canal, []).append((ruta, ahora))
+    
+    def ready(self, ahora):
+        """Canales cuyo primer PDF en espera ya cumplió la ventana."""
+        return [canal for canal, rutas in self.pendientes.items() if ahora - rutas[0][1] >= self.ventana]
+    
+    def process(self, canal):
+        rutas = [ruta for ruta, _ in self.pendientes.pop(canal)]
+        t0 = time.perf_counter()
+        self.log(f"\n▶️ {canal}: {len(rutas)} PDF(s)")
+        try:
+            extraccion = extract_references_parallel(rutas, canal)
+            referencias = extraccion["referencias"]
+            por_archivo = {a["archivo"]: a["referencias"] for a in extraccion["archivos"]}
+            resultado = {"estado": "sin referencias", "ot": None, "no_encontradas": [], "sin_stock": []}
+            if referencias:
+                automation = WMSAutomation(canal, log_callback=self.log, perfil=self.perfil, session=self.session)
+                automation.run(referencias)
+                resultado = automation.result()
+                resultado["estado"] = run_outcome(resultado)
+        except Exception as e:
+            self.log(f"❌ {canal}: {e}")
+            self.stats["errores"] += 1
+            self.session.close()  # El navegador puede haber quedado en un estado desconocido
+            self.archive(rutas, "errores", {"estado": "error", "canal": canal, "error": str(e)})
+            return
+        
+        segundos = time.perf_counter() - t0
+        self.stats["grupos"] += 1
+        self.stats["archivos"] += len(rutas)
+        self.stats["referencias"] += len(referencias)
+        self.stats["ots"] += len(resultado.get("ots", []))
+        self.stats["segundos_proceso"] += segundos
+        
+        destino = datetime.now().strftime("%Y-%m-%d") if resultado["estado"] in ("listo", "ya en OT") else "errores"
+        no_encontradas = set(resultado["no_encontradas"])
+        for ruta in rutas:
+            refs = por_archivo.get(ruta, [])
+            self.archive([ruta], destino, {
+                "estado": resultado["estado"],
+                "canal": canal,
+                "ot": resultado["ot"],
+                "ots": [ot["ot"] for ot in resultado.get("ots", [])],
+                "grupo": [os.path.basename(r) for r in rutas],
+                "referencias": refs,
+                "no_encontradas": [r for r in refs if r in no_encontradas],
+                "sin_stock": resultado["sin_stock"],
+                "segundos_grupo": round(segundos, 1),
+                "traza": resultado.get("traza"),
+            })
+        self.log(f"✅ {canal}: OT {resultado['ot'] or '-'}, {len(referencias)} referencias en {segundos:.0f}s")
+    
+    def archive(self, rutas, subcarpeta, resultado):
+        """Mueve los PDF a archivo/subcarpeta y escribe al lado su resultado (<pdf>.json)."""
+        destino = os.path.join(self.archivo, subcarpeta)
+        os.makedirs(destino, exist_ok=True)
+        for ruta in rutas:
+            nombre = os.path.basename(ruta)
+            final = os.path.join(destino, nombre)
+            if os.path.exists(final):
+                base, ext = os.path.splitext(nombre)
+                final = os.path.join(destino, f"{base}_{datetime.now().strftime('%H%M%S')}{ext}")
+            try:
+                shutil.move(ruta, final)
+            except OSError as e:
+                self.log(f"⚠️ No se pudo mover {nombre}: {e}")
+                self.omitidos.add(ruta)
+                final = ruta
+            with open(final + ".json", "w", encoding="utf-8") as f:
+                json.dump({"archivo": nombre, "procesado": datetime.now().isoformat(timespec="seconds"),
+                           **resultado}, f, ensure_ascii=False, indent=2)
+    
+    def report(self):
+        horas = max((time.time() - self.stats["inicio"]) / 3600, 1e-9)
+        en_espera = sum(len(r) for r in self.pendientes.values())
+        proceso = self.stats["segundos_proceso"]
+        self.log(f"📊 {self.stats['archivos']} PDF(s) en {self.stats['grupos']} grupo(s), "
+                 f"{self.stats['ots']} OT(s), {self.stats['errores']} error(es) | "
+                 f"{self.stats['archivos'] / horas:.1f} PDF/h, "
+                 f"{self.stats['referencias'] / proceso * 60 if proceso else 0:.0f} refs/min procesando | "
+                 f"pendientes: {en_espera} en espera, {len(self.vistos)} escribiéndose")
+    
+    def run(self):
+        self.log(f"👀 Vigilando {self.carpeta} (ventana {self.ventana}s, archivo {self.archivo})")
+        ultimo_reporte = time.time()
+        try:
+            while self.running:
+                ahora = time.time()
+                for ruta in self.poll(ahora):
+                    self.enqueue(ruta, ahora)
+                for canal in self.ready(time.time()):
+                    self.process(canal)
+                    self.report()
+                if time.time() - ultimo_reporte >= VIGILAR_REPORTE:
+                    self.report()
+                    ultimo_reporte = time.time()
+                time.sleep(self.intervalo)
+        except KeyboardInterrupt:
+            self.log("⏹️ Vigilancia detenida")
+        finally:
+            self.session.close()
+            self.report()
+    
+    def stop(self):
+        self.running = False
 
 
-def main():
-    app = App()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DCIC - Sistema de Despachos")
+    parser.add_argument("--perfil", choices=list(BROWSER_PROFILES),
+                        help=f"perfil del navegador (GUI: {PERFIL_NAVEGADOR}, --batch: rendimiento)")
+    parser.add_argument("--batch", nargs="+", metavar="RUTA",
+                        help="sin GUI: procesar estos PDFs o carpetas, un trabajo por canal detectado")
+    parser.add_argument("--vigilar", metavar="CARPETA",
+                        help="sin GUI: procesar los PDF que lleguen a esta carpeta (Ctrl+C para terminar)")
+    parser.add_argument("--reanudar", nargs="?", const="", metavar="BITACORA",
+                        help="sin GUI: reanudar esta bitácora o, sin valor, la última corrida interrumpida")
+    parser.add_argument("--historial", nargs="?", const="", metavar="CANAL",
+                        help="sin GUI: tendencias del historial por canal y día (de un canal o de todos)")
+    parser.add_argument("--dias", type=int, default=30, help="--historial: días hacia atrás")
+    parser.add_argument("--archivo", metavar="CARPETA", help="--vigilar: destino de los procesados (CARPETA/procesados)")
+    parser.add_argument("--ventana", type=int, default=VIGILAR_VENTANA,
+                        help="--vigilar: segundos que se esperan más PDF del mismo canal")
+    parser.add_argument("--canal", choices=list(CANALES),
+                        help="--batch/--vigilar: canal para los PDF sin canal detectado")
+    parser.add_argument("--trabajos", type=int, default=TRABAJOS_PARALELOS, help="--batch: trabajos en paralelo")
+    parser.add_argument("--salida", help="--batch: archivo JSON de resultado (por defecto, la salida estándar)")
+    parser.add_argument("--solo-extraer", action="store_true", help="--batch: clasificar y extraer sin abrir el WMS")
+    args = parser.parse_args(argv)
+    
+    if args.batch:
+        pdfs = list_pdfs(args.batch)
+        if not pdfs:
+            parser.error("no se encontraron PDFs en las rutas indicadas")
+        # El log (y cualquier print) va a stderr: stdout queda solo para el JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            resultado = run_batch(pdfs, canal=args.canal, perfil=args.perfil or "rendimiento",
+                                  trabajos=args.trabajos, solo_extraer=args.solo_extraer,
+                                  log=lambda msg: print(msg, flush=True))
+        salida = json.dumps(resultado, ensure_ascii=False, indent=2)
+        if args.salida:
+            with open(args.salida, "w", encoding="utf-8") as f:
+                f.write(salida)
+        else:
+            print(salida)
+        ok = not resultado["sin_canal"] and all(g["estado"] in ("listo", "ya en OT", "extraido") for g in resultado["grupos"])
+        return 0 if ok else 1
+    
+    if args.historial is not None:
+        if args.historial and args.historial not in CANALES:
+            parser.error(f"canal desconocido: {args.historial}")
+        if not HISTORIAL_DB or not os.path.exists(HISTORIAL_DB):
+            parser.error("no hay historial de corridas")
+        history = RunHistory(HISTORIAL_DB)
+        canal = args.historial or None
+        for linea in format_trends(history.trends(canal, args.dias)):
+            print(linea)
+        print("\nSegundos promedio por corrida, por paso:")
+        for nombre, paso, corridas, segundos in history.step_totals(canal, args.dias):
+            print(f"{nombre:<14}{paso:<18}{segundos:>9.2f}  ({corridas} corridas)")
+        history.close()
+        return 0
+    
+    if args.reanudar is not None:
+        estado = load_journal(args.reanudar) if args.reanudar else last_journal(BITACORA_DIR)
+        if not estado:
+            parser.error("no hay corridas interrumpidas para reanudar")
+        automation = WMSAutomation(estado["canal"], perfil=args.perfil or "rendimiento")
+        automation.run(None, reanudar=estado)
+        return 0 if automation.ots else 1
+    
+    if args.vigilar:
+        FolderWatcher(args.vigilar, archivo=args.archivo, canal=args.canal, perfil=args.perfil or "rendimiento",
+                      ventana=args.ventana).run()
+        return 0
+    
+    app = App(perfil=args.perfil or PERFIL_NAVEGADOR)
     app.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,1078 @@
+"""
+WMS DCIC - Extracción de referencias
+====================================
+Lectura de los manifiestos PDF: detección de canal, escáner multi-canal,
+OCR, caché por página y extracción en paralelo o en streaming.
+
+No depende de la interfaz gráfica ni de Selenium: el pool de procesos de la
+extracción importa solo este módulo en cada trabajador (en Windows cada
+proceso nuevo vuelve a importar el módulo de la función que ejecuta).
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import itertools
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from queue import Queue, Empty
+
+import pdfplumber
+from pdfminer.pdftypes import resolve1
+
+# OCR para PDFs que son imágenes
+try:
+    import pytesseract
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    OCR_AVAILABLE = True
+    
+    # Varios Tesseract en paralelo: cada uno con un solo hilo OpenMP
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    
+    # Configurar Tesseract
+    TESSERACT_PATHS = [
+        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    ]
+    for path in TESSERACT_PATHS:
+        if os.path.exists(path):
+            pytesseract.pytesseract.tesseract_cmd = path
+            break
+    
+    # Configurar Poppler
+    POPPLER_PATHS = [
+        r'C:\poppler\poppler-24.07.0\Library\bin',
+        r'C:\poppler\Library\bin',
+        r'C:\poppler\bin',
+    ]
+    POPPLER_PATH = None
+    for path in POPPLER_PATHS:
+        if os.path.exists(path):
+            POPPLER_PATH = path
+            break
+except:
+    OCR_AVAILABLE = False
+    POPPLER_PATH = None
+
+
+# ============== CONFIGURACIÓN ==============
+
+# "tablas": cuándo leer las tablas del PDF además del texto (extract_tables es lento)
+#   "auto"    = solo si el texto no alcanza a cubrir las referencias en celdas
+#   "siempre" = en todas las páginas
+#   "nunca"   = solo texto
+# "ocr_una_por_pagina" (opcional): True si cada página del PDF imagen es una
+#   etiqueta con una sola referencia. Solo entonces el OCR lee primero una región.
+# "ocr_region" (opcional): zona de la etiqueta donde está la referencia, como
+#   fracciones de la página (x0, y0, x1, y1). Sin ella se usa la región aprendida.
+CANALES = {
+    "Falabella": {
+        "patron": r'^32\d{8}$',
+        "patron_busqueda": r'\b(32\d{8})\b',
+        "ubicacion": "ZDESP-FALA-01",
+        "color": "#28a745",  # Verde
+        "keywords": ["falabella", "fala", "32"],
+        "tablas": "auto"
+    },
+    "Mercadolibre": {
+        "patron": r'^2000\d{12,14}$',
+        "patron_busqueda": r'\b(2000\d{12,14})\b',
+        "ubicacion": "ZDESP-FLEXMELI-01",
+        "color": "#FFE600",  # Amarillo
+        "keywords": ["mercadolibre", "meli", "flex", "marketcenter", "mkc"],
+        "tablas": "siempre"
+    },
+    "Walmart": {
+        "patron": r'^\d{13}$',
+        "patron_busqueda": r'\b(\d{13})\b',
+        "ubicacion": "ZDESP-WALMAT-01",  # Nota: es WALMAT sin R
+        "color": "#17a2b8",  # Celeste
+        "keywords": ["walmart", "wmt"],
+        "tablas": "auto"
+    },
+    "Paris": {
+        "patron": r'^307\d{7}$|^308\d{7}$',
+        "patron_busqueda": r'\b(30[78]\d{7})\b',
+        "ubicacion": "ZDESP-PARIS-01",
+        "color": "#001f5b",  # Azul marino
+        "keywords": ["paris", "cencosud", "mkc", "marketcenter"],
+        "tablas": "auto"
+    },
+    "Ripley": {
+        "patron": r'^243\d{8}-A$',
+        "patron_busqueda": r'\b(243\d{8}-A)\b',
+        "ubicacion": "ZDESP-RIPLEY-01",
+        "color": "#dc3545",  # Rojo
+        "keywords": ["ripley", "rpl"],
+        "tablas": "siempre"
+    },
+    "Paginas": {
+        # Formatos: Vincenzi.cl-1369, GlowUp.cl-1700, Miglu-1004, Acqui-1017
+        "patron": r'^[A-Za-z]+\.cl-\d+$|^[A-Za-z]+-\d+$',
+        "patron_busqueda": r'\b([A-Za-z]+\.cl-\d+|[A-Za-z]+-\d{3,4})\b',
+        "ubicacion": "ZDESP-01-01",
+        "color": "#9C27B0",  # Morado
+        "keywords": ["starken", "paginas", "homeclaf", "vincenzi", "glowup", "miglu", "acqui"],
+        "tablas": "siempre"
+    }
+}
+
+# Extracción en paralelo (pool de procesos)
+EXTRACTION_WORKERS = None   # None = un proceso por núcleo
+PAGES_PER_CHUNK = 25        # Páginas por tarea enviada al pool
+PARALLEL_MIN_PAGES = 20     # Con menos páginas se extrae en el mismo proceso
+STREAM_PAGES_PER_CHUNK = 4  # Tareas más chicas al extraer en streaming: la primera referencia llega antes
+
+# Caché de extracción (SQLite, por hash de archivo y de página)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DB = os.path.join(APP_DIR, "cache", "extraccion.sqlite")
+CACHE_MAX_MB = 64           # Al superarlo se eliminan las entradas menos usadas
+
+# OCR por ventanas de páginas
+OCR_DPI = 300               # Resolución máxima, solo para páginas donde no aparece nada
+OCR_DPI_RAPIDO = 150        # Primer intento de cada página
+OCR_REGIONES_PATH = os.path.join(APP_DIR, "cache", "ocr_regiones.json")  # Regiones aprendidas por canal
+OCR_REGION_MARGEN = 0.05    # Margen (fracción de la página) alrededor de la región aprendida
+OCR_WORKERS = None          # None = un Tesseract por núcleo
+OCR_PAGE_WINDOW = 4         # Páginas rasterizadas por llamada a Poppler
+
+
+# ============== ESCÁNER MULTI-CANAL ==============
+
+# Reglas de detección por palabras clave, en orden de prioridad
+DETECCION_KEYWORDS = [
+    ("Paginas", ["starken", "homeclaf", "vincenzi", "glowup", "miglu", "acqui", "paginas"]),
+    ("Ripley", ["ripley"]),
+    ("Falabella", ["falabella", "fala"]),
+    ("Mercadolibre", ["mercadolibre", "meli", "flex"]),
+    ("Paris", ["paris"]),
+    ("Walmart", ["walmart"]),
+]
+
+
+class CanalScanner:
+    """Escáner compilado a partir de CANALES.
+    
+    Todos los `patron_busqueda` se combinan en una sola expresión con un grupo
+    por canal, así que una pasada por el texto de la página entrega las
+    referencias y conteos de todos los canales, más las palabras clave de
+    detección. Supone que dos canales no calzan desde la misma posición (sus
+    patrones difieren en prefijo o largo). Las celdas de tablas se validan con el `patron` de cada canal.
+    """
+    
+    def __init__(self, canales):
+        self.canales = list(canales)
+        parts = []
+        self.groups = {}
+        index = 1
+        for i, canal in enumerate(self.canales):
+            patron_busqueda = canales[canal]["patron_busqueda"]
+            parts.append(f"(?P<c{i}>{patron_busqueda})")
+            # Igual que re.findall: la referencia es el primer grupo del patrón
+            inner = index + 1 if re.compile(patron_busqueda).groups else index
+            self.groups[f"c{i}"] = (canal, inner)
+            index += 1 + re.compile(patron_busqueda).groups
+        # Lookahead: se prueba en cada posición, así una referencia de un canal no
+        # oculta la de otro que empieza dentro de ella
+        self.busqueda = re.compile("(?=(?:" + "|".join(parts) + "))")
+        self.celdas = [(canal, re.compile(canales[canal]["patron"])) for canal in self.canales]
+        # Patrón de celda sin anclas: encuentra en el texto cualquier candidato a celda
+        self.celdas_sueltas = {canal: re.compile(canales[canal]["patron"].replace("^", "").replace("$", ""))
+                               for canal in self.canales}
+        self.modos_tablas = {canal: canales[canal].get("tablas", "siempre") for canal in self.canales}
+        keywords = sorted({kw for _, kws in DETECCION_KEYWORDS for kw in kws} | {"marketcenter"}, key=len, reverse=True)
+        # Lookahead: encuentra también palabras superpuestas ("fala" dentro de "falabella")
+        self.keywords = re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+    
+    def scan_text(self, text):
+        """Escanea texto: {"refs": {canal: [refs]}, "conteos": {canal: n}, "keywords": [...]}."""
+        refs = {canal: [] for canal in self.canales}
+        next_start = {canal: 0 for canal in self.canales}
+        for m in self.busqueda.finditer(text):
+            canal, group = self.groups[m.lastgroup]
+            # Como re.findall: las coincidencias de un mismo canal no se superponen
+            if m.start(group) >= next_start[canal]:
+                refs[canal].append(m.group(group))
+                next_start[canal] = m.end(m.lastgroup)
+        refs = {canal: list(dict.fromkeys(found)) for canal, found in refs.items()}
+        return {
+            "refs": refs,
+            "conteos": {canal: len(found) for canal, found in refs.items()},
+            "keywords": sorted({m.group(1) for m in self.keywords.finditer(text.lower())}),
+        }
+    
+    def text_is_complete(self, canal, text, scan):
+        """True si el texto ya contiene toda referencia que podría venir de una celda.
+        
+        Cualquier texto de celda que calce con `patron` aparece en el texto de la
+        página; si cada candidato encontrado sin anclas ya es una referencia del
+        texto, las tablas no pueden agregar nada. Es conservador: ante la duda,
+        se leen las tablas.
+        """
+        modo = self.modos_tablas[canal]
+        if modo == "nunca":
+            return True
+        if modo == "siempre":
+            return False
+        found = set(scan["refs"][canal])
+        return all(m.group(0) in found for m in self.celdas_sueltas[canal].finditer(text))
+    
+    def scan_page(self, page, canal=None):
+        """Escanea una página de pdfplumber: texto y, si hace falta, celdas de tablas.
+        
+        Las tablas se leen solo si el texto no alcanza para `canal` (o para algún
+        canal, si es None). El resultado indica si se usaron tablas ("tablas") y
+        para qué canales las referencias están completas ("completos"). Los
+        conteos y palabras clave salen solo del texto, como en la detección.
+        """
+        text = page.extract_text() or ""
+        scan = self.scan_text(text)
+        completos = [c for c in self.canales if self.text_is_complete(c, text, scan)]
+        if all(c in completos for c in ([canal] if canal else self.canales)):
+            scan["tablas"] = False
+            scan["completos"] = completos
+            return scan
+        
+        # Respaldo: celdas de tablas primero y luego texto, en ese orden
+        refs = {c: [] for c in self.canales}
+        for table in page.extract_tables():
+            for row in table:
+                if row:
+                    for cell in row:
+                        if cell:
+                            cell_str = str(cell).strip()
+                            for c, patron in self.celdas:
+                                if patron.match(cell_str) and cell_str not in refs[c]:
+                                    refs[c].append(cell_str)
+        
+        for c, found in scan["refs"].items():
+            for ref in found:
+                if ref not in refs[c]:
+                    refs[c].append(ref)
+        scan["refs"] = refs
+        scan["tablas"] = True
+        scan["completos"] = list(self.canales)
+        return scan
+
+
+SCANNER = CanalScanner(CANALES)
+
+
+def _detect_canal(scan):
+    """Detecta el canal a partir del escaneo de la primera página."""
+    conteos = scan["conteos"]
+    keywords = set(scan["keywords"])
+    
+    # PASO 1: Buscar primero por PATRÓN DE REFERENCIAS (más específico)
+    # Paginas: Texto.cl-XXXX o Texto-XXXX, siempre que no sea Ripley (también tiene guión)
+    if conteos.get("Paginas") and not conteos.get("Ripley"):
+        return "Paginas"
+    
+    # Del más específico al menos específico (Walmart: 13 dígitos)
+    for canal in ["Ripley", "Mercadolibre", "Paris", "Falabella", "Walmart"]:
+        if conteos.get(canal):
+            return canal
+    
+    # PASO 2: Buscar por KEYWORDS específicos
+    for canal, canal_keywords in DETECCION_KEYWORDS:
+        if keywords.intersection(canal_keywords):
+            return canal
+    
+    # MARKETCENTER puede ser Paris (referencias 307/308) o Mercadolibre
+    if "marketcenter" in keywords:
+        return "Paris" if conteos.get("Paris") else "Mercadolibre"
+    
+    return None
+
+
+# ============== EXTRACCIÓN PDF ==============
+
+def detect_canal_from_pdf(pdf_path):
+    """Detecta automáticamente el canal basado en el contenido del PDF."""
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            # Leer primera página
+            if pdf.pages:
+                return _detect_canal(SCANNER.scan_text(pdf.pages[0].extract_text() or ""))
+    except Exception as e:
+        print(f"Error detectando canal: {e}")
+    
+    return None
+
+
+def classify_pdfs(pdf_paths, workers=None):
+    """Canal de cada PDF con detect_canal_from_pdf en un pool de procesos: {ruta: canal o None}."""
+    workers = min(workers or EXTRACTION_WORKERS or os.cpu_count() or 1, len(pdf_paths))
+    if workers <= 1:
+        return {path: detect_canal_from_pdf(path) for path in pdf_paths}
+    return dict(zip(pdf_paths, process_pool().map(detect_canal_from_pdf, pdf_paths)))
+
+
+def _poppler_kwargs():
+    return {"poppler_path": POPPLER_PATH} if POPPLER_PATH else {}
+
+
+def _find_ocr_refs(text, patron_busqueda):
+    """Busca referencias en texto OCR, también con los errores comunes corregidos.
+    
+    Devuelve (refs, corregidas): `corregidas` son las que solo aparecen después
+    de cambiar O por 0 y l por 1, lecturas dudosas que conviene confirmar a
+    más resolución.
+    """
+    refs = re.findall(patron_busqueda, text)
+    
+    # Limpiar errores OCR comunes
+    text_cleaned = text.replace('O', '0').replace('o', '0').replace('l', '1').replace('I', '1')
+    corregidas = [ref for ref in re.findall(patron_busqueda, text_cleaned) if ref not in refs]
+    
+    return list(dict.fromkeys(refs + corregidas)), list(dict.fromkeys(corregidas))
+
+
+def _ocr_with_boxes(image):
+    """OCR con posiciones: (texto por líneas, [(palabra, x0, y0, x1, y1)])."""
+    data = pytesseract.image_to_data(image, lang='eng', output_type=pytesseract.Output.DICT)
+    lines = {}
+    words = []
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        words.append((word, data["left"][i], data["top"][i],
+                      data["left"][i] + data["width"][i], data["top"][i] + data["height"][i]))
+    return "\n".join(" ".join(line) for line in lines.values()), words
+
+
+def _refs_box(refs, words, size, patron_busqueda):
+    """Caja (fracciones de página) que contiene las palabras donde aparecen las referencias."""
+    width, height = size
+    boxes = [box for word, *box in words if set(_find_ocr_refs(word, patron_busqueda)[0]) & set(refs)]
+    if not boxes:
+        return None
+    return [min(b[0] for b in boxes) / width, min(b[1] for b in boxes) / height,
+            max(b[2] for b in boxes) / width, max(b[3] for b in boxes) / height]
+
+
+def _ocr_page(pdf_path, number, image, patron_busqueda, region):
+    """OCR adaptativo de una página ya rasterizada a OCR_DPI_RAPIDO.
+    
+    Con `region` (solo canales con una referencia por página) se lee primero
+    esa zona; si no alcanza, la página completa. La página se vuelve a
+    rasterizar a OCR_DPI si no aparece ninguna referencia o si alguna solo se
+    leyó corrigiendo O/0 y l/1; las lecturas exactas de la primera pasada se
+    conservan, y las dudosas solo si a OCR_DPI no se lee nada. Las imágenes se liberan apenas termina. Devuelve (refs,
+    detalle) con detalle = {"dpi", "region", "caja"}; "caja" es dónde se
+    encontraron las referencias al leer la página completa, para aprender la
+    región.
+    """
+    fast_dpi = min(OCR_DPI_RAPIDO, OCR_DPI)
+    images = [image]
+    exactas = []
+    dudosas = []
+    try:
+        for dpi in sorted({fast_dpi, OCR_DPI}):
+            final = dpi == OCR_DPI
+            if dpi != fast_dpi:
+                image = convert_from_path(pdf_path, dpi=dpi, first_page=number, last_page=number,
+                                          **_poppler_kwargs())[0]
+                images.append(image)
+            
+            if region:
+                width, height = image.size
+                crop = image.crop((int(region[0] * width), int(region[1] * height),
+                                   int(region[2] * width), int(region[3] * height)))
+                images.append(crop)
+                refs, corregidas = _find_ocr_refs(pytesseract.image_to_string(crop, lang='eng'), patron_busqueda)
+                if refs and (final or not corregidas):
+                    return list(dict.fromkeys(exactas + refs)), {"dpi": dpi, "region": True, "caja": None}
+            
+            text, words = _ocr_with_boxes(image)
+            refs, corregidas = _find_ocr_refs(text, patron_busqueda)
+            if final and not refs:
+                refs = dudosas
+            refs = list(dict.fromkeys(exactas + refs))
+            if refs and (final or not corregidas):
+                return refs, {"dpi": dpi, "region": False, "caja": _refs_box(refs, words, image.size, patron_busqueda)}
+            exactas = [ref for ref in refs if ref not in corregidas]
+            dudosas = corregidas
+        
+        return [], {"dpi": OCR_DPI, "region": False, "caja": None}
+    finally:
+        for im in images:
+            im.close()
+
+
+def _load_ocr_regions():
+    try:
+        with open(OCR_REGIONES_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _ocr_region(canal):
+    """Región OCR del canal: la configurada en CANALES o la aprendida.
+    
+    Solo para canales con una referencia por página: en una página con varias
+    etiquetas, la región cubriría solo una.
+    """
+    if not canal or not CANALES[canal].get("ocr_una_por_pagina"):
+        return None
+    return CANALES[canal].get("ocr_region") or _load_ocr_regions().get(canal)
+
+
+def _learn_ocr_region(canal, boxes):
+    """Amplía la región aprendida del canal para cubrir las cajas nuevas."""
+    regions = _load_ocr_regions()
+    if canal in regions:
+        boxes = boxes + [regions[canal]]
+    m = OCR_REGION_MARGEN
+    regions[canal] = [max(0.0, min(b[0] for b in boxes) - m), max(0.0, min(b[1] for b in boxes) - m),
+                      min(1.0, max(b[2] for b in boxes) + m), min(1.0, max(b[3] for b in boxes) + m)]
+    os.makedirs(os.path.dirname(OCR_REGIONES_PATH), exist_ok=True)
+    with open(OCR_REGIONES_PATH, "w", encoding="utf-8") as f:
+        json.dump(regions, f, indent=2)
+
+
+def _page_windows(pages, window):
+    """Agrupa números de página en tramos consecutivos de hasta `window` páginas."""
+    run = []
+    for number in pages:
+        if run and (number != run[-1] + 1 or len(run) >= window):
+            yield run
+            run = []
+        run.append(number)
+    if run:
+        yield run
+
+
+def iter_ocr_pages(pdf_path, patron_busqueda, pages=None, workers=None, window=OCR_PAGE_WINDOW, canal=None):
+    """Genera (número de página, referencias) por OCR, en orden de página.
+    
+    El PDF se rasteriza por ventanas (first_page/last_page) a OCR_DPI_RAPIDO y
+    cada página va a un pool acotado de Tesseract, que sube a OCR_DPI solo en
+    las páginas sin referencias o con lecturas dudosas. Si `canal` tiene una
+    referencia por página, se lee primero la región de la etiqueta donde suele
+    estar (configurada o aprendida). Nunca
+    hay más de `window` páginas esperando además de las que están en OCR, así
+    que la memoria no crece con el largo del PDF. `pages` son números de
+    página desde 1 (por defecto, todas).
+    """
+    if not OCR_AVAILABLE:
+        return
+    
+    poppler = _poppler_kwargs()
+    if pages is None:
+        pages = range(1, pdfinfo_from_path(pdf_path, **poppler)["Pages"] + 1)
+    workers = workers or OCR_WORKERS or os.cpu_count() or 1
+    region = _ocr_region(canal)
+    learn = canal and CANALES[canal].get("ocr_una_por_pagina") and not CANALES[canal].get("ocr_region")
+    boxes = []
+    
+    def finish(number, future):
+        refs, detalle = future.result()
+        if detalle["caja"]:
+            boxes.append(detalle["caja"])
+        return number, refs
+    
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for run in _page_windows(pages, window):
+            images = convert_from_path(pdf_path, dpi=min(OCR_DPI_RAPIDO, OCR_DPI),
+                                       first_page=run[0], last_page=run[-1], **poppler)
+            for number, image in zip(run, images):
+                pending.append((number, pool.submit(_ocr_page, pdf_path, number, image, patron_busqueda, region)))
+            del images
+            
+            # Entregar las páginas listas antes de rasterizar la siguiente ventana
+            while len(pending) > workers or (pending and pending[0][1].done()):
+                yield finish(*pending.popleft())
+        
+        while pending:
+            yield finish(*pending.popleft())
+    
+    if learn and boxes:
+        _learn_ocr_region(canal, boxes)
+
+
+def extract_with_ocr(pdf_path, patron_busqueda):
+    """Extrae referencias usando OCR para PDFs que son imágenes."""
+    refs = []
+    
+    if not OCR_AVAILABLE:
+        return refs
+    
+    try:
+        for _, page_refs in iter_ocr_pages(pdf_path, patron_busqueda):
+            refs.extend(page_refs)
+    except Exception as e:
+        print(f"Error OCR: {e}")
+    
+    # Eliminar duplicados
+    return list(dict.fromkeys(refs))
+
+
+def extract_references(pdf_paths, canal):
+    """Extrae referencias de los PDFs según el canal."""
+    return extract_references_parallel(pdf_paths, canal, workers=1)["referencias"]
+
+
+# ============== CACHÉ DE EXTRACCIÓN ==============
+
+def _file_hash(pdf_path):
+    """SHA-256 del contenido del archivo."""
+    h = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _page_content_hash(page):
+    """Hash del contenido de una página: tamaño, content streams, imágenes y fuentes.
+    
+    Las páginas iguales de un PDF reexportado dan el mismo hash aunque el
+    archivo completo cambie.
+    """
+    h = hashlib.sha1(repr(page.bbox).encode())
+    page_obj = page.page_obj
+    for stream in page_obj.contents:
+        h.update(resolve1(stream).get_data())
+    resources = resolve1(page_obj.resources) or {}
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjects):
+        h.update(name.encode())
+        h.update(resolve1(xobjects[name]).get_rawdata() or b"")
+    fonts = resolve1(resources.get("Font")) or {}
+    for name in sorted(fonts):
+        font = resolve1(fonts[name]) or {}
+        h.update(f"{name}={font.get('BaseFont')}".encode())
+    return h.hexdigest()
+
+
+def _page_key(page_hash, canal=None):
+    """Clave de caché de una página: escaneo de todos los canales, u OCR de un canal."""
+    return f"{page_hash}:{canal}:ocr" if canal else f"{page_hash}:escaneo"
+
+
+def _scan_complete(scan, canal=None):
+    """True si un escaneo en caché sirve para `canal` (o para todos, si es None)."""
+    # Escaneos anteriores al modo rápido siempre leían tablas
+    completos = scan.get("completos", SCANNER.canales)
+    return canal in completos if canal else len(completos) == len(SCANNER.canales)
+
+
+class ExtractionCache:
+    """Caché en disco de referencias por página y canal.
+    
+    Guarda, por hash de archivo, la lista de hashes de sus páginas, y por
+    página, el escaneo de todos los canales (y el OCR de cada canal). Al superar CACHE_MAX_MB se
+    eliminan las entradas usadas hace más tiempo (LRU).
+    """
+    
+    def __init__(self, path=CACHE_DB, max_mb=CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS archivos (hash TEXT PRIMARY KEY, paginas TEXT NOT NULL, usado REAL NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS paginas (clave TEXT PRIMARY KEY, refs TEXT NOT NULL, usado REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS paginas_usado ON paginas (usado)")
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+    
+    def file_pages(self, file_hash):
+        """Hashes de las páginas de un archivo ya visto, o None."""
+        row = self.conn.execute("SELECT paginas FROM archivos WHERE hash = ?", (file_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_pages(self, keys):
+        """Devuelve {clave: datos} para las claves que están en caché."""
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            for key, refs in self.conn.execute(f"SELECT clave, refs FROM paginas WHERE clave IN ({marks})", batch):
+                found[key] = json.loads(refs)
+        return found
+    
+    def put(self, files=None, pages=None, touched=()):
+        """Guarda archivos {hash: [hashes de página]} y páginas {clave: datos}.
+        
+        `touched` son claves leídas de la caché, para actualizar su uso.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO archivos (hash, paginas, usado) VALUES (?, ?, ?)",
+                [(h, json.dumps(page_hashes), now) for h, page_hashes in (files or {}).items()])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO paginas (clave, refs, usado) VALUES (?, ?, ?)",
+                [(key, json.dumps(refs), now) for key, refs in (pages or {}).items()])
+            self.conn.executemany("UPDATE paginas SET usado = ? WHERE clave = ?", [(now, key) for key in touched])
+        self.evict()
+    
+    def _size(self):
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        free = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free) * page_size
+    
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar bajo el tamaño máximo."""
+        while self._size() > self.max_bytes:
+            with self.conn:
+                deleted = 0
+                for table in ("paginas", "archivos"):
+                    count = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    deleted += self.conn.execute(
+                        f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY usado LIMIT ?)",
+                        (max(1, count // 10),)).rowcount
+            if not deleted:
+                break
+        self.conn.execute("PRAGMA incremental_vacuum")
+
+
+# ============== EXTRACCIÓN EN PARALELO ==============
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def process_pool():
+    """Pool de procesos compartido por todas las extracciones, de EXTRACTION_WORKERS procesos.
+    
+    Se crea la primera vez y se reutiliza, así cada extracción no paga el
+    arranque de los procesos. Nunca se reemplaza: otro hilo (un trabajo o la
+    GUI) puede estar enviándole tareas. Una extracción con menos tareas que
+    procesos simplemente envía menos.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS or os.cpu_count() or 1)
+        return _pool
+
+
+def _pdf_page_count(pdf_path):
+    """Cantidad de páginas del PDF (0 si no se puede abrir)."""
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        print(f"Error pdfplumber {pdf_path}: {e}")
+        return 0
+
+
+def _extract_pdf_chunk(pdf_path, first_page, last_page, cache_path=None, canal=None):
+    """Escanea las páginas [first_page, last_page) de un PDF para todos los canales.
+    
+    Se ejecuta dentro del pool de procesos, por eso recibe la ruta de la
+    caché y no objetos. Las páginas cuyo contenido ya está en caché (y cuyo
+    escaneo sirve para `canal`) no se parsean. Devuelve (páginas, segundos),
+    donde cada página es {"hash", "scan", "cache"}.
+    """
+    start = time.perf_counter()
+    cache = ExtractionCache(cache_path) if cache_path else None
+    pages = []
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            chunk = pdf.pages[first_page:last_page]
+            hashes = [_page_content_hash(page) for page in chunk]
+            cached = cache.get_pages(_page_key(h) for h in hashes) if cache else {}
+            for page, page_hash in zip(chunk, hashes):
+                scan = cached.get(_page_key(page_hash))
+                hit = scan is not None and _scan_complete(scan, canal)
+                if not hit:
+                    scan = SCANNER.scan_page(page, canal)
+                pages.append({"hash": page_hash, "scan": scan, "cache": hit})
+    except Exception as e:
+        print(f"Error pdfplumber {pdf_path}: {e}")
+    finally:
+        if cache:
+            cache.close()
+    return pages, time.perf_counter() - start
+
+
+def _iter_ocr_cached(pdf_path, canal, page_hashes, cache, stats, new_pages):
+    """Genera (número de página, refs) por OCR en orden de página, usando la caché.
+    
+    Las páginas ya leídas salen de la caché; el resto pasa por iter_ocr_pages.
+    Sin hashes de página (o sin caché) se lee todo el PDF.
+    """
+    patron_busqueda = CANALES[canal]["patron_busqueda"]
+    keys = [_page_key(h, canal) for h in page_hashes] if cache else []
+    cached = cache.get_pages(keys) if keys else {}
+    missing = [n for n, key in enumerate(keys, 1) if key not in cached] if keys else None
+    
+    try:
+        ocr = iter_ocr_pages(pdf_path, patron_busqueda, pages=missing, canal=canal) if missing is None or missing else iter(())
+        if not keys:
+            for number, page_refs in ocr:
+                stats["fallos"] += 1
+                yield number, page_refs
+            return
+        for number, key in enumerate(keys, 1):
+            if key in cached:
+                stats["aciertos"] += 1
+                stats["tocadas"].append(key)
+                yield number, cached[key]
+            else:
+                _, page_refs = next(ocr)
+                stats["fallos"] += 1
+                new_pages[key] = page_refs
+                yield number, page_refs
+        for _ in ocr:
+            pass  # Agotar iter_ocr_pages: al terminar aprende la región OCR del canal
+    except Exception as e:
+        print(f"Error OCR: {e}")
+
+
+def _extract_ocr_cached(archivo, canal, cache, stats, new_pages):
+    """OCR de un archivo, reutilizando las páginas ya leídas en caché."""
+    start = time.perf_counter()
+    page_hashes = archivo["hashes"] if len(archivo["hashes"]) == archivo["paginas"] else []
+    refs = [ref for _, page_refs in _iter_ocr_cached(archivo["archivo"], canal, page_hashes, cache, stats, new_pages)
+            for ref in page_refs]
+    return list(dict.fromkeys(refs)), time.perf_counter() - start
+
+
+def _run_tasks(pool, fn, tasks):
+    """Ejecuta fn(*args) para cada tarea y devuelve los resultados en el orden de las tareas."""
+    if pool is None:
+        return [fn(*args) for args in tasks]
+    futures = [pool.submit(fn, *args) for args in tasks]
+    return [future.result() for future in futures]
+
+
+def extract_references_parallel(pdf_paths, canal=None, workers=None, pages_per_chunk=PAGES_PER_CHUNK,
+                                cache_path=CACHE_DB):
+    """Escanea los PDFs en un pool de procesos y extrae las referencias del canal.
+    
+    Cada página se lee una sola vez con el escáner multi-canal, así que la
+    detección de canal y la extracción salen del mismo parseo. Con canal=None
+    se usa el canal detectado en la primera página del primer archivo. Los
+    resultados se combinan en orden de manifiesto y página (orden de primera
+    aparición). Las páginas ya vistas se leen de la caché; cache_path=None la
+    desactiva.
+    Devuelve un dict con:
+      - "canal": canal usado (el indicado o el detectado; None si no se pudo detectar)
+      - "detectado": canal detectado en la primera página
+      - "referencias": lista total sin duplicados para el canal
+      - "conteos": {canal: coincidencias en el texto de cada página} para todos los canales
+      - "archivos": por archivo {"archivo", "paginas", "detectado", "conteos",
+        "referencias", "ocr", "segundos"}
+      - "cache": {"aciertos", "fallos"} en páginas
+      - "tablas": {"solo_texto", "respaldo"}: páginas procesadas sin y con extract_tables
+      - "trabajadores": procesos usados (1 = sin pool)
+      - "segundos": tiempo total de la extracción
+    """
+    start = time.perf_counter()
+    workers = workers or EXTRACTION_WORKERS or os.cpu_count() or 1
+    cache = ExtractionCache(cache_path) if cache_path else None
+    stats = {"aciertos": 0, "fallos": 0, "tocadas": []}
+    
+    archivos = []
+    for path in pdf_paths:
+        file_hash = _file_hash(path) if cache else None
+        known = cache.file_pages(file_hash) if cache else None
+        archivos.append({
+            "archivo": path,
+            "paginas": len(known) if known is not None else _pdf_page_count(path),
+            "detectado": None,
+            "conteos": {},
+            "referencias": [],
+            "ocr": False,
+            "segundos": 0.0,
+            "hash": file_hash,
+            "hashes": known or [],
+        })
+    
+    # Páginas de archivos conocidos que ya están en caché
+    cached = {}
+    if cache:
+        cached = cache.get_pages(_page_key(h) for a in archivos for h in a["hashes"])
+    
+    def cached_page(i, n, page_canal):
+        hashes = archivos[i]["hashes"]
+        scan = cached.get(_page_key(hashes[n])) if n < len(hashes) else None
+        if scan is not None and _scan_complete(scan, page_canal):
+            return {"hash": hashes[n], "scan": scan, "cache": True}
+        return None
+    
+    pages_by_file = [[None] * a["paginas"] for a in archivos]
+    
+    # Sin canal: detectar primero con la primera página, para que el resto
+    # de las páginas decida el uso de tablas según ese canal
+    detectado = None
+    if canal is None and archivos and archivos[0]["paginas"]:
+        first_page = cached_page(0, 0, None)
+        if first_page is None:
+            pages, seconds = _extract_pdf_chunk(archivos[0]["archivo"], 0, 1, cache_path)
+            archivos[0]["segundos"] += seconds
+            first_page = pages[0] if pages else None
+        if first_page is not None:
+            pages_by_file[0][0] = first_page
+            detectado = _detect_canal(first_page["scan"])
+    scan_canal = canal or detectado
+    
+    # Planificar tareas: (índice de archivo, primera página, última página).
+    # Las páginas que están en caché no se envían al pool.
+    tasks = []
+    for i, archivo in enumerate(archivos):
+        missing = []
+        for n in range(archivo["paginas"]):
+            if pages_by_file[i][n] is None:
+                pages_by_file[i][n] = cached_page(i, n, scan_canal)
+            if pages_by_file[i][n] is None:
+                missing.append(n)
+        for run in _page_windows(missing, pages_per_chunk):
+            tasks.append((i, run[0], run[-1] + 1))
+    
+    pages_to_parse = sum(last - first for _, first, last in tasks)
+    if workers > 1 and len(tasks) > 1 and pages_to_parse >= PARALLEL_MIN_PAGES:
+        pool = process_pool()
+        workers = min(workers, len(tasks))
+    else:
+        workers = 1
+        pool = None
+    
+    new_pages = {}
+    tablas = {"solo_texto": 0, "respaldo": 0}
+    chunk_results = _run_tasks(pool, _extract_pdf_chunk,
+                               [(archivos[i]["archivo"], first, last, cache_path, scan_canal)
+                                for i, first, last in tasks])
+    
+    for (i, first, _), (pages, seconds) in zip(tasks, chunk_results):
+        archivos[i]["segundos"] += seconds
+        for n, page in enumerate(pages, first):
+            pages_by_file[i][n] = page
+    
+    for archivo, pages in zip(archivos, pages_by_file):
+        pages = [page for page in pages if page is not None]
+        for page in pages:
+            key = _page_key(page["hash"])
+            if page["cache"]:
+                stats["aciertos"] += 1
+                stats["tocadas"].append(key)
+            else:
+                stats["fallos"] += 1
+                new_pages[key] = page["scan"]
+                tablas["respaldo" if page["scan"]["tablas"] else "solo_texto"] += 1
+        if pages:
+            archivo["detectado"] = _detect_canal(pages[0]["scan"])
+        archivo["por_canal"] = {
+            c: list(dict.fromkeys(ref for page in pages for ref in page["scan"]["refs"][c]))
+            for c in SCANNER.canales
+        }
+        archivo["conteos"] = {c: sum(page["scan"]["conteos"][c] for page in pages) for c in SCANNER.canales}
+        if len(pages) == archivo["paginas"]:
+            archivo["hashes"] = [page["hash"] for page in pages]
+    
+    if detectado is None and archivos:
+        detectado = archivos[0]["detectado"]
+    canal = scan_canal
+    
+    if canal:
+        for archivo in archivos:
+            archivo["referencias"] = archivo["por_canal"][canal]
+        
+        # Si un archivo no tiene referencias, intentar OCR. Corre en este proceso:
+        # iter_ocr_pages ya reparte las páginas entre varios Tesseract.
+        if OCR_AVAILABLE:
+            for archivo in archivos:
+                if not archivo["referencias"]:
+                    print(f"Intentando OCR para {os.path.basename(archivo['archivo'])}...")
+                    refs, seconds = _extract_ocr_cached(archivo, canal, cache, stats, new_pages)
+                    archivo["referencias"] = refs
+                    archivo["ocr"] = True
+                    archivo["segundos"] += seconds
+    
+    if cache:
+        files = {a["hash"]: a["hashes"] for a in archivos if len(a["hashes"]) == a["paginas"] > 0}
+        cache.put(files, new_pages, stats["tocadas"])
+        cache.close()
+    
+    for archivo in archivos:
+        del archivo["hash"], archivo["hashes"], archivo["por_canal"]
+    
+    all_refs = list(dict.fromkeys(ref for archivo in archivos for ref in archivo["referencias"]))
+    
+    return {
+        "canal": canal,
+        "detectado": detectado,
+        "referencias": all_refs,
+        "conteos": {c: sum(a["conteos"].get(c, 0) for a in archivos) for c in SCANNER.canales},
+        "archivos": archivos,
+        "cache": {"aciertos": stats["aciertos"], "fallos": stats["fallos"]},
+        "tablas": tablas,
+        "trabajadores": workers,
+        "segundos": time.perf_counter() - start,
+    }
+
+
+# ============== EXTRACCIÓN EN STREAMING ==============
+
+def iter_references(pdf_paths, canal, workers=None, pages_per_chunk=STREAM_PAGES_PER_CHUNK, cache_path=CACHE_DB):
+    """Genera las referencias a medida que se parsea cada página.
+    
+    Cada elemento es {"referencia", "archivo", "pagina"} (página desde 1), en
+    el mismo orden de primera aparición que extract_references_parallel. Los
+    tramos de páginas se envían todos al pool al comenzar y se entregan en
+    orden apenas cada uno termina. Un archivo sin referencias pasa por OCR,
+    página por página.
+    """
+    workers = workers or EXTRACTION_WORKERS or os.cpu_count() or 1
+    cache = ExtractionCache(cache_path) if cache_path else None
+    stats = {"aciertos": 0, "fallos": 0, "tocadas": []}
+    seen = set()
+    
+    page_counts = [_pdf_page_count(path) for path in pdf_paths]
+    tasks = [(i, first, min(first + pages_per_chunk, count))
+             for i, count in enumerate(page_counts)
+             for first in range(0, count, pages_per_chunk)]
+    pool = process_pool() if workers > 1 and len(tasks) > 1 else None
+    futures = [None] * len(tasks)
+    
+    try:
+        if pool is not None:
+            futures = [pool.submit(_extract_pdf_chunk, pdf_paths[i], first, last, cache_path, canal)
+                       for i, first, last in tasks]
+        
+        task_index = 0
+        for i, path in enumerate(pdf_paths):
+            new_pages = {}
+            page_hashes = []
+            file_refs = 0
+            
+            while task_index < len(tasks) and tasks[task_index][0] == i:
+                _, first, last = tasks[task_index]
+                future = futures[task_index]
+                pages, _ = future.result() if future else _extract_pdf_chunk(path, first, last, cache_path, canal)
+                task_index += 1
+                
+                for number, page in enumerate(pages, first + 1):
+                    page_hashes.append(page["hash"])
+                    key = _page_key(page["hash"])
+                    if page["cache"]:
+                        stats["tocadas"].append(key)
+                    else:
+                        new_pages[key] = page["scan"]
+                    for ref in page["scan"]["refs"][canal]:
+                        file_refs += 1
+                        if ref not in seen:
+                            seen.add(ref)
+                            yield {"referencia": ref, "archivo": path, "pagina": number}
+            
+            complete = len(page_hashes) == page_counts[i]
+            
+            # Si el archivo no tiene referencias, intentar OCR página por página
+            if not file_refs and OCR_AVAILABLE:
+                print(f"Intentando OCR para {os.path.basename(path)}...")
+                ocr_pages = _iter_ocr_cached(path, canal, page_hashes if complete else [], cache, stats, new_pages)
+                for number, page_refs in ocr_pages:
+                    for ref in page_refs:
+                        if ref not in seen:
+                            seen.add(ref)
+                            yield {"referencia": ref, "archivo": path, "pagina": number}
+            
+            if cache:
+                files = {_file_hash(path): page_hashes} if complete and page_hashes else {}
+                cache.put(files, new_pages, stats["tocadas"])
+                stats["tocadas"] = []
+    finally:
+        # El pool es compartido: solo se descartan las tareas propias que no empezaron
+        for future in futures:
+            if future is not None:
+                future.cancel()
+        if cache:
+            cache.close()
+
+
+class ReferenceStream:
+    """Extrae en un hilo aparte y entrega las referencias a medida que aparecen.
+    
+    Iterar el objeto bloquea hasta la siguiente referencia y termina cuando la
+    extracción acaba, así WMSAutomation puede empezar a seleccionar órdenes
+    mientras se siguen parseando (o leyendo por OCR) los manifiestos.
+    `on_reference` recibe cada elemento de iter_references. `skip`, si se
+    asigna, filtra las referencias al consumirlas (en el hilo que itera).
+    """
+    
+    _END = object()
+    
+    def __init__(self, pdf_paths, canal, on_reference=None, **kwargs):
+        self.pdf_paths = list(pdf_paths)
+        self.canal = canal
+        self.on_reference = on_reference
+        self.kwargs = kwargs
+        self.references = []
+        self.error = None
+        self.skip = None  # Lista -> lista sin las que hay que omitir (ver WMSAutomation.skip_recent)
+        self.queue = Queue()
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def _produce(self):
+        try:
+            for item in iter_references(self.pdf_paths, self.canal, **self.kwargs):
+                self.references.append(item["referencia"])
+                if self.on_reference:
+                    self.on_reference(item)
+                self.queue.put(item["referencia"])
+        except Exception as e:
+            self.error = e
+            print(f"Error extrayendo referencias: {e}")
+        finally:
+            self.queue.put(self._END)
+    
+    def __iter__(self):
+        while True:
+            ref = self.queue.get()
+            if ref is self._END:
+                self.queue.put(self._END)
+                return
+            if self.skip and not self.skip([ref]):
+                continue
+            yield ref
+    
+    def batches(self, size):
+        """Como iterar, pero entrega listas con las referencias ya disponibles (hasta `size`)."""
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < size and batch[-1] is not self._END:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            ended = batch[-1] is self._END
+            if ended:
+                self.queue.put(self._END)
+                batch.pop()
+            if batch and self.skip:
+                batch = self.skip(batch)
+            if batch:
+                yield batch
+            if ended:
+                return
+
+
+def reference_chunks(references, size):
+    """Divide una lista (o un ReferenceStream) en tramos de `size` referencias, uno por OT."""
+    it = iter(references)
+    while True:
+        tramo = list(itertools.islice(it, size))
+        if not tramo:
+            return
+        yield tramo
@@ -0,0 +1,348 @@
+"""
+WMS DCIC - Trazas de ejecución
+==============================
+Cada corrida de la automatización escribe un archivo JSONL en trazas/ con un
+tramo (span) por paso y por búsqueda de referencia: inicio, fin, segundos,
+intentos y resultado.
+
+Uso del resumen por línea de comandos:
+    python wms_trazas.py                       # todas las corridas en trazas/
+    python wms_trazas.py trazas/ --canal Paris --desde 2026-01-01
+    python wms_trazas.py corrida.jsonl --json
+    python wms_trazas.py --comandos            # comandos WebDriver por paso (PERFILAR_COMANDOS)
+    python wms_trazas.py --cargas --perfil rendimiento   # carga de páginas de un perfil del navegador
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import threading
+from datetime import datetime
+
+
+TRAZAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trazas")
+
+
+class Span:
+    """Tramo en curso. `intentos` y `resultado` se pueden ajustar antes de cerrar."""
+
+    def __init__(self, tracer, paso, campos):
+        self.tracer = tracer
+        self.paso = paso
+        self.campos = campos
+        self.intentos = 1
+        self.resultado = "ok"
+        self.inicio = None
+        self.t0 = None
+
+    def set(self, **campos):
+        self.campos.update(campos)
+
+    def __enter__(self):
+        self.inicio = datetime.now()
+        self.t0 = time.perf_counter()
+        self.tracer.stack.append(self.paso)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.stack.pop()
+        if exc_type is not None:
+            self.resultado = f"error: {exc_type.__name__}"
+        self.tracer.record({
+            "tipo": "span",
+            "paso": self.paso,
+            "inicio": self.inicio.isoformat(timespec="milliseconds"),
+            "fin": datetime.now().isoformat(timespec="milliseconds"),
+            "segundos": round(time.perf_counter() - self.t0, 4),
+            "intentos": self.intentos,
+            "resultado": self.resultado,
+            **self.campos,
+        })
+        return False
+
+
+class RunTracer:
+    """Trazas de una corrida: un JSONL por corrida y los tramos en memoria para el RESUMEN."""
+
+    def __init__(self, directory=TRAZAS_DIR, **meta):
+        """Con `directory=None` los tramos quedan solo en memoria."""
+        self.id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.spans = []
+        self.stack = []  # Pasos abiertos, el último es el actual
+        self.lock = threading.Lock()
+        self.path = None
+        self.file = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            sufijo = f"_{meta['canal']}" if meta.get("canal") else ""
+            self.path = os.path.join(directory, f"corrida_{self.id}{sufijo}.jsonl")
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.record({"tipo": "corrida", "inicio": datetime.now().isoformat(timespec="seconds"), **meta})
+
+    def span(self, paso, **campos):
+        return Span(self, paso, campos)
+
+    @property
+    def current(self):
+        return self.stack[-1] if self.stack else None
+
+    def record(self, evento):
+        evento = {"corrida": self.id, **evento}
+        with self.lock:
+            if evento["tipo"] == "span":
+                self.spans.append(evento)
+            if self.file:
+                self.file.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+                self.file.flush()
+
+    def summary(self):
+        return summarize(self.spans)
+
+    def close(self, **resultado):
+        self.record({"tipo": "fin", "fin": datetime.now().isoformat(timespec="seconds"), **resultado})
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+
+class CommandProfiler:
+    """Cuenta los comandos WebDriver (idas y vueltas HTTP) por tipo y por paso.
+    
+    `install` envuelve `driver.execute`, por donde pasan todos los comandos del
+    driver y de sus WebElement. `step` devuelve el paso actual (por ejemplo
+    `lambda: tracer.current`).
+    """
+
+    def __init__(self, step=lambda: None):
+        self.step = step
+        self.stats = {}  # (paso, comando) -> [cantidad, segundos]
+        self.lock = threading.Lock()
+
+    def install(self, driver):
+        # Un driver reutilizado entre corridas ya puede traer el envoltorio de otro perfilador
+        original = getattr(driver, "_execute_sin_perfil", driver.execute)
+        driver._execute_sin_perfil = original
+
+        def execute(driver_command, params=None):
+            t0 = time.perf_counter()
+            try:
+                return original(driver_command, params)
+            finally:
+                self.add(self.step() or "-", driver_command, time.perf_counter() - t0)
+
+        driver.execute = execute
+        return driver
+
+    def add(self, paso, comando, segundos):
+        with self.lock:
+            stat = self.stats.setdefault((paso, comando), [0, 0.0])
+            stat[0] += 1
+            stat[1] += segundos
+
+    def totals(self, key):
+        """Totales agrupados por "paso" o "comando": {nombre: [cantidad, segundos]}."""
+        index = 0 if key == "paso" else 1
+        totales = {}
+        for clave, (n, segundos) in self.stats.items():
+            total = totales.setdefault(clave[index], [0, 0.0])
+            total[0] += n
+            total[1] += segundos
+        return totales
+
+    def as_dict(self):
+        """Conteos para guardar en la traza y comparar entre versiones."""
+        return {
+            "comandos": sum(n for n, _ in self.stats.values()),
+            "segundos": round(sum(s for _, s in self.stats.values()), 3),
+            "detalle": [{"paso": paso, "comando": comando, "n": n, "segundos": round(segundos, 3)}
+                        for (paso, comando), (n, segundos) in sorted(self.stats.items())],
+        }
+
+    def report_lines(self, top=10):
+        total_n = sum(n for n, _ in self.stats.values())
+        total_s = sum(s for _, s in self.stats.values())
+        lineas = [f"{total_n} comandos WebDriver, {total_s:.1f} s"]
+
+        lineas.append(f"{'Paso':<18}{'comandos':>10}{'s':>8}")
+        for paso, (n, segundos) in sorted(self.totals("paso").items(), key=lambda x: -x[1][1]):
+            lineas.append(f"{paso:<18}{n:>10}{segundos:>8.1f}")
+
+        lineas.append(f"{'Paso':<18}{'Comando':<26}{'n':>7}{'s':>8}{'ms prom':>9}")
+        peores = sorted(self.stats.items(), key=lambda x: -x[1][1])[:top]
+        for (paso, comando), (n, segundos) in peores:
+            lineas.append(f"{paso:<18}{comando:<26}{n:>7}{segundos:>8.1f}{segundos / n * 1000:>9.0f}")
+        return lineas
+
+
+def percentile(values, q):
+    """Percentil `q` (0-100) con interpolación lineal."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize(spans):
+    """Agrupa tramos por paso: n, fallidos, total, p50, p95 y máximo de segundos."""
+    pasos = {}
+    for span in spans:
+        pasos.setdefault(span["paso"], []).append(span)
+
+    filas = []
+    for paso, grupo in pasos.items():
+        segundos = [s["segundos"] for s in grupo]
+        filas.append({
+            "paso": paso,
+            "n": len(grupo),
+            "fallidos": sum(1 for s in grupo if s.get("resultado") != "ok"),
+            "total": round(sum(segundos), 3),
+            "p50": round(percentile(segundos, 50), 3),
+            "p95": round(percentile(segundos, 95), 3),
+            "max": round(max(segundos), 3),
+        })
+    return filas
+
+
+def format_summary(filas):
+    """Tabla de texto para el RESUMEN de la corrida o la consola."""
+    lineas = [f"{'Paso':<18}{'n':>6}{'fallos':>8}{'p50 s':>9}{'p95 s':>9}{'total s':>10}"]
+    for fila in filas:
+        lineas.append(f"{fila['paso']:<18}{fila['n']:>6}{fila['fallidos']:>8}"
+                      f"{fila['p50']:>9.2f}{fila['p95']:>9.2f}{fila['total']:>10.1f}")
+    return lineas
+
+
+def format_page_loads(cargas):
+    """Tabla de texto con cada navegación: paso, página, segundos, DOM listo, recursos y KB."""
+    lineas = [f"{'Paso':<12}{'Página':<34}{'s':>7}{'DOM ms':>8}{'recursos':>10}{'KB':>8}"]
+    for carga in cargas:
+        lineas.append(f"{carga['paso']:<12}{(carga.get('url') or '-')[:33]:<34}{carga['segundos']:>7.2f}"
+                      f"{carga.get('dom_ms') or '-':>8}{carga.get('recursos', '-'):>10}{carga.get('kb', '-'):>8}")
+    return lineas
+
+
+def load_traces(paths):
+    """Lee los eventos de archivos JSONL o directorios de trazas."""
+    archivos = []
+    for path in paths:
+        if os.path.isdir(path):
+            archivos.extend(sorted(glob.glob(os.path.join(path, "*.jsonl"))))
+        else:
+            archivos.append(path)
+
+    eventos = []
+    for archivo in archivos:
+        with open(archivo, encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    eventos.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    continue  # Línea cortada de una corrida interrumpida
+    return eventos
+
+
+def print_commands(registros, as_json=False):
+    """Promedio por corrida de comandos WebDriver y segundos, por paso."""
+    pasos = {}
+    for registro in registros:
+        for fila in registro["detalle"]:
+            total = pasos.setdefault(fila["paso"], [0, 0.0])
+            total[0] += fila["n"]
+            total[1] += fila["segundos"]
+
+    corridas = max(len(registros), 1)
+    filas = [{"paso": paso, "comandos": round(n / corridas, 1), "segundos": round(s / corridas, 2)}
+             for paso, (n, s) in sorted(pasos.items(), key=lambda x: -x[1][0])]
+
+    if as_json:
+        print(json.dumps({"corridas": len(registros), "pasos": filas}, ensure_ascii=False, indent=2))
+    else:
+        print(f"Corridas perfiladas: {len(registros)} (promedio por corrida)")
+        print(f"{'Paso':<18}{'comandos':>10}{'s':>8}")
+        for fila in filas:
+            print(f"{fila['paso']:<18}{fila['comandos']:>10}{fila['segundos']:>8.2f}")
+    return 0
+
+
+def print_page_loads(cargas, as_json=False):
+    """Promedio por paso y perfil de los tiempos de carga de página."""
+    grupos = {}
+    for carga in cargas:
+        grupos.setdefault((carga.get("perfil") or "-", carga["paso"]), []).append(carga)
+
+    filas = []
+    for (perfil, paso), grupo in sorted(grupos.items()):
+        segundos = [c["segundos"] for c in grupo]
+        filas.append({
+            "perfil": perfil,
+            "paso": paso,
+            "n": len(grupo),
+            "p50": round(percentile(segundos, 50), 3),
+            "p95": round(percentile(segundos, 95), 3),
+            "kb": round(sum(c.get("kb") or 0 for c in grupo) / len(grupo)),
+            "recursos": round(sum(c.get("recursos") or 0 for c in grupo) / len(grupo), 1),
+        })
+
+    if as_json:
+        print(json.dumps({"cargas": len(cargas), "pasos": filas}, ensure_ascii=False, indent=2))
+    else:
+        print(f"Cargas de página: {len(cargas)}")
+        print(f"{'Perfil':<14}{'Paso':<12}{'n':>6}{'p50 s':>9}{'p95 s':>9}{'recursos':>10}{'KB':>8}")
+        for fila in filas:
+            print(f"{fila['perfil']:<14}{fila['paso']:<12}{fila['n']:>6}{fila['p50']:>9.2f}{fila['p95']:>9.2f}"
+                  f"{fila['recursos']:>10}{fila['kb']:>8}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen de tiempos por paso de varias corridas WMS DCIC")
+    parser.add_argument("rutas", nargs="*", default=[TRAZAS_DIR], help="archivos .jsonl o directorios de trazas")
+    parser.add_argument("--canal", help="solo corridas de este canal")
+    parser.add_argument("--desde", help="solo corridas desde esta fecha (AAAA-MM-DD)")
+    parser.add_argument("--perfil", help="solo corridas con este perfil del navegador")
+    parser.add_argument("--comandos", action="store_true", help="promedio de comandos WebDriver por paso (corridas perfiladas)")
+    parser.add_argument("--cargas", action="store_true", help="tiempos de carga de página por perfil y paso")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args(argv)
+
+    eventos = load_traces(args.rutas)
+    corridas = {e["corrida"]: e for e in eventos if e.get("tipo") == "corrida"}
+    if args.canal:
+        corridas = {k: v for k, v in corridas.items() if (v.get("canal") or "").lower() == args.canal.lower()}
+    if args.desde:
+        corridas = {k: v for k, v in corridas.items() if v.get("inicio", "") >= args.desde}
+    if args.perfil:
+        corridas = {k: v for k, v in corridas.items() if (v.get("perfil") or "normal") == args.perfil}
+
+    if args.comandos:
+        return print_commands([e for e in eventos if e.get("tipo") == "comandos" and e.get("corrida") in corridas],
+                              args.json)
+
+    if args.cargas:
+        return print_page_loads([e for e in eventos if e.get("tipo") == "carga" and e.get("corrida") in corridas],
+                                args.json)
+
+    spans = [e for e in eventos if e.get("tipo") == "span" and e.get("corrida") in corridas]
+    filas = summarize(spans)
+
+    if args.json:
+        print(json.dumps({"corridas": len(corridas), "pasos": filas}, ensure_ascii=False, indent=2))
+    else:
+        print(f"Corridas: {len(corridas)}")
+        for linea in format_summary(filas):
+            print(linea)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())